@@ -0,0 +1,93 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+
+
+#This class holds the state of the web UI that is shared by all worker threads of the web server
+#The fields are read and written under 'lock'. Operations that change the storage location or the
+#registration (upload, save, register, unregister) are serialized with 'operation_lock', which is held
+#across the slow file system and Data Layer calls so that page rendering is never blocked by them
+class AppState:
+    """AppState"""
+
+    def __init__(self):
+        """__init__"""
+        self.lock = threading.RLock()
+        self.operation_lock = threading.Lock()
+
+        # Error map of the uploaded CSV file
+        self.message = None
+
+        # JSON files in the storage location that can be registered
+        self.global_json_files = None
+
+        # JSON file that is registered at the Data Layer
+        self.registered_json = None
+
+        # JSON files that are registered at the Data Layer with one bulk operation (all languages)
+        self.registered_files = []
+
+        # Result of the last upload
+        self.successfully_saved = None
+
+        # True if the registered file was registered initially after a reboot
+        self.initial_registration = None
+
+        # Last register/unregister operation (see registration_service.py), polled by the index page
+        self.last_operation = None
+
+        # Last background job (see job_queue.py), its progress is streamed to the index page
+        self.last_job = None
+
+        # Incremented on every update, identifies the rendered index page together with the operation state
+        self.version = 0
+        self.modified = time.time()
+
+    def update(self, **values):
+        """update"""
+        with self.lock:
+            for name, value in values.items():
+                if not hasattr(self, name) or name in ("lock", "operation_lock", "version", "modified"):
+                    raise AttributeError(f"AppState has no field {name}")
+                setattr(self, name, value)
+            self.version += 1
+            self.modified = time.time()
+
+    def snapshot(self) -> dict:
+        """snapshot
+
+        Returns a consistent copy of the values rendered by the index page
+        """
+        with self.lock:
+            return {
+                "json_files": self.global_json_files,
+                "registered_json": self.registered_json,
+                "registered_files": list(self.registered_files),
+                "message": self.message,
+                "successfully_saved": self.successfully_saved,
+                "operation": self.last_operation.to_dict() if self.last_operation is not None else None,
+                "job": self.last_job.to_dict() if self.last_job is not None else None,
+            }
+
+    def render_key(self):
+        """render_key
+
+        Returns (key, last modified time): the key changes whenever the index page would render differently.
+        The operation and the job are finished by the registration service and the job queue without an update,
+        so their states are part of the key
+        """
+        with self.lock:
+            key = [self.version]
+            modified = self.modified
+            operation = self.last_operation
+            if operation is not None:
+                key += [operation.id, operation.status]
+                modified = max(modified, operation.finished or operation.started)
+            job = self.last_job
+            if job is not None:
+                key += [job.id, job.status]
+                modified = max(modified, job.finished or job.started or job.submitted)
+            return tuple(key), modified
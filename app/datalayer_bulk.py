@@ -0,0 +1,176 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import datetime
+import threading
+
+from ctrlxdatalayer.bulk import BulkReadRequest, BulkWriteRequest
+from ctrlxdatalayer.variant import Result
+
+from app.live_values import value_to_variant, variant_to_value
+
+
+#This class reads and writes many Data Layer addresses with one ctrlxdatalayer.bulk round trip
+#Every call uses a client of the client pool (see datalayer_pool.py). Values are converted from/to JSON with
+#the type of the node, which is learned from reads and from the live value subscription (see live_values.py)
+class BulkAccess:
+    """BulkAccess"""
+
+    def __init__(self, client_pool, known_type=None):
+        """__init__"""
+        self._client_pool = client_pool
+        self._known_type = known_type
+        self._lock = threading.Lock()
+        # address -> VariantType of the values read so far
+        self._types = {}
+
+    def read(self, addresses: list):
+        """read
+
+        Returns a list of {"address", "result", "value", "timestamp"}, one per address, or None if the Data
+        Layer is not connected
+        """
+        with self._client_pool.client() as client:
+            if client is None:
+                return None
+            return self._read(client, addresses)
+
+    def _read(self, client, addresses):
+        with client.create_bulk() as bulk:
+            result = bulk.read([BulkReadRequest(address) for address in addresses])
+            if result != Result.OK:
+                return [self._item(address, result) for address in addresses]
+
+            items = []
+            for response in bulk.get_response():
+                data = response.get_data()
+                value = None
+                if response.get_result() == Result.OK:
+                    value = variant_to_value(data)
+                    with self._lock:
+                        self._types[response.get_address()] = data.get_type()
+                items.append(self._item(response.get_address(), response.get_result(), value,
+                                        self._timestamp(response)))
+            return items
+
+    def write(self, values: dict):
+        """write
+
+        Writes {address: value} and returns a list of {"address", "result", "value", "timestamp"}, or None if
+        the Data Layer is not connected. The types of nodes that were not read yet are read in one bulk read first
+        """
+        with self._client_pool.client() as client:
+            if client is None:
+                return None
+            unknown = [address for address in values if self.value_type(address) is None]
+            if unknown:
+                self._read(client, unknown)
+            return self._write(client, values)
+
+    def _write(self, client, values):
+        # The items are in the order of values; the ones of rejected values are filled in at once
+        items = [None] * len(values)
+        positions = []
+        requests = []
+        variants = []
+        written = []
+        try:
+            for position, (address, value) in enumerate(values.items()):
+                value_type = self.value_type(address)
+                if value_type is None:
+                    items[position] = self._item(address, Result.TYPE_MISMATCH)
+                    continue
+                try:
+                    variant = value_to_variant(value, value_type)
+                except (TypeError, ValueError):
+                    items[position] = self._item(address, Result.TYPE_MISMATCH)
+                    continue
+                variants.append(variant)
+                positions.append(position)
+                requests.append(BulkWriteRequest(address, variant))
+                written.append(variant_to_value(variant))
+
+            if not requests:
+                return items
+
+            with client.create_bulk() as bulk:
+                result = bulk.write(requests)
+                responses = bulk.get_response() if result == Result.OK else []
+                # Bulk.write returns one response per request in the order of the requests
+                for i, (position, request) in enumerate(zip(positions, requests)):
+                    if i >= len(responses):
+                        items[position] = self._item(request.address,
+                                                     result if result != Result.OK else Result.FAILED)
+                        continue
+                    response = responses[i]
+                    items[position] = self._item(request.address, response.get_result(), written[i],
+                                                 self._timestamp(response))
+            return items
+        finally:
+            for variant in variants:
+                variant.close()
+
+    def value_type(self, address: str):
+        """value_type"""
+        with self._lock:
+            value_type = self._types.get(address)
+        if value_type is None and self._known_type is not None:
+            value_type = self._known_type(address)
+        return value_type
+
+    @staticmethod
+    def _timestamp(response) -> str:
+        # bulk.Response.get_datetime() is the FILETIME of the response as naive datetime in UTC
+        timestamp = response.get_datetime()
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+        return timestamp.isoformat()
+
+    @staticmethod
+    def _item(address, result, value=None, timestamp=None) -> dict:
+        return {"address": address, "result": result.name, "value": value, "timestamp": timestamp}
+
+
+#This class debounces high-rate writes (e.g. a slider): only the latest value of every address is written,
+#the values pending after 'interval' seconds are written with one bulk write
+class DebouncedWriter:
+    """DebouncedWriter"""
+
+    def __init__(self, bulk_access: BulkAccess, interval: float = 0.1):
+        """__init__"""
+        self._bulk_access = bulk_access
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+        self.written = 0
+        self.dropped = 0
+
+    def submit(self, values: dict):
+        """submit"""
+        with self._lock:
+            self.dropped += len(self._pending.keys() & values.keys())
+            self._pending.update(values)
+            if self._timer is None:
+                self._timer = threading.Timer(self._interval, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush(self):
+        with self._lock:
+            values = self._pending
+            self._pending = {}
+            self._timer = None
+        try:
+            items = self._bulk_access.write(values)
+        except Exception as e:
+            print("ERROR Debounced write of", list(values), "failed:", e, flush=True)
+            return
+        if items is None:
+            print("WARNING Debounced write of", list(values), "dropped, Data Layer not connected", flush=True)
+            return
+        self.written += len(values)
+        for item in items:
+            if item["result"] != Result.OK.name:
+                print("WARNING Writing", item["address"], "failed:", item["result"], flush=True)
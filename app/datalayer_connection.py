@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+
+from ctrlxdatalayer.variant import Result
+
+
+#This class connects to the ctrlX Data Layer in a background thread, retrying with exponential backoff
+#The web server can serve requests while the connection is being established
+class DatalayerConnection:
+    """DatalayerConnection"""
+
+    def __init__(self, datalayer_system, connection_string: str, initial_delay: float = 0.5,
+                 max_delay: float = 10.0, check_interval: float = 5.0):
+        """__init__"""
+        self._system = datalayer_system
+        self._connection_string = connection_string
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._check_interval = check_interval
+
+        self._client = None
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._on_connected = []
+        self._callbacks_done = False
+
+        self._attempts = 0
+        self._last_error = None
+        self._connected_since = None
+
+    def on_connected(self, callback):
+        """on_connected
+
+        Registers a callback that runs in the connection thread when the link is up for the first time
+        """
+        self._on_connected.append(callback)
+
+    def start(self):
+        """start"""
+        self._thread = threading.Thread(target=self._run, name="datalayer-connect", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """stop"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def get_client(self):
+        """get_client
+
+        Returns the connected client or None if the Data Layer is not (yet) connected
+        """
+        if self._connected.is_set():
+            return self._client
+        return None
+
+    def wait(self, timeout: float = None) -> bool:
+        """wait"""
+        return self._connected.wait(timeout)
+
+    def status(self) -> dict:
+        """status"""
+        return {
+            "connected": self._connected.is_set(),
+            "attempts": self._attempts,
+            "last_error": self._last_error,
+            "connected_since": self._connected_since,
+        }
+
+    def _is_healthy(self, client) -> bool:
+        return client.is_connected() and client.ping_sync() == Result.OK
+
+    def _connect(self) -> bool:
+        self._attempts += 1
+        if self._client is None:
+            self._client = self._system.factory().create_client(self._connection_string)
+            if self._client is None:
+                self._last_error = "Creating client failed"
+                return False
+
+        if not self._is_healthy(self._client):
+            self._last_error = "Not connected"
+            return False
+
+        self._last_error = None
+        self._connected_since = time.time()
+        self._connected.set()
+        print("INFO Connected to Data Layer after", self._attempts, "attempt(s)", flush=True)
+        return True
+
+    def _run(self):
+        delay = self._initial_delay
+        while not self._stop.is_set():
+            if not self._connected.is_set():
+                if self._connect():
+                    delay = self._initial_delay
+                    if self._callbacks_done:
+                        continue
+                    self._callbacks_done = True
+                    for callback in self._on_connected:
+                        try:
+                            callback(self._client)
+                        except Exception as e:
+                            print("ERROR Data Layer connect callback failed:", e, flush=True)
+                    continue
+                print("WARNING Connecting", self._connection_string, "failed, retry in", delay, "s", flush=True)
+                self._stop.wait(delay)
+                delay = min(delay * 2, self._max_delay)
+                continue
+
+            # Watch the connection, the client reconnects on its own once the Data Layer is back
+            self._stop.wait(self._check_interval)
+            if not self._client.is_connected():
+                print("WARNING Data Layer connection lost", flush=True)
+                self._last_error = "Connection lost"
+                self._connected_since = None
+                self._connected.clear()
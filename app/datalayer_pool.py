@@ -0,0 +1,199 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import collections
+import contextlib
+import threading
+import time
+
+from ctrlxdatalayer.variant import Result
+
+
+#This class describes one client of the pool
+class PooledClient:
+    """PooledClient"""
+
+    def __init__(self, index: int):
+        """__init__"""
+        self.index = index
+        self.client = None
+        self.healthy = False
+        self.failures = 0
+        self.next_attempt = 0.0
+
+
+#This class is a pool of Data Layer clients for the synchronous calls of web requests (bulk read/write etc.)
+#Every request gets a healthy client of its own, so concurrent requests do not serialize on one client.
+#A background thread checks the idle clients with is_connected()/ping_sync() and rebuilds broken clients with backoff
+class DatalayerClientPool:
+    """DatalayerClientPool"""
+
+    def __init__(self, datalayer_system, connection_string: str, size: int = 4, check_interval: float = 5.0,
+                 initial_delay: float = 0.5, max_delay: float = 10.0):
+        """__init__"""
+        self._system = datalayer_system
+        self._connection_string = connection_string
+        self._check_interval = check_interval
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+
+        self._slots = [PooledClient(index) for index in range(size)]
+        self._condition = threading.Condition()
+        self._idle = collections.deque()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        self.acquired = 0
+        self.acquire_timeouts = 0
+        self.reconnects = 0
+        self.failed_checks = 0
+
+    def start(self):
+        """start"""
+        self._thread = threading.Thread(target=self._run, name="datalayer-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """stop"""
+        self._stop.set()
+        self._wakeup.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        with self._condition:
+            self._idle.clear()
+            for slot in self._slots:
+                slot.healthy = False
+        for slot in self._slots:
+            self._close(slot)
+
+    def wait(self, timeout: float = None) -> bool:
+        """wait
+
+        Waits until a client of the pool is healthy, returns False on timeout
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._stop.is_set() or any(slot.healthy for slot in self._slots), timeout) \
+                and not self._stop.is_set()
+
+    @contextlib.contextmanager
+    def client(self, timeout: float = 1.0):
+        """client
+
+        Context manager that hands out a healthy client, or None if no client became available within timeout
+        """
+        slot = self._acquire(timeout)
+        if slot is None:
+            yield None
+            return
+        try:
+            yield slot.client
+        finally:
+            self._release(slot)
+
+    def stats(self) -> dict:
+        """stats"""
+        with self._condition:
+            healthy = sum(1 for slot in self._slots if slot.healthy)
+            return {
+                "size": len(self._slots),
+                "healthy": healthy,
+                "idle": len(self._idle),
+                "in_use": healthy - len(self._idle),
+                "broken": len(self._slots) - healthy,
+                "acquired": self.acquired,
+                "acquire_timeouts": self.acquire_timeouts,
+                "reconnects": self.reconnects,
+                "failed_checks": self.failed_checks,
+            }
+
+    def _acquire(self, timeout):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._idle or self._stop.is_set(), timeout) \
+                    or self._stop.is_set():
+                self.acquire_timeouts += 1
+                return None
+            self.acquired += 1
+            return self._idle.popleft()
+
+    def _release(self, slot):
+        if self._stop.is_set():
+            # The client was closed by stop()
+            return
+        # is_connected() only reads the state of the client, a lost connection is rebuilt by the pool thread
+        connected = slot.client.is_connected()
+        with self._condition:
+            if connected:
+                self._idle.append(slot)
+                self._condition.notify()
+                return
+            slot.healthy = False
+            self.failed_checks += 1
+        print("WARNING Data Layer pool client", slot.index, "lost its connection", flush=True)
+        self._wakeup.set()
+
+    def _take_idle(self, slot) -> bool:
+        with self._condition:
+            if slot in self._idle:
+                self._idle.remove(slot)
+                return True
+            return False
+
+    def _check(self, slot) -> bool:
+        if slot.client is None:
+            slot.client = self._system.factory().create_client(self._connection_string)
+            if slot.client is None:
+                return False
+        return slot.client.is_connected() and slot.client.ping_sync() == Result.OK
+
+    def _close(self, slot):
+        if slot.client is not None:
+            slot.client.close()
+            slot.client = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            next_run = now + self._check_interval
+            for slot in self._slots:
+                # Clients in use are checked when they are released
+                if slot.healthy and not self._take_idle(slot):
+                    continue
+                if not slot.healthy and now < slot.next_attempt:
+                    next_run = min(next_run, slot.next_attempt)
+                    continue
+
+                was_healthy = slot.healthy
+                try:
+                    healthy = self._check(slot)
+                except Exception as e:
+                    print("ERROR Checking Data Layer pool client", slot.index, "failed:", e, flush=True)
+                    healthy = False
+
+                with self._condition:
+                    if healthy:
+                        if slot.failures > 0:
+                            self.reconnects += 1
+                        slot.healthy = True
+                        slot.failures = 0
+                        self._idle.append(slot)
+                        # Also wakes the threads in wait()
+                        self._condition.notify_all()
+                        continue
+                    slot.healthy = False
+                    slot.failures += 1
+                    self.failed_checks += 1
+                    slot.next_attempt = now + min(self._initial_delay * 2 ** (slot.failures - 1), self._max_delay)
+                    next_run = min(next_run, slot.next_attempt)
+
+                if was_healthy:
+                    print("WARNING Data Layer pool client", slot.index, "is broken, rebuilding", flush=True)
+                # Broken clients are closed and created again on the next attempt
+                self._close(slot)
+
+            self._wakeup.wait(max(0.0, next_run - time.monotonic()))
+            self._wakeup.clear()
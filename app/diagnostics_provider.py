@@ -0,0 +1,220 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import re
+
+import ctrlxdatalayer
+from comm.datalayer import NodeClass
+from ctrlxdatalayer.metadata_utils import AllowedOperation, MetadataBuilder, ReferenceType
+from ctrlxdatalayer.provider import Provider
+from ctrlxdatalayer.provider_node import (
+    ProviderNode,
+    ProviderNodeCallbacks,
+    NodeCallback,
+)
+from ctrlxdatalayer.variant import Result, Variant
+
+from app.metrics import metrics
+
+DIAGNOSTICS_NODE = "webserver/diagnostics"
+STRING_TYPE = "types/datalayer/string"
+
+# Catalogs of Diag.csv, not those of the products (Diag_<PRODUCT>_<LANG>.json) or registered versions (Diag<LANG>.<hash>.json)
+CATALOG_FILE = re.compile(r'Diag([A-Za-z0-9]+)\.json')
+
+
+#This class is the in-memory index of the compiled catalogs, built once per compilation
+#Every node address below webserver/diagnostics maps to its text and its child names in a flat dictionary
+class DiagnosticsIndex:
+    """DiagnosticsIndex"""
+
+    def __init__(self, catalogs: list = (), languages: list = ()):
+        """__init__"""
+        # relative address -> (text or None, child names)
+        self.nodes = {}
+        language_names = []
+        for catalog, language in zip(catalogs, languages):
+            language_name = language.upper()
+            language_names.append(language_name)
+            main_names = []
+            for main_no, main_entry in catalog["mainDiagnostics"].items():
+                main_names.append(main_no)
+                detailed = main_entry.get("detailedDiagnostics") or {}
+                for detailed_no, detailed_entry in detailed.items():
+                    self.nodes[f"{language_name}/{main_no}/{detailed_no}"] = (detailed_entry["text"], [])
+                self.nodes[f"{language_name}/{main_no}"] = (main_entry["text"], list(detailed))
+            self.nodes[language_name] = (None, main_names)
+        self.nodes[""] = (None, language_names)
+
+    @staticmethod
+    def from_directory(storage_location: str):
+        """from_directory
+
+        Builds the index from the Diag<LANG>.json files of the storage location (the catalogs of Diag.csv)
+        """
+        catalogs = []
+        languages = []
+        try:
+            files = sorted(os.listdir(storage_location))
+        except OSError:
+            return DiagnosticsIndex()
+        for file in files:
+            if CATALOG_FILE.fullmatch(file):
+                try:
+                    with open(os.path.join(storage_location, file), 'r', encoding='utf-8') as json_file:
+                        catalogs.append(json.load(json_file))
+                except (OSError, ValueError) as e:
+                    print("ERROR Loading", file, "failed:", e, flush=True)
+                    continue
+                languages.append(file[len('Diag'):-len('.json')])
+        return DiagnosticsIndex(catalogs, languages)
+
+    def __len__(self):
+        """__len__"""
+        return len(self.nodes)
+
+
+#This class provides the compiled catalogs as nodes webserver/diagnostics/<lang>/<mainDiagNo>[/<detailedNo>]
+#One provider node is registered for the whole subtree; reads and browses are dictionary lookups in the index.
+#The metadata Variants are built once and shared by all nodes of a kind
+class DiagnosticsProviderNode:
+    """DiagnosticsProviderNode"""
+
+    def __init__(self, provider: Provider, index: DiagnosticsIndex = None):
+        """__init__"""
+        # The callbacks are timed unless the metrics are switched off (DIAG_METRICS=0)
+        self._cbs = ProviderNodeCallbacks(
+            metrics.timed("diagnostics_create")(self.__on_create),
+            metrics.timed("diagnostics_remove")(self.__on_remove),
+            metrics.timed("diagnostics_browse")(self.__on_browse),
+            metrics.timed("diagnostics_read")(self.__on_read),
+            metrics.timed("diagnostics_write")(self.__on_write),
+            metrics.timed("diagnostics_metadata")(self.__on_metadata),
+        )
+
+        self._providerNode = ProviderNode(self._cbs)
+
+        self._provider = provider
+        self._prefix_length = len(DIAGNOSTICS_NODE) + 1
+        # Replaced as a whole when the catalogs are compiled again, so callbacks always see a consistent index
+        self._index = index if index is not None else DiagnosticsIndex()
+
+        self._folder_metadata = self.__build_metadata(AllowedOperation.BROWSE, NodeClass.NodeClass.Folder,
+                                                      "Diagnostics catalogs")
+        self._text_metadata = self.__build_metadata(AllowedOperation.READ, NodeClass.NodeClass.Variable,
+                                                    "Diagnostic text")
+        self._main_metadata = self.__build_metadata(AllowedOperation.READ | AllowedOperation.BROWSE,
+                                                    NodeClass.NodeClass.Variable, "Main diagnostic text")
+
+    def register_node(self):
+        """register_node"""
+        result = self._provider.register_node(DIAGNOSTICS_NODE, self._providerNode)
+        if result != Result.OK:
+            return result
+        return self._provider.register_node(DIAGNOSTICS_NODE + "/**", self._providerNode)
+
+    def unregister_node(self):
+        """unregister_node"""
+        self._provider.unregister_node(DIAGNOSTICS_NODE + "/**")
+        self._provider.unregister_node(DIAGNOSTICS_NODE)
+        self._folder_metadata.close()
+        self._text_metadata.close()
+        self._main_metadata.close()
+
+    def set_index(self, index: DiagnosticsIndex):
+        """set_index"""
+        self._index = index
+        print("INFO Providing", len(index), "diagnostics nodes", flush=True)
+
+    @staticmethod
+    def __build_metadata(allowed, node_class, description):
+        builder = MetadataBuilder(allowed=allowed, description=description)
+        builder.set_node_class(node_class)
+        if allowed & AllowedOperation.READ:
+            builder.add_reference(ReferenceType.read(), STRING_TYPE)
+        return builder.build()
+
+    def __lookup(self, address: str):
+        # The language is matched case-insensitively (webserver/diagnostics/en/... is the node of DiagEN.json)
+        language, separator, numbers = address[self._prefix_length:].strip("/").partition("/")
+        return self._index.nodes.get(language.upper() + separator + numbers)
+
+    def __on_create(
+        self,
+        userdata: ctrlxdatalayer.clib.userData_c_void_p,
+        address: str,
+        data: Variant,
+        cb: NodeCallback,
+    ):
+        """__on_create"""
+        cb(Result.UNSUPPORTED, None)
+
+    def __on_remove(
+        self,
+        userdata: ctrlxdatalayer.clib.userData_c_void_p,
+        address: str,
+        cb: NodeCallback,
+    ):
+        """__on_remove"""
+        cb(Result.UNSUPPORTED, None)
+
+    def __on_browse(
+        self,
+        userdata: ctrlxdatalayer.clib.userData_c_void_p,
+        address: str,
+        cb: NodeCallback,
+    ):
+        """__on_browse"""
+        node = self.__lookup(address)
+        if node is None:
+            cb(Result.INVALID_ADDRESS, None)
+            return
+        with Variant() as children:
+            children.set_array_string(node[1])
+            cb(Result.OK, children)
+
+    def __on_read(
+        self,
+        userdata: ctrlxdatalayer.clib.userData_c_void_p,
+        address: str,
+        data: Variant,
+        cb: NodeCallback,
+    ):
+        """__on_read"""
+        node = self.__lookup(address)
+        if node is None or node[0] is None:
+            cb(Result.INVALID_ADDRESS, None)
+            return
+        with Variant() as text:
+            text.set_string(node[0])
+            cb(Result.OK, text)
+
+    def __on_write(
+        self,
+        userdata: ctrlxdatalayer.clib.userData_c_void_p,
+        address: str,
+        data: Variant,
+        cb: NodeCallback,
+    ):
+        """__on_write"""
+        cb(Result.UNSUPPORTED, None)
+
+    def __on_metadata(
+        self,
+        userdata: ctrlxdatalayer.clib.userData_c_void_p,
+        address: str,
+        cb: NodeCallback,
+    ):
+        """__on_metadata"""
+        node = self.__lookup(address)
+        if node is None:
+            cb(Result.INVALID_ADDRESS, None)
+        elif node[0] is None:
+            cb(Result.OK, self._folder_metadata)
+        elif node[1]:
+            cb(Result.OK, self._main_metadata)
+        else:
+            cb(Result.OK, self._text_metadata)
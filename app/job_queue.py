@@ -0,0 +1,244 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import collections
+import itertools
+import json
+import threading
+import time
+
+from app.metrics import metrics
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+#This exception is raised by Job.report() in the job function once the job is cancelled
+class JobCancelled(Exception):
+    """JobCancelled"""
+
+
+#This class describes one background job (compile, validate, register, ...)
+#The job function is called with the job and reports its progress with report(), which is also the cancellation point;
+#steps without progress (e.g. waiting for the Data Layer) check cancelled() and raise JobCancelled
+class Job:
+    """Job"""
+
+    def __init__(self, job_id: int, kind: str, key, function):
+        """__init__"""
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+        self._function = function
+        self._cancel_requested = False
+        # Incremented on every change, the event streams wait for it
+        self._version = 0
+        self._condition = None
+
+    def report(self, **progress):
+        """report
+
+        Updates the progress (e.g. rows=..., languages_done=..., languages=...) and raises JobCancelled
+        if the job was cancelled meanwhile
+        """
+        with self._condition:
+            self.progress.update(progress)
+            self._version += 1
+            self._condition.notify_all()
+            if self._cancel_requested:
+                raise JobCancelled()
+
+    def cancelled(self) -> bool:
+        """cancelled"""
+        return self._cancel_requested
+
+    def to_dict(self) -> dict:
+        """to_dict"""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+#This class runs jobs one after the other in a worker thread, so the web requests that submit them return at once
+#A job submitted with the kind and key (e.g. the hash of the CSV file) of a queued or running job is collapsed into it
+class JobQueue:
+    """JobQueue"""
+
+    def __init__(self, history: int = 20, max_streams: int = 4, heartbeat: float = 15.0):
+        """__init__"""
+        self._history = history
+        self._max_streams = max_streams
+        self._heartbeat = heartbeat
+        self._condition = threading.Condition()
+        self._ids = itertools.count(1)
+        self._jobs = collections.OrderedDict()
+        self._queue = collections.deque()
+        self._streams = 0
+        self._worker = None
+
+    def submit(self, kind: str, function, key=None):
+        """submit
+
+        Queues function(job) and returns the job. Returns the queued or running job of the same kind and key
+        instead, if there is one
+        """
+        with self._condition:
+            for job in self._jobs.values():
+                if job.kind == kind and job.key == key and job.status in (QUEUED, RUNNING) and not job.cancelled():
+                    return job
+
+            job = Job(next(self._ids), kind, key, function)
+            job._condition = self._condition
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._forget_old_jobs()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="job-queue", daemon=True)
+                self._worker.start()
+            self._condition.notify_all()
+        print("INFO Queued job", job.id, kind, flush=True)
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(self._jobs) - self._history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: int):
+        """get"""
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        """jobs"""
+        with self._condition:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def cancel(self, job_id: int):
+        """cancel
+
+        Cancels a queued job at once; a running job is cancelled at its next progress report or check of cancelled().
+        Returns the job, or None if it is unknown
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job._cancel_requested = True
+            if job.status == QUEUED:
+                self._queue.remove(job)
+                self._finish(job, CANCELLED)
+            else:
+                job._version += 1
+                self._condition.notify_all()
+        print("INFO Cancel of job", job_id, "requested", flush=True)
+        return job
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue)
+                job = self._queue.popleft()
+                job.status = RUNNING
+                job.started = time.time()
+                job._version += 1
+                self._condition.notify_all()
+
+            status, result, error = DONE, None, None
+            try:
+                result = job._function(job)
+            except JobCancelled:
+                status = CANCELLED
+            except Exception as e:
+                print("ERROR Job", job.id, job.kind, "failed:", e, flush=True)
+                status, error = FAILED, str(e)
+
+            with self._condition:
+                job.result = result
+                job.error = error
+                self._finish(job, status)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        job._version += 1
+        self._condition.notify_all()
+        if metrics.enabled and job.started is not None:
+            metrics.observe("job_" + job.kind, job.finished - job.started, status != DONE)
+        print("INFO Job", job.id, job.kind, status, flush=True)
+
+    def open_stream(self, job_id: int):
+        """open_stream
+
+        Returns an iterable of Server-Sent Events with the state of the job until it is finished, or None if the
+        job is unknown or the maximum number of streams is reached
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or self._streams >= self._max_streams:
+                return None
+            self._streams += 1
+        return JobEventStream(self, job)
+
+    def _release(self):
+        with self._condition:
+            self._streams -= 1
+
+
+#This class is the response body of the Server-Sent Events stream of one job
+#Every change of the job is sent as 'progress' event, the final state as 'finished' event
+class JobEventStream:
+    """JobEventStream"""
+
+    def __init__(self, queue: JobQueue, job: Job):
+        """__init__"""
+        self._queue = queue
+        self._job = job
+        self._closed = False
+
+    def __iter__(self):
+        """__iter__"""
+        yield "retry: 2000\n\n"
+        version = -1
+        condition = self._queue._condition
+        while not self._closed:
+            with condition:
+                condition.wait_for(lambda: self._job._version != version, self._queue._heartbeat)
+                changed = self._job._version != version
+                version = self._job._version
+                state = self._job.to_dict()
+            if state["status"] in FINISHED:
+                yield f"event: finished\ndata: {json.dumps(state)}\n\n"
+                return
+            if changed:
+                yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+            else:
+                yield ": keepalive\n\n"
+
+    def close(self):
+        """close"""
+        if not self._closed:
+            self._closed = True
+            self._queue._release()
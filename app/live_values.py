@@ -0,0 +1,222 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import threading
+import time
+
+from ctrlxdatalayer.subscription import NotifyType, create_properties
+from ctrlxdatalayer.variant import Result, Variant, VariantType
+
+SUBSCRIPTION_ID = "webserver-live-values"
+
+# Variant types that are converted to JSON values, the getter/setter is 'get_<type>'/'set_<type>'
+SCALAR_TYPES = (VariantType.BOOL8, VariantType.INT8, VariantType.UINT8, VariantType.INT16, VariantType.UINT16,
+                VariantType.INT32, VariantType.UINT32, VariantType.INT64, VariantType.UINT64,
+                VariantType.FLOAT32, VariantType.FLOAT64, VariantType.STRING)
+ARRAY_TYPES = (VariantType.ARRAY_BOOL8, VariantType.ARRAY_INT8, VariantType.ARRAY_UINT8, VariantType.ARRAY_INT16,
+               VariantType.ARRAY_UINT16, VariantType.ARRAY_INT32, VariantType.ARRAY_UINT32, VariantType.ARRAY_INT64,
+               VariantType.ARRAY_UINT64, VariantType.ARRAY_FLOAT32, VariantType.ARRAY_FLOAT64, VariantType.ARRAY_STRING)
+
+
+#This function converts the value of a Variant to a JSON compatible value (None for flatbuffers, raw data etc.)
+def variant_to_value(variant: Variant):
+    variant_type = variant.get_type()
+    if variant_type in SCALAR_TYPES or variant_type in ARRAY_TYPES:
+        return getattr(variant, "get_" + variant_type.name.lower())()
+    if variant_type == VariantType.TIMESTAMP:
+        return variant.get_datetime().isoformat()
+    return None
+
+
+#This function returns a Variant of the given type holding value (e.g. a value sent by the web UI)
+def value_to_variant(value, variant_type: VariantType) -> Variant:
+    if variant_type == VariantType.BOOL8:
+        value = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "on")
+    elif variant_type in (VariantType.FLOAT32, VariantType.FLOAT64):
+        value = float(value)
+    elif variant_type == VariantType.STRING:
+        value = str(value)
+    elif variant_type in SCALAR_TYPES:
+        value = int(float(value))
+    elif variant_type not in ARRAY_TYPES:
+        raise ValueError(f"Writing values of type {variant_type.name} is not supported")
+
+    variant = Variant()
+    result = getattr(variant, "set_" + variant_type.name.lower())(value)
+    if result != Result.OK:
+        variant.close()
+        raise ValueError(f"Setting value of type {variant_type.name} failed: {result.name}")
+    return variant
+
+
+#This class bridges Data Layer values to the web UI: one SubscriptionAsync holds all addresses the UI shows,
+#the latest values are cached and every change is pushed to the browsers as Server-Sent Events.
+#N browser tabs cost one Data Layer subscription instead of N times a read round trip per poll
+class LiveValueBridge:
+    """LiveValueBridge"""
+
+    def __init__(self, addresses: list, publish_interval: int = 100, max_clients: int = 4, heartbeat: float = 15.0):
+        """__init__"""
+        self.addresses = list(addresses)
+        self._publish_interval = publish_interval
+        self._max_clients = max_clients
+        self._heartbeat = heartbeat
+
+        self._condition = threading.Condition()
+        # address -> {"value", "type", "timestamp", "version"}
+        self._values = {}
+        self._version = 0
+        self._clients = 0
+        self._stopped = False
+
+        self._properties = None
+        self._subscription = None
+        self._notify_result = Result.OK
+
+    def start(self, client):
+        """start
+
+        Subscribes all addresses, used as on_connected callback of the Data Layer connection
+        """
+        if not self.addresses:
+            return
+        self._properties = create_properties(SUBSCRIPTION_ID, publish_interval=self._publish_interval)
+        result, subscription = client.create_subscription_async(self._properties, self._on_notify,
+                                                                self._on_response)
+        if result != Result.OK:
+            print("ERROR Creating subscription", SUBSCRIPTION_ID, "failed:", result, flush=True)
+            return
+        result = subscription.subscribe_multi(self.addresses, self._on_response)
+        if result != Result.OK:
+            print("ERROR Subscribing", self.addresses, "failed:", result, flush=True)
+            return
+        self._subscription = subscription
+        print("INFO Subscribed", len(self.addresses), "address(es) for the web UI", flush=True)
+
+    def stop(self):
+        """stop"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    def _on_response(self, result, data, userdata):
+        if result != Result.OK:
+            print("ERROR Subscription", SUBSCRIPTION_ID, "response:", result, flush=True)
+
+    # Called by the Data Layer, the notify items are only valid during the call
+    def _on_notify(self, result, items, userdata):
+        if result != Result.OK:
+            # Notified every publish interval while the error persists, logged once
+            if result != self._notify_result:
+                print("WARNING Subscription", SUBSCRIPTION_ID, "notification:", result, flush=True)
+            self._notify_result = result
+            return
+        self._notify_result = result
+
+        with self._condition:
+            changed = False
+            for item in items:
+                if item.get_type() != NotifyType.DATA:
+                    continue
+                data = item.get_data()
+                address = item.get_address()
+                value = variant_to_value(data)
+                cached = self._values.get(address)
+                if cached is not None and cached["value"] == value:
+                    continue
+                if not changed:
+                    self._version += 1
+                    changed = True
+                self._values[address] = {
+                    "value": value,
+                    "type": data.get_type(),
+                    "timestamp": time.time(),
+                    "version": self._version,
+                }
+            if changed:
+                self._condition.notify_all()
+
+    def values(self) -> dict:
+        """values"""
+        with self._condition:
+            return {address: entry["value"] for address, entry in self._values.items()}
+
+    def current(self, address: str):
+        """current
+
+        Returns (value, timestamp) of address while the subscription delivers values, else None
+        """
+        with self._condition:
+            entry = self._values.get(address)
+            if entry is None or self._subscription is None or self._notify_result != Result.OK:
+                return None
+            return entry["value"], entry["timestamp"]
+
+    def value_type(self, address: str):
+        """value_type
+
+        Returns the VariantType of the latest value of address, or None if no value has been received yet
+        """
+        with self._condition:
+            entry = self._values.get(address)
+            return entry["type"] if entry is not None else None
+
+    def changes_since(self, version: int, timeout: float):
+        """changes_since
+
+        Waits up to timeout seconds for values newer than version and returns (version, {address: value})
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._version > version or self._stopped, timeout)
+            changes = {address: entry["value"] for address, entry in self._values.items()
+                       if entry["version"] > version}
+            return self._version, changes
+
+    def open_stream(self):
+        """open_stream
+
+        Returns an iterable of Server-Sent Events, or None if the maximum number of clients is reached.
+        Every stream occupies a worker thread of the web server, so their number is limited
+        """
+        with self._condition:
+            if self._clients >= self._max_clients:
+                return None
+            self._clients += 1
+        return EventStream(self)
+
+    def _release(self):
+        with self._condition:
+            self._clients -= 1
+
+
+#This class is the response body of one Server-Sent Events stream
+#The web server calls close() when the browser disconnects, even if the stream was never iterated
+class EventStream:
+    """EventStream"""
+
+    def __init__(self, bridge: LiveValueBridge):
+        """__init__"""
+        self._bridge = bridge
+        self._closed = False
+
+    def __iter__(self):
+        """__iter__"""
+        yield "retry: 2000\n\n"
+        version = 0
+        while not self._closed and not self._bridge._stopped:
+            version, changes = self._bridge.changes_since(version, self._bridge._heartbeat)
+            if changes:
+                yield f"event: values\ndata: {json.dumps(changes)}\n\n"
+            else:
+                yield ": keepalive\n\n"
+
+    def close(self):
+        """close"""
+        if not self._closed:
+            self._closed = True
+            self._bridge._release()
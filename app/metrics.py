@@ -0,0 +1,129 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+
+# Upper bounds of the latency buckets in seconds, from provider callbacks (~100 us) to registrations (seconds)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+#This class holds the latency histogram and the error counter of one operation
+class Histogram:
+    """Histogram"""
+
+    def __init__(self, buckets: tuple):
+        """__init__"""
+        # Not cumulative, the last count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+
+#This class keeps per-operation counters and latency histograms in memory, rendered in the Prometheus text format
+#If it is disabled, timed() returns the function itself and timer() a shared no-op context manager, so the
+#instrumented code runs as without instrumentation
+class Metrics:
+    """Metrics"""
+
+    def __init__(self, enabled: bool = True, buckets: tuple = DEFAULT_BUCKETS):
+        """__init__"""
+        self.enabled = enabled
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, operation: str, seconds: float, failed: bool = False):
+        """observe"""
+        index = bisect.bisect_left(self._buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None:
+                histogram = self._histograms[operation] = Histogram(self._buckets)
+            histogram.counts[index] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+            if failed:
+                histogram.errors += 1
+
+    def timed(self, operation: str):
+        """timed
+
+        Decorator that observes the duration of every call, a call that raises counts as error
+        """
+        def decorator(function):
+            if not self.enabled:
+                return function
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                failed = True
+                try:
+                    result = function(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    self.observe(operation, time.perf_counter() - start, failed)
+            return wrapper
+        return decorator
+
+    def timer(self, operation: str):
+        """timer
+
+        Context manager that observes the duration of the block, a block that raises counts as error
+        """
+        if not self.enabled:
+            return _NO_TIMER
+        return self._timer(operation)
+
+    @contextlib.contextmanager
+    def _timer(self, operation):
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.observe(operation, time.perf_counter() - start, failed)
+
+    def render(self) -> str:
+        """render
+
+        Returns all histograms and error counters in the Prometheus text format
+        """
+        with self._lock:
+            snapshot = [(operation, list(histogram.counts), histogram.sum, histogram.count, histogram.errors)
+                        for operation, histogram in sorted(self._histograms.items())]
+
+        lines = ["# HELP diag_operation_duration_seconds Duration of instrumented operations",
+                 "# TYPE diag_operation_duration_seconds histogram"]
+        for operation, counts, total, count, _ in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self._buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f'diag_operation_duration_seconds_bucket{{operation="{operation}",le="{bound}"}} '
+                             f'{cumulative}')
+            lines.append(f'diag_operation_duration_seconds_sum{{operation="{operation}"}} {total:.6f}')
+            lines.append(f'diag_operation_duration_seconds_count{{operation="{operation}"}} {count}')
+
+        lines += ["# HELP diag_operation_errors_total Instrumented operations that raised an exception or failed",
+                  "# TYPE diag_operation_errors_total counter"]
+        for operation, _, _, _, errors in snapshot:
+            lines.append(f'diag_operation_errors_total{{operation="{operation}"}} {errors}')
+        return "\n".join(lines) + "\n"
+
+
+_NO_TIMER = contextlib.nullcontext()
+
+# Instrumentation of the app, switched off with DIAG_METRICS=0 (read once when the modules are imported)
+metrics = Metrics(enabled=os.getenv("DIAG_METRICS", "1") == "1")
@@ -2,39 +2,61 @@
 #
 # SPDX-License-Identifier: MIT
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import ctrlxdatalayer
-from comm.datalayer import DisplayFormat, Metadata, NodeClass
 from ctrlxdatalayer.provider import Provider
 from ctrlxdatalayer.provider_node import (
     ProviderNode,
     ProviderNodeCallbacks,
     NodeCallback,
 )
-from ctrlxdatalayer.variant import Result, Variant
+from ctrlxdatalayer.variant import Result, Variant, VariantType
+
+from app.metrics import metrics
+
+# Print every provider callback, only for debugging: the callbacks are on the hot path of every client request
+TRACE = os.getenv("DIAG_PROVIDER_TRACE", "0") == "1"
 
-from appdata.app_data_control import AppDataControl
+# Variant types whose value is written into the cached Variant, other types are cloned
+SETTABLE_TYPES = (VariantType.BOOL8, VariantType.INT8, VariantType.UINT8, VariantType.INT16, VariantType.UINT16,
+                  VariantType.INT32, VariantType.UINT32, VariantType.INT64, VariantType.UINT64,
+                  VariantType.FLOAT32, VariantType.FLOAT64, VariantType.STRING)
 
 
+#This class provides one node below webserver/ at the Data Layer
+#Reads return the cached Variant of the node. If commands are given (e.g. for 'webserver/app-cmd'), a written
+#string is run as command in a worker thread, so the provider callback returns at once. The value of the node
+#is '<command> running' until the command is finished and '<command> done' or '<command> error' afterwards
 class MyProviderNode:
     """MyProviderNode"""
 
-    def __init__(self, provider: Provider, address: str, initialValue: Variant):
+    def __init__(self, provider: Provider, address: str, initialValue: Variant, commands: dict = None):
         """__init__"""
+        # The callbacks are timed unless the metrics are switched off (DIAG_METRICS=0)
         self._cbs = ProviderNodeCallbacks(
-            self.__on_create,
-            self.__on_remove,
-            self.__on_browse,
-            self.__on_read,
-            self.__on_write,
-            self.__on_metadata,
+            metrics.timed("provider_create")(self.__on_create),
+            metrics.timed("provider_remove")(self.__on_remove),
+            metrics.timed("provider_browse")(self.__on_browse),
+            metrics.timed("provider_read")(self.__on_read),
+            metrics.timed("provider_write")(self.__on_write),
+            metrics.timed("provider_metadata")(self.__on_metadata),
         )
-        self._app_data_control = AppDataControl()
 
         self._providerNode = ProviderNode(self._cbs)
 
         self._provider = provider
         self._address = address
         self._data = initialValue
+        # The value is changed by the command worker thread while the provider reads it
+        self._lock = threading.Lock()
+
+        # command name -> function without arguments that returns True on success
+        self._commands = commands
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="provider-cmd") if commands else None
+        self._running = None
 
     def register_node(self):
         """register_node"""
@@ -43,7 +65,8 @@ class MyProviderNode:
     def unregister_node(self):
         """unregister_node"""
         self._provider.unregister_node(self._address)
-        #self._metadata.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
         self._data.close()
 
     def set_value(self, value: Variant):
@@ -58,7 +81,8 @@ class MyProviderNode:
         cb: NodeCallback,
     ):
         """__on_create"""
-        print("__on_create()", "address:", address, "userdata:", userdata, flush=True)
+        if TRACE:
+            print("__on_create()", "address:", address, "userdata:", userdata, flush=True)
         cb(Result.OK, data)
 
     def __on_remove(
@@ -68,7 +92,8 @@ class MyProviderNode:
         cb: NodeCallback,
     ):
         """__on_remove"""
-        print("__on_remove()", "address:", address, "userdata:", userdata, flush=True)
+        if TRACE:
+            print("__on_remove()", "address:", address, "userdata:", userdata, flush=True)
         cb(Result.UNSUPPORTED, None)
 
     def __on_browse(
@@ -78,7 +103,8 @@ class MyProviderNode:
         cb: NodeCallback,
     ):
         """__on_browse"""
-        print("__on_browse()", "address:", address, "userdata:", userdata, flush=True)
+        if TRACE:
+            print("__on_browse()", "address:", address, "userdata:", userdata, flush=True)
         with Variant() as new_data:
             new_data.set_array_string([])
             cb(Result.OK, new_data)
@@ -90,19 +116,12 @@ class MyProviderNode:
         data: Variant,
         cb: NodeCallback,
     ):
-        """__on_read"""            
-        print(
-            "__on_read()",
-            "address:",
-            address,
-            "data:",
-            self._data,
-            "userdata:",
-            userdata,
-            flush=True,
-        )
-        new_data = self._data
-        cb(Result.OK, new_data)
+        """__on_read"""
+        if TRACE:
+            print("__on_read()", "address:", address, "data:", self._data, "userdata:", userdata, flush=True)
+        # The Data Layer copies the Variant into its response, no copy is needed here
+        with self._lock:
+            cb(Result.OK, self._data)
 
     def __on_write(
         self,
@@ -111,46 +130,58 @@ class MyProviderNode:
         data: Variant,
         cb: NodeCallback,
     ):
-        
-        if(address=="webserver/app-cmd"):
-            resultVariant = Variant()
-            if(data.get_string()=="save"):
-                if self._app_data_control.set_default():
-                    resultVariant.set_string("save done")
-                    _ , data = resultVariant.clone()
-                else:
-                    resultVariant.set_string("save error")
-                    _ , data = resultVariant.clone()
-            elif(data.get_string()=="load"):
-                if self._app_data_control.load():
-                    resultVariant.set_string("load done")
-                    _ , data = resultVariant.clone()
-                else:
-                    resultVariant.set_string("load error")
-                    _ , data = resultVariant.clone()
-            else:
-                resultVariant.set_string("command unknown") 
-                _ , data = resultVariant.clone()
-                        
         """__on_write"""
-        print(
-            "__on_write()",
-            "address:",
-            address,
-            "data:",
-            data,
-            "userdata:",
-            userdata,
-            flush=True,
-        )
-
-        if self._data.get_type() != data.get_type():
-            cb(Result.TYPE_MISMATCH, None)
+        if TRACE:
+            print("__on_write()", "address:", address, "data:", data, "userdata:", userdata, flush=True)
+
+        with self._lock:
+            # The type is compared under the lock, a clone of another Variant may replace self._data
+            if self._data.get_type() != data.get_type():
+                cb(Result.TYPE_MISMATCH, None)
+                return
+
+            if self._commands is not None:
+                self.__run_command(data.get_string(), cb)
+                return
+
+            self.__store(data)
+            cb(Result.OK, self._data)
+
+    def __store(self, data: Variant):
+        data_type = data.get_type()
+        if data_type in SETTABLE_TYPES:
+            # The value is written into the cached Variant, no new Variant is allocated
+            getattr(self._data, "set_" + data_type.name.lower())(getattr(data, "get_" + data_type.name.lower())())
+            return
+        result, copy = data.clone()
+        if result == Result.OK:
+            self._data.close()
+            self._data = copy
+
+    def __run_command(self, command: str, cb: NodeCallback):
+        function = self._commands.get(command)
+        if function is None:
+            self._data.set_string("command unknown")
+            cb(Result.INVALID_VALUE, self._data)
+            return
+        if self._running is not None and not self._running.done():
+            cb(Result.FAILED, self._data)
             return
 
-        result, self._data = data.clone()
+        self._data.set_string(f"{command} running")
+        self._running = self._executor.submit(self.__execute, command, function)
         cb(Result.OK, self._data)
 
+    def __execute(self, command: str, function):
+        try:
+            succeeded = function()
+        except Exception as e:
+            print("ERROR Command", command, "at", self._address, "failed:", e, flush=True)
+            succeeded = False
+        print("INFO Command", command, "at", self._address, "done" if succeeded else "failed", flush=True)
+        with self._lock:
+            self._data.set_string(f"{command} done" if succeeded else f"{command} error")
+
     def __on_metadata(
         self,
         userdata: ctrlxdatalayer.clib.userData_c_void_p,
@@ -158,5 +189,6 @@ class MyProviderNode:
         cb: NodeCallback,
     ):
         """__on_metadata"""
-        print("__on_metadata()", "address:", address, flush=True)
-        cb(Result.FAILED, None) #cb(Result.OK, self._metadata)  # Take metadata from metadata.mddb
\ No newline at end of file
+        if TRACE:
+            print("__on_metadata()", "address:", address, flush=True)
+        cb(Result.FAILED, None) #cb(Result.OK, self._metadata)  # Take metadata from metadata.mddb
@@ -0,0 +1,78 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import os
+import threading
+
+# Cache-Control of fingerprinted static files: the URL changes with the content, so they never need to be revalidated
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+#This class caches the rendered index page: the page is rendered again only when its render key changes
+#(see AppState.render_key), concurrent requests share the rendered body and its ETag
+class RenderCache:
+    """RenderCache"""
+
+    def __init__(self):
+        """__init__"""
+        self._lock = threading.Lock()
+        self._key = None
+        self._body = None
+        self._etag = None
+        self.hits = 0
+        self.renders = 0
+
+    def get(self, key, render):
+        """get
+
+        Returns (body, etag) of the page for key, calling render() if it is not cached
+        """
+        with self._lock:
+            if key == self._key:
+                self.hits += 1
+                return self._body, self._etag
+
+        body = render()
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        with self._lock:
+            self._key, self._body, self._etag = key, body, etag
+            self.renders += 1
+        return body, etag
+
+
+#This class computes fingerprints of static files for cache busting URLs ('?v=<fingerprint>')
+#A fingerprint is computed once per file version (modification time and size)
+class StaticFingerprints:
+    """StaticFingerprints"""
+
+    def __init__(self, static_folder: str):
+        """__init__"""
+        self._static_folder = static_folder
+        self._lock = threading.Lock()
+        # file name -> ((mtime, size), fingerprint)
+        self._fingerprints = {}
+
+    def fingerprint(self, filename: str):
+        """fingerprint
+
+        Returns the fingerprint of a static file or None if it does not exist
+        """
+        path = os.path.join(self._static_folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._fingerprints.get(filename)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with open(path, 'rb') as file:
+            fingerprint = hashlib.sha256(file.read()).hexdigest()[:12]
+        with self._lock:
+            self._fingerprints[filename] = (version, fingerprint)
+        return fingerprint
@@ -0,0 +1,122 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import collections
+import datetime
+import threading
+import time
+
+from ctrlxdatalayer.variant import Result
+
+
+#This class is a read-through cache of Data Layer values keyed by address
+#Values of subscribed addresses are taken from the subscription (see live_values.py) and do not expire,
+#other values are read with one bulk read for all misses and kept for a TTL per address (LRU evicted)
+class ReadCache:
+    """ReadCache"""
+
+    def __init__(self, bulk_access, live_values=None, default_ttl: float = 1.0, ttls: dict = None,
+                 max_entries: int = 256):
+        """__init__"""
+        self._bulk_access = bulk_access
+        self._live_values = live_values
+        self._default_ttl = default_ttl
+        # address prefix -> TTL in seconds, the longest matching prefix wins
+        self._ttls = sorted((ttls or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self._max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # address -> (expires, item)
+        self._entries = collections.OrderedDict()
+        # Incremented by invalidate(), values read before an invalidation are not stored
+        self._generation = 0
+
+        self.hits = 0
+        self.subscription_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl(self, address: str) -> float:
+        """ttl"""
+        for prefix, ttl in self._ttls:
+            if address.startswith(prefix):
+                return ttl
+        return self._default_ttl
+
+    def read(self, addresses: list):
+        """read
+
+        Returns a list of {"address", "result", "value", "timestamp"} like BulkAccess.read, or None if values
+        had to be read and the Data Layer is not connected
+        """
+        now = time.monotonic()
+        items = {}
+        missing = []
+        with self._lock:
+            for address in addresses:
+                current = self._live_values.current(address) if self._live_values is not None else None
+                if current is not None:
+                    value, timestamp = current
+                    items[address] = {"address": address, "result": Result.OK.name, "value": value,
+                                      "timestamp": datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).isoformat()}
+                    self.subscription_hits += 1
+                    continue
+
+                entry = self._entries.get(address)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(address)
+                    items[address] = entry[1]
+                    self.hits += 1
+                    continue
+                missing.append(address)
+                self.misses += 1
+            generation = self._generation
+
+        if missing:
+            read_items = self._bulk_access.read(missing)
+            if read_items is None:
+                return None
+            now = time.monotonic()
+            with self._lock:
+                for item in read_items:
+                    items[item["address"]] = item
+                    # Errors are not cached, the next read tries again
+                    if item["result"] == Result.OK.name and generation == self._generation:
+                        self._entries[item["address"]] = (now + self.ttl(item["address"]), item)
+                        self._entries.move_to_end(item["address"])
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return [items[address] for address in addresses if address in items]
+
+    def write(self, values: dict):
+        """write
+
+        Writes through BulkAccess.write and drops the cached values of the written addresses
+        """
+        try:
+            return self._bulk_access.write(values)
+        finally:
+            self.invalidate(list(values))
+
+    def invalidate(self, addresses: list):
+        """invalidate"""
+        with self._lock:
+            self._generation += 1
+            for address in addresses:
+                self._entries.pop(address, None)
+
+    def stats(self) -> dict:
+        """stats"""
+        with self._lock:
+            requests = self.hits + self.subscription_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "subscription_hits": self.subscription_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.subscription_hits) / requests if requests else None,
+            }
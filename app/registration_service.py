@@ -0,0 +1,314 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import itertools
+import threading
+import time
+
+from ctrlxdatalayer.bulk import BulkWriteRequest
+from ctrlxdatalayer.variant import Result, Variant
+
+from app.metrics import metrics
+
+REGISTER_ADDRESS = "diagnosis/registration/register-file"
+UNREGISTER_ADDRESS = "diagnosis/registration/unregister-file"
+
+# Path of the storage location as seen by the diagnosis service of ctrlX OS
+DIAGNOSTICS_PATH = "/var/snap/rexroth-solutions/common/solutions/DefaultSolution/configurations/appdata/diagnostics"
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+
+
+# File name of bulk operations, which cover all catalog files
+ALL_FILES = "*"
+
+
+#This class describes one register or unregister operation, which may consist of several Data Layer writes
+class RegistrationOperation:
+    """RegistrationOperation"""
+
+    def __init__(self, operation_id: int, action: str, file_name: str, writes: list, on_success=None,
+                 on_failure=None):
+        """__init__"""
+        self.id = operation_id
+        self.action = action
+        self.file_name = file_name
+        self.status = PENDING
+        self.result = None
+        self.started = time.time()
+        self.finished = None
+
+        # Result per file of bulk operations
+        self.file_results = {}
+
+        # Number of writes that succeeded, the writes after a failed write are not made
+        self.completed = 0
+
+        # (address, value) pairs that are written one after the other
+        self._writes = writes
+        self._next_write = 0
+        self._on_success = on_success
+        self._on_failure = on_failure
+        self._data = None
+        self._timer = None
+        # True while a write of the Data Layer has not returned, also after the operation timed out
+        self._outstanding = False
+        # Context manager of the pool client, exited when the operation is no longer in flight
+        self._lease = None
+        # perf_counter() of the write in flight, for the metrics
+        self._write_started = None
+
+    def to_dict(self) -> dict:
+        """to_dict"""
+        return {
+            "id": self.id,
+            "action": self.action,
+            "file": self.file_name,
+            "status": self.status,
+            "result": self.result,
+            "started": self.started,
+            "finished": self.finished,
+            "files": self.file_results,
+            "completed": self.completed,
+        }
+
+
+#This class runs register and unregister operations with Client.write_async, so web requests do not wait for the Data Layer
+#Repeated submissions of the operation that is in flight are coalesced into it; only one operation is in flight at a time
+#An operation that timed out stays in flight until its write returns: the Data Layer calls every response callback,
+#with an error result if the connection is lost, so a new operation never overlaps with the write of the old one
+#The client is taken from the DatalayerClientPool and kept for as long as the operation is in flight
+class RegistrationService:
+    """RegistrationService"""
+
+    def __init__(self, client_pool, timeout: float = 10.0, history: int = 20, acquire_timeout: float = 1.0):
+        """__init__"""
+        self._client_pool = client_pool
+        self._timeout = timeout
+        self._acquire_timeout = acquire_timeout
+        self._history = history
+        # Reentrant, the Data Layer may call the response callback from within write_async
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._operations = {}
+        self._in_flight = None
+
+    def submit(self, action: str, file_name: str, writes: list, on_success=None, on_failure=None):
+        """submit
+
+        Starts an operation and returns it. Returns the operation in flight if it is the same action on the
+        same file, or None if the Data Layer is not connected or another operation (or the write of an operation
+        that timed out) is in flight.
+        on_failure is called with the operation if a write failed or timed out, operation.completed tells
+        how many writes succeeded
+        """
+        lease, client = self._lease()
+        if client is None:
+            return None
+
+        with self._lock:
+            operation, created = self._create(lease, action, file_name, writes, on_success, on_failure)
+            if created:
+                self._start_write(client, operation)
+        if not created:
+            lease.__exit__(None, None, None)
+        return operation
+
+    def submit_bulk(self, action: str, address: str, file_names: list, rounds: int = 1, on_success=None):
+        """submit_bulk
+
+        Writes the registration path of every file to address in one Data Layer round trip (ctrlxdatalayer.bulk)
+        and reports the result per file. With rounds > 1 the bulk write is repeated (see unregister after reboot).
+        on_success is called with the operation if at least one file succeeded
+        """
+        lease, client = self._lease()
+        if client is None:
+            return None
+
+        with self._lock:
+            operation, created = self._create(lease, action, ALL_FILES, [(address, file_names)] * rounds, on_success,
+                                              None)
+            if created:
+                operation._outstanding = True
+                # Bulk.write with a callback is not usable in all versions of ctrlx-datalayer, so the
+                # synchronous bulk write runs in a worker thread
+                threading.Thread(target=self._run_bulk, args=(client, operation), name="datalayer-bulk",
+                                 daemon=True).start()
+        if not created:
+            lease.__exit__(None, None, None)
+        return operation
+
+    def _lease(self):
+        # The client is given back to the pool in _release, when the operation is no longer in flight
+        lease = self._client_pool.client(self._acquire_timeout)
+        client = lease.__enter__()
+        if client is None:
+            lease.__exit__(None, None, None)
+        return lease, client
+
+    def _create(self, lease, action, file_name, writes, on_success, on_failure):
+        in_flight = self._in_flight
+        if in_flight is not None:
+            if in_flight.status == PENDING and in_flight.action == action and in_flight.file_name == file_name:
+                return in_flight, False
+            return None, False
+
+        operation = RegistrationOperation(next(self._ids), action, file_name, writes, on_success, on_failure)
+        operation._lease = lease
+        self._operations[operation.id] = operation
+        for old_id in list(self._operations)[:-self._history]:
+            del self._operations[old_id]
+        self._in_flight = operation
+
+        operation._timer = threading.Timer(self._timeout, self._on_timeout, args=(operation,))
+        operation._timer.daemon = True
+        operation._timer.start()
+        return operation, True
+
+    def get(self, operation_id: int):
+        """get"""
+        with self._lock:
+            return self._operations.get(operation_id)
+
+    def in_flight(self):
+        """in_flight"""
+        with self._lock:
+            return self._in_flight
+
+    def _start_write(self, client, operation):
+        address, value = operation._writes[operation._next_write]
+        operation._next_write += 1
+        # The Variant must stay alive until the response callback has been called
+        operation._data = Variant()
+        operation._data.set_string(value)
+        if metrics.enabled:
+            operation._write_started = time.perf_counter()
+        operation._outstanding = True
+        result = client.write_async(address, operation._data,
+                                    lambda result, data, userdata: self._on_response(client, operation, result))
+        if result != Result.OK:
+            operation._outstanding = False
+            operation._data.close()
+            operation._data = None
+            self._finish(operation, FAILED, result)
+
+    def _on_response(self, client, operation, result):
+        with self._lock:
+            operation._outstanding = False
+            if operation._data is not None:
+                operation._data.close()
+                operation._data = None
+            if operation.status != PENDING:
+                # Late response of an operation that timed out
+                self._release(operation)
+                return
+            if operation._write_started is not None:
+                metrics.observe("registration_write", time.perf_counter() - operation._write_started,
+                                result != Result.OK)
+                operation._write_started = None
+
+            if result != Result.OK:
+                self._finish(operation, FAILED, result)
+                return
+            operation.completed += 1
+            if operation._next_write < len(operation._writes):
+                self._start_write(client, operation)
+                return
+
+            if operation._on_success is not None:
+                try:
+                    operation._on_success(operation)
+                except Exception as e:
+                    print("ERROR Completing", operation.action, "of", operation.file_name, "failed:", e, flush=True)
+            self._finish(operation, DONE, result)
+
+    def _run_bulk(self, client, operation):
+        result = Result.OK
+        file_results = {}
+        for address, file_names in operation._writes:
+            variants = []
+            try:
+                for file_name in file_names:
+                    variant = Variant()
+                    variant.set_string(registration_path(file_name))
+                    variants.append(variant)
+                with client.create_bulk() as bulk:
+                    started = time.perf_counter()
+                    result = bulk.write([BulkWriteRequest(address, variant) for variant in variants])
+                    if metrics.enabled:
+                        metrics.observe("registration_bulk_write", time.perf_counter() - started, result != Result.OK)
+                    responses = bulk.get_response() if result == Result.OK else []
+                    # All requests write the same node, so the address of a response does not tell the file.
+                    # Bulk.write returns one response per request in the order of the requests, with the result of
+                    # that request (the result of the call is OK even if single requests failed)
+                    for file_name, response in zip(file_names, responses):
+                        file_results[file_name] = response.get_result().name
+                    if result == Result.OK and len(responses) != len(file_names):
+                        print("WARNING Bulk", operation.action, "returned", len(responses), "responses for",
+                              len(file_names), "files", flush=True)
+                        for file_name in file_names[len(responses):]:
+                            file_results[file_name] = Result.FAILED.name
+            except Exception as e:
+                # The operation must be finished, else it would stay in flight
+                print("ERROR Bulk", operation.action, "failed:", e, flush=True)
+                result = Result.FAILED
+            finally:
+                for variant in variants:
+                    variant.close()
+            if result != Result.OK:
+                break
+
+        with self._lock:
+            operation._outstanding = False
+            if operation.status != PENDING:
+                self._release(operation)
+                return
+            operation.file_results = file_results
+            succeeded = [name for name, name_result in file_results.items() if name_result == Result.OK.name]
+            if result != Result.OK or not succeeded:
+                self._finish(operation, FAILED, result if result != Result.OK else Result.FAILED)
+                return
+            if operation._on_success is not None:
+                try:
+                    operation._on_success(operation)
+                except Exception as e:
+                    print("ERROR Completing", operation.action, "of", operation.file_name, "failed:", e, flush=True)
+            self._finish(operation, DONE, result)
+
+    def _on_timeout(self, operation):
+        with self._lock:
+            if operation.status == PENDING:
+                print("WARNING", operation.action, "of", operation.file_name, "timed out", flush=True)
+                self._finish(operation, TIMEOUT, None)
+
+    def _finish(self, operation, status, result):
+        operation.status = status
+        operation.result = result.name if result is not None else None
+        operation.finished = time.time()
+        if operation._timer is not None:
+            operation._timer.cancel()
+        self._release(operation)
+        if metrics.enabled:
+            metrics.observe(operation.action, operation.finished - operation.started, status != DONE)
+        print("INFO", operation.action, "of", operation.file_name, status, operation.result, flush=True)
+        if status != DONE and operation._on_failure is not None:
+            try:
+                operation._on_failure(operation)
+            except Exception as e:
+                print("ERROR Completing failed", operation.action, "of", operation.file_name, ":", e, flush=True)
+
+
+    def _release(self, operation):
+        if self._in_flight is operation and not operation._outstanding:
+            self._in_flight = None
+            operation._lease.__exit__(None, None, None)
+            operation._lease = None
+
+
+#This function returns the path of a JSON file as it is registered at the diagnosis service
+def registration_path(file_name: str) -> str:
+    return f"{DIAGNOSTICS_PATH}/{file_name}"
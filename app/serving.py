@@ -0,0 +1,31 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Serving modes of the web server:
+#   production  multi-threaded WSGI server (waitress, or the threaded Werkzeug server if waitress is not installed)
+#   debug       Flask development server with reloader and debugger, do not use on a ctrlX CORE
+
+SERVER_MODES = ("production", "debug")
+
+
+def run_server(app, mode: str = "production", host: str = "0.0.0.0", port: int = 5000, threads: int = 8):
+    """run_server"""
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown server mode {mode}, expected one of {SERVER_MODES}")
+
+    if mode == "debug":
+        print("INFO Starting Flask development server on port", port, flush=True)
+        app.run(debug=True, port=port, host=host)
+        return
+
+    try:
+        from waitress import serve
+    except ImportError:
+        from werkzeug.serving import run_simple
+        print("WARNING waitress not installed, starting threaded Werkzeug server on port", port, flush=True)
+        run_simple(host, port, app, threaded=True, use_reloader=False, use_debugger=False)
+        return
+
+    print("INFO Starting waitress on port", port, "with", threads, "threads", flush=True)
+    serve(app, host=host, port=port, threads=threads, ident="ctrlx-diagnostics-app")
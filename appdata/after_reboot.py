@@ -0,0 +1,157 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import shutil
+import tempfile
+
+from appdata.atomic_file import atomic_write, file_sha256
+
+AFTER_REBOOT_PREFIX = "AfterReboot-"
+MANIFEST_FILE_NAME = ".after-reboot.json"
+
+
+#This function makes an atomic byte-level copy of a file: a hardlink if possible, else a kernel side copy
+def atomic_copy(source_path, copy_path):
+    directory = os.path.dirname(copy_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    os.close(fd)
+    try:
+        try:
+            os.remove(tmp_path)
+            os.link(source_path, tmp_path)
+        except OSError:
+            # shutil.copyfile uses sendfile() on Linux, the data is not copied through Python
+            shutil.copyfile(source_path, tmp_path)
+            with open(tmp_path, 'rb') as tmp_file:
+                os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, copy_path)
+        # rename() does nothing if both names are links to the same file (the copy is up to date already)
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+#This class persists which JSON files are registered, so they can be registered again after a reboot
+#A copy of every registered file ('AfterReboot-<file>') and a small manifest are kept in the storage location
+class AfterRebootStore():
+    """AfterRebootStore
+    """
+    def __init__(self, storage_location, storage_index=None):
+        """__init__
+        """
+        self.storage_location = storage_location
+        # If given, the files persisted before the manifest existed are looked up in the index (see storage_index.py)
+        self.storage_index = storage_index
+        self.manifest_path = os.path.join(storage_location, MANIFEST_FILE_NAME)
+
+
+    #The following method returns the manifest entries ({"file", "copy", "sha256"}), or None if there is no manifest
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+            # Manifests written before several files could be registered describe a single file
+            return [manifest] if "file" in manifest else manifest["registered"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"ERROR Reading {self.manifest_path} failed: {e}", flush=True)
+            return None
+
+
+    #The following method stores a copy of the registered file and records it as the only registered file
+    #If the hash of the file is not known (e.g. from the compile cache), it is computed
+    def store(self, file_name, sha256=None):
+        return self.store_all([(file_name, sha256)])[0]
+
+
+    #The following method stores copies of several registered files, given as (file name, hash or None) pairs
+    #The new copies are made and the manifest is replaced before the copies of the previous files are deleted,
+    #so after a crash the manifest describes either the previous or the new registered files
+    def store_all(self, files):
+        previous = self.read_manifest()
+        previous_copies = [entry["copy"] for entry in previous] if previous is not None else self._scan()
+
+        entries = []
+        for file_name, sha256 in files:
+            source_path = os.path.join(self.storage_location, file_name)
+            copy_name = f"{AFTER_REBOOT_PREFIX}{file_name}"
+            atomic_copy(source_path, os.path.join(self.storage_location, copy_name))
+            entries.append({
+                "file": file_name,
+                "copy": copy_name,
+                "sha256": sha256 if sha256 is not None else file_sha256(source_path)
+            })
+
+        atomic_write(self.manifest_path, json.dumps({"registered": entries}, indent=2).encode('utf-8'))
+        self._delete_files(previous_copies, keep=[entry["copy"] for entry in entries])
+        return entries
+
+
+    #The following method returns the recorded hashes of the registered files (file name -> hash)
+    def hashes(self):
+        return {entry["file"]: entry.get("sha256") for entry in self.read_manifest() or []}
+
+
+    #The following method returns the name of the copy of the registered file, or None if no file is registered
+    def find(self):
+        return next(iter(self.find_all()), None)
+
+
+    #The following method returns the names of the copies of all registered files
+    def find_all(self):
+        entries = self.read_manifest()
+        if entries is not None:
+            return [entry["copy"] for entry in entries
+                    if os.path.isfile(os.path.join(self.storage_location, entry["copy"]))]
+
+        # Files persisted before the manifest existed
+        return self._scan()
+
+
+    #The following method deletes the copies of the registered files and the manifest
+    def delete(self):
+        self.delete_copies()
+        try:
+            os.remove(self.manifest_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error deleting file {MANIFEST_FILE_NAME}: {e}")
+
+
+    #The following method deletes the copies of the registered files except the ones in keep
+    def delete_copies(self, keep=()):
+        entries = self.read_manifest()
+        self._delete_files([entry["copy"] for entry in entries] if entries is not None else self._scan(), keep)
+
+
+    def _delete_files(self, files, keep):
+        for file in files:
+            if file in keep:
+                continue
+            try:
+                os.remove(os.path.join(self.storage_location, file))
+                print(f"Deleted file: {file}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error deleting file {file}: {e}")
+
+
+    def _scan(self):
+        if self.storage_index is not None:
+            return self.storage_index.after_reboot_files()
+        try:
+            files = os.listdir(self.storage_location)
+        except OSError:
+            return []
+        return [file for file in files if file.startswith('AfterReboot') and file.endswith('.json')]
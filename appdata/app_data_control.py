@@ -3,12 +3,27 @@
 # SPDX-License-Identifier: MIT
 
 import os
-import platform
-import datetime
-import json
+import re
 import time
-import csv
-from flask import Flask, request
+import tempfile
+
+from appdata.after_reboot import AfterRebootStore
+from appdata.storage_index import StorageIndex
+
+# The CSV parse, validation and compilation modules (diag_compiler, diag_validator, upload_stream, compile_cache,
+# parallel_compiler) are imported when they are used, they are not needed to start the app and serve the first page
+
+# Besides Diag.csv, the CSV files of further products (machine variants) are stored as Diag_<PRODUCT>.csv
+# and compiled to Diag_<PRODUCT>_<LANG>.json; product names consist of letters and digits
+PRODUCT_CSV = re.compile(r'Diag_([A-Za-z0-9]+)\.csv')
+PRODUCT_CATALOG = re.compile(r'Diag_([A-Za-z0-9]+)_[A-Za-z0-9]+\.(?:json|bin)')
+
+
+#This function returns the product of a catalog file name, None for the catalogs of Diag.csv
+def catalog_product(file_name):
+    match = PRODUCT_CATALOG.fullmatch(file_name)
+    return match.group(1) if match else None
+
 
 #This is a function to check if the required headers are available
 def check_headers(reader):
@@ -28,56 +43,30 @@ def check_headers(reader):
 
 
 # This method converts data from CSV format to JSON format
-def convert_csv_to_json(csv_path):
-    with open(csv_path, mode='r', encoding='utf-8-sig') as file:
-        reader = csv.DictReader(file, delimiter=';')
-        rows = list(reader)
-        product_name = str(rows[0]['product name'])
-        
-    languages = [header.split('-')[1] for header in reader.fieldnames if header.startswith('text-')]
-    json_data_list = []   
-
-    for i, lang in enumerate(languages): 
-
-        main_diagnostics = {}
-        current_main_diag_no = None
+# All languages are compiled in a single streaming pass over the CSV file (see diag_compiler.py)
+def convert_csv_to_json(csv_path, progress=None):
+    from appdata.diag_compiler import compile_csv
+    return compile_csv(csv_path, progress=progress)
 
-        for row in rows:
-            main_diag_no = row['mainDiag No']
-            detailed_diag_no = row['detailedDiagnostics No']
-            text = row[f'text-{lang.upper()}']
-            
-            
-            if main_diag_no:
-                current_main_diag_no = main_diag_no
-                main_diagnostics[str(current_main_diag_no)] = {
-                    "text": text,
-                    "version": 1
-                }
-                        
-            if detailed_diag_no and current_main_diag_no:
-                if 'detailedDiagnostics' not in main_diagnostics[str(current_main_diag_no)]:
-                    main_diagnostics[str(current_main_diag_no)]['detailedDiagnostics'] = {}
-                    
-                main_diagnostics[str(current_main_diag_no)]['detailedDiagnostics'][str(detailed_diag_no)] = {
-                    "text": text
-                    }
-        
-            json_data = {
-                "product": product_name,
-                "mainDiagnostics": main_diagnostics
-            }
 
-        json_data_list.append(json_data)        
-    
-    return json_data_list, languages
+# Methods of AppDataControl that are timed by the metrics of the app, method name -> operation
+TIMED_METHODS = {
+    "upload_stream": "upload",
+    "save": "save",
+    "rebuild_all": "rebuild_all",
+    "copy_json_file": "copy_json_file",
+    "copy_json_files": "copy_json_files",
+    "plan_catalog_update": "plan_catalog_update",
+    "search_for_error": "search_for_error",
+}
 
 
 #This class manages methods that manipulates the file system of the ctrlX CORE 
 class AppDataControl():
     """AppDataControl
     """
-    def __init__(self, storage_folder_name="diagnostics", storage_file_name="Diag.csv"):
+    def __init__(self, storage_folder_name="diagnostics", storage_file_name="Diag.csv", write_binary_catalog=False,
+                 metrics=None):
         """__init__
         """
         # The name of the application storage folder
@@ -103,22 +92,77 @@ class AppDataControl():
         self.storage_file = os.path.join(
             self.storage_location, self.storage_file_name)
 
+        # If True, save() also writes the compact binary catalog Diag<LANG>.bin next to each JSON file
+        self.write_binary_catalog = write_binary_catalog
+
+        # Catalogs compiled by search_for_error(), reused by save() while the CSV file is unchanged
+        self._compiled = None
+
+        # (catalogs, languages) compiled by the last save(), None if the JSON files were up to date
+        self.saved_catalogs = None
+
+        # Names of the files of the storage location, kept in memory (see storage_index.py)
+        self.storage_index = StorageIndex(self.storage_location)
+
+        # The file operations are timed by the metrics of the app (see app/metrics.py), nothing is timed without them
+        self.metrics = metrics
+        self._convert_csv_to_json = convert_csv_to_json
+        if metrics is not None:
+            for name, operation in TIMED_METHODS.items():
+                setattr(self, name, metrics.timed(operation)(getattr(self, name)))
+            self._convert_csv_to_json = metrics.timed("convert_csv_to_json")(convert_csv_to_json)
 
-    #The following method uploads a file in the file system
-    def upload(self, file):
+
+    #The following method uploads a file in the file system and validates it while it is being received
+    #It returns whether the file was saved and the error map of the CSV file
+    def upload_stream(self, file, max_size, chunk_size=1 << 16):
         result = AppDataControl.ensure_storage_location(self)
 
-        if result is True:
-            if file.filename == "Diag.csv":
-                filepath = os.path.join(self.storage_location, file.filename)
-                file.save(filepath) 
-                return True      
-            else:
-                return False                    
+        if result is not True:
+            return None, None
+        target = self.product_csv_path(file.filename)
+        if target is None:
+            return False, {"Upload failed": "Please upload the Diag.csv file or a Diag_<PRODUCT>.csv file."}
+
+        from appdata.upload_stream import CsvChunkParser, UploadTooLarge
+        if target == self.storage_file:
+            self._compiled = None
+        parser = CsvChunkParser()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix=".upload-", dir=self.storage_location)
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                while True:
+                    chunk = file.stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise UploadTooLarge()
+                    tmp_file.write(chunk)
+                    parser.feed(chunk)
+            message, builder = parser.close()
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+        except UploadTooLarge:
+            os.remove(tmp_path)
+            return False, {"Upload failed": f"The file exceeds the maximum size of {max_size} bytes."}
+        except UnicodeDecodeError:
+            os.remove(tmp_path)
+            return False, {"Upload failed": "The file must be UTF-8 encoded."}
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        print("INFO Uploaded and validated", size, "bytes of", file.filename, flush=True)
+        if not message and builder is not None and target == self.storage_file:
+            self._compiled = (AppDataControl.file_signature(self.storage_file), builder.catalogs(), builder.languages)
+        return True, message
 
 
     #In the following method JSON files will be created and saved in the file system
-    def save(self):
+    #progress is called with the rows compiled and the languages written (see app/job_queue.py)
+    def save(self, progress=None):
         """save
         """
         print("INFO Starting save routine", flush=True)
@@ -128,18 +172,25 @@ class AppDataControl():
 
         # If storage location ensured, save appdata to file
         if result is True:
+            from appdata.compile_cache import CompileCache, csv_content_hash
             path = self.storage_file     
             csv_path = self.storage_file
-            json_list, language_list = convert_csv_to_json(csv_path)
-
-            for i, language in enumerate(language_list):   
-                json_path = os.path.join(self.storage_location, f'Diag{language.upper()}.json')
-
-                # Ensure the directory exists
-                os.makedirs(os.path.dirname(json_path), exist_ok=True)
-
-                with open(json_path, 'w', encoding='utf-8') as json_file:
-                    json.dump(json_list[i], json_file, ensure_ascii=False, indent=2)
+            csv_hash = csv_content_hash(csv_path)
+            cache = CompileCache(self.storage_location)
+
+            # Nothing to do if this CSV content was already compiled and the JSON files are unchanged
+            if cache.is_up_to_date(csv_hash, self.write_binary_catalog):
+                self._compiled = None
+                self.saved_catalogs = None
+                print("INFO JSON files are up to date for: '", path, flush=True)
+                return True
+
+            json_list, language_list = AppDataControl.compiled_catalogs(self, progress)
+            self.saved_catalogs = (json_list, language_list)
+
+            # Only the JSON files whose content changed are rewritten
+            written = cache.write_catalogs(csv_hash, json_list, language_list, self.write_binary_catalog, progress)
+            print("INFO Written catalog files: ", written, flush=True)
                     
             print("INFO Saved application data to file: '", path, flush=True)
             return True     
@@ -148,6 +199,77 @@ class AppDataControl():
         return False
 
 
+    #This method returns the path an uploaded CSV file is stored at, or None if the file name is not accepted
+    def product_csv_path(self, file_name):
+        if file_name == self.storage_file_name or PRODUCT_CSV.fullmatch(file_name or ""):
+            return os.path.join(self.storage_location, file_name)
+        return None
+
+
+    #This method lists the stored CSV files of all products: product -> path, None is the product of Diag.csv
+    def list_products(self):
+        products = {}
+        files = self.storage_index.csv_files()
+        if self.storage_file_name in files:
+            products[None] = self.storage_file
+        for file in files:
+            match = PRODUCT_CSV.fullmatch(file)
+            if match:
+                products[match.group(1)] = os.path.join(self.storage_location, file)
+        return products
+
+
+    #In the following method the catalogs of all products are compiled again, in parallel worker processes
+    #It returns product -> written files (None if the product failed), or None if the storage location is missing
+    #progress is called after every finished product (see parallel_compiler.py)
+    def rebuild_all(self, workers=None, progress=None):
+        """rebuild_all
+        """
+        if AppDataControl.ensure_storage_location(self) is not True:
+            print("ERROR Rebuilding catalogs not possible", flush=True)
+            return None
+
+        from appdata.parallel_compiler import compile_products
+        self._compiled = None
+        self.saved_catalogs = None
+        results = compile_products(self.storage_location, self.list_products(), self.write_binary_catalog, workers,
+                                   progress=progress)
+        print("INFO Rebuilt catalogs:", {product or self.storage_file_name: written
+                                         for product, written in results.items()}, flush=True)
+        return results
+
+
+    #This method returns (path, Content-Encoding, ETag) of the file to send for a download of a JSON catalog
+    #The best precompressed variant accepted by the client is chosen (see catalog_download.py), None for unknown files
+    def catalog_download(self, FileName, accepted_encodings):
+        if FileName not in self.storage_index.json_files():
+            return None
+        from appdata.catalog_download import select_variant
+        from appdata.compile_cache import CompileCache
+        encoding, path = select_variant(self.storage_location, FileName, accepted_encodings)
+        sha256 = CompileCache(self.storage_location, catalog_product(FileName)).file_hash(FileName)
+        if sha256 is None:
+            # Not written by the compile cache: the file is sent as is, with the ETag of the web server
+            return os.path.join(self.storage_location, FileName), None, None
+        return path, encoding, f"{sha256}-{encoding}" if encoding else sha256
+
+
+    #This method returns the zip bundle of all JSON catalogs, streamed from the files (see catalog_download.py)
+    #The gzip variants are only used if the compile cache still knows them and the catalogs they were written for
+    def catalog_bundle(self):
+        from appdata.catalog_download import CatalogBundle
+        from appdata.compile_cache import CompileCache
+        file_names = self.storage_index.json_files()
+        caches = {}
+        stamps = {}
+        for file_name in file_names:
+            product = catalog_product(file_name)
+            if product not in caches:
+                caches[product] = CompileCache(self.storage_location, product)
+            stamps[file_name] = caches[product].file_stamps(file_name)
+        return CatalogBundle(self.storage_location, file_names, stamps)
+
+
     #This method ensures the storage location
     def ensure_storage_location(self):
         """ensure_storage_location
@@ -180,177 +302,106 @@ class AppDataControl():
 
 
     #This method lists all JSON files in the file system that starts with 'Diag' and ends with '.json'
+    #The names are served from the storage index, without the registered versions of the catalogs (see catalog_update.py)
     def list_json_files(self):
-        directory_path = self.storage_location
-        try:
-            # Check if the directory exists
-            if not os.path.isdir(directory_path):
-                print(f"The directory {directory_path} does not exist.")
-                return []
-
-            # List all files in the directory
-            files = os.listdir(directory_path)
-
-            # Filter out only JSON files
-            json_files = [file for file in files if file.endswith('.json') and file.startswith('Diag')]
-
-            # Return the list of JSON files
-            return json_files
-
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            return []        
+        return self.storage_index.json_files()
 
 
     #The following method creates a copy of a json file. Note that the copy will have a different name that starts with 'AfterReboot' and ends with '.json'
+    #The copy is made on byte level and the registered file is recorded in a small manifest (see after_reboot.py)
     def copy_json_file(self, FileName):
         if FileName is not None:
-            source_path = os.path.join(
-                self.storage_location, FileName)            
-            with open(source_path, 'r', encoding='utf-8') as source_file:
-                data = json.load(source_file) 
-            copy_path = os.path.join(
-                self.storage_location, f"AfterReboot-{FileName}")
-            with open(copy_path, 'w', encoding='utf-8') as destination_file:
-                json.dump(data, destination_file, ensure_ascii=False, indent=2)
+            from appdata.compile_cache import CompileCache
+            sha256 = CompileCache(self.storage_location, catalog_product(FileName)).file_hash(FileName)
+            AfterRebootStore(self.storage_location, self.storage_index).store(FileName, sha256)
                  
 
-    #The following method searches and deletes the file in the file system that starts with 'AfterReboot' and ends with '.json'
+    #The following method creates copies of several registered json files (e.g. all languages registered with one bulk write)
+    def copy_json_files(self, FileNames):
+        from appdata.compile_cache import CompileCache
+        caches = {product: CompileCache(self.storage_location, product)
+                  for product in {catalog_product(file_name) for file_name in FileNames}}
+        AfterRebootStore(self.storage_location, self.storage_index).store_all(
+            [(file_name, caches[catalog_product(file_name)].file_hash(file_name)) for file_name in FileNames])
+
+
+    #The following method records the registered files after an update or a partial unregistration
+    #The copies and the manifest are replaced, the versions of catalogs that are not registered anymore are deleted
+    def store_registered_files(self, FileNames):
+        from appdata.catalog_update import delete_unregistered_versions
+        AppDataControl.copy_json_files(self, FileNames)
+        delete_unregistered_versions(self.storage_location, FileNames, self.storage_index.version_files())
+
+
+    #The following method plans the update of the registered files to the current catalogs (see catalog_update.py)
+    #The registered content is compared with the catalog by diagnosis number, a new version is created for changed files
+    def plan_catalog_update(self, FileNames):
+        from appdata.catalog_update import base_file_name, plan_update
+        from appdata.compile_cache import CompileCache
+        caches = {}
+        current_hashes = {}
+        for file_name in {base_file_name(name) for name in FileNames}:
+            product = catalog_product(file_name)
+            if product not in caches:
+                caches[product] = CompileCache(self.storage_location, product)
+            current_hashes[file_name] = caches[product].file_hash(file_name)
+        return plan_update(self.storage_location, FileNames, AfterRebootStore(self.storage_location, self.storage_index).hashes(),
+                           current_hashes)
+
+
+    #The following method deletes the copy of the registered file that starts with 'AfterReboot' and ends with '.json'
+    #and the registered versions of the catalogs
     def delete_after_reboot_json(self):        
-        files = os.listdir(self.storage_location)
-        if files is not None:            
-            for file in files:                
-                if file.startswith('AfterReboot') and file.endswith('.json'):
-                    file_path = os.path.join(self.storage_location, file)
-                    try:                        
-                        os.remove(file_path)
-                        print(f"Deleted file: {file}")
-                    except OSError as e:
-                        print(f"Error deleting file {file}: {e}")
+        from appdata.catalog_update import delete_unregistered_versions
+        AfterRebootStore(self.storage_location, self.storage_index).delete()
+        delete_unregistered_versions(self.storage_location, [], self.storage_index.version_files())
         
     
-    #This Method searches a file in the file system that starts with 'AfterReboot' and ends with '.json'
+    #This Method searches the copy of the registered file that starts with 'AfterReboot' and ends with '.json'
     def search_file_after_reboot(self):
         directory_path = self.storage_location         
         if not os.path.isdir(directory_path):
             print(f"The directory {directory_path} does not exist.")
             return None         
-        files = os.listdir(directory_path)
-        after_reboot_file = None
-        for file in files:
-            if file.startswith('AfterReboot') and file.endswith('.json'):
-                after_reboot_file = file
-                break  # Exit the loop once the file is found
-        return after_reboot_file  
+        return AfterRebootStore(directory_path, self.storage_index).find()
+
+
+    #This Method searches the copies of all registered files that start with 'AfterReboot' and end with '.json'
+    def search_files_after_reboot(self):
+        directory_path = self.storage_location
+        if not os.path.isdir(directory_path):
+            print(f"The directory {directory_path} does not exist.")
+            return []
+        return AfterRebootStore(directory_path, self.storage_index).find_all()
 
 
     #This method searches for errors in the CSV file 
-    def search_for_error(self):      
-        message = {}
-        languages = None 
+    #The CSV file is parsed once; if it is valid the compiled catalogs are kept for the following save()
+    def search_for_error(self, progress=None):
         csv_path = self.storage_file     
-        with open(csv_path, mode='r', encoding='utf-8-sig') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            rows = list(reader)
-            languages = [header.split('-')[1] for header in reader.fieldnames if header.startswith('text-')]  
-
-            print("INFO check headers correctness: ", check_headers(reader), flush=True)
-            if not check_headers(reader):
-                message['Error in headers'] = "Please make sure all required headers are available"
-                return message
-
-        print("INFO languages: ", languages, flush=True)
-
-        product_name = str(rows[0]['product name'])
-        if not product_name:
-            message['No product name'] = "Please enter product name in row 2"
-            return message
-            
-        previous_detailed_no = None  
-        previous_main_no = None   
-        for i, row in enumerate(rows):
-            excel_row = i + 2
-
-            if not row['mainDiag No'] and not row['detailedDiagnostics No']:
-                if not all(not value for value in row.values()): #if row in excel is not empty
-                    message[f'No main diagnostic number in row {excel_row}'] = "Please enter main diagnostic number"
-
-            if row['detailedDiagnostics No']:
-                if previous_detailed_no is not None and previous_main_no is not None:
-                    if not previous_detailed_no and not previous_main_no:                       
-                        message[f'No main diagnostic No. for detailed diagnostic No. in row {excel_row}'] = "Please make sure that every detailed diagnostic No. has a corresponding main diagnostic No."                 
-             
-            if row['mainDiag No'] and row['detailedDiagnostics No']:
-                message[f'Error in handling diagnostic No. in row {excel_row}'] = "Please make sure that either main or detailed diagnostic No. is described"
-                
-            empty_languages = []
-            for j, lang in enumerate(languages): 
-
-                if row['mainDiag No']:
-
-                    DiagCopyString = str(row['mainDiag No'])   
-
-                    if len(DiagCopyString) != 8:
-                        message[f'size of main diagnostic number not correct in row {excel_row}'] = "Check documentation" 
-                        return message                              
-                    
-                    if DiagCopyString[0] in '0123456789ABCDEF' and DiagCopyString[1] in '0123456789ABCDEF':
-                        if (int(DiagCopyString[:2], 16) != 0x0E) and (int(DiagCopyString[:2], 16) != 0x0F) and not (0x30 <= int(DiagCopyString[:2], 16) <= 0x37):
-                            message[f'Invalid main diagnostic number (first two digits) in row {excel_row}'] = "Check documentation"    
-                    else:
-                        message[f'Invalid main diagnostic number (first two digits) in row {excel_row}'] = "Check documentation"            
-
-                    if DiagCopyString[2] in '01':
-                        if (int(DiagCopyString[2], 2) != 0b0) and (int(DiagCopyString[2], 2) != 0b1):
-                            message[f'Invalid main diagnostic number (third digit) in row {excel_row}'] = "Check documentation"                    
-                    else:
-                        message[f'Invalid main diagnostic number (third digit) in row {excel_row}'] = "Check documentation"
-
-                    if DiagCopyString[3] in '0123456789ABCDEF':
-                        if (int(DiagCopyString[3], 16) != 0xA) and (int(DiagCopyString[3], 16) != 0xE)  and (int(DiagCopyString[3], 16) != 0xF):
-                            message[f'Invalid main diagnostic number (4th digit) in row {excel_row}'] = "Check documentation"                    
-
-                        if DiagCopyString[4] in '0123456789' and DiagCopyString[5] in '0123456789ABCDEF' and DiagCopyString[6] in '0123456789ABCDEF' and DiagCopyString[7] in '0123456789ABCDEF':
-                            if (int(DiagCopyString[3], 16) == 0xA):
-                                if not (0x0000 <= int(DiagCopyString[-4:], 16) <= 0x0FFF):    
-                                    message[f'Invalid main diagnostic number (last four digits) in row {excel_row}'] = "Check documentation"
-
-                            if (int(DiagCopyString[3], 16) == 0xE):
-                                if not (0x0000 <= int(DiagCopyString[-4:], 16) <= 0x0FFF):    
-                                    message[f'Invalid main diagnostic number (last four digits) in row {excel_row}'] = "Check documentation"
-
-                            if (int(DiagCopyString[3], 16) == 0xF):
-                                if (int(DiagCopyString[4]) != 0) and (int(DiagCopyString[4]) != 2) and (int(DiagCopyString[4]) != 6) and (int(DiagCopyString[4]) != 8) and (int(DiagCopyString[4]) != 9):
-                                    message[f'Invalid main diagnostic number (5th digit) in row {excel_row}'] = "Check documentation"
-
-                                if not (0x000 <= int(DiagCopyString[-3:], 16) <= 0xFFF):    
-                                    message[f'Invalid main diagnostic number (last three digits) in row {excel_row}'] = "Check documentation"                    
-                        else:
-                            message[f'Invalid main diagnostic number (last four digits) in row {excel_row}'] = "Check documentation"
-                    else:
-                        message[f'Invalid main diagnostic number (4th digit) in row {excel_row}'] = "Check documentation"  
-
-                    utf8_length = len(str(row[f'text-{lang.upper()}']).encode('utf-8'))
-                    if utf8_length > 60:
-                        message[f'text-{lang.upper()} too long in row {excel_row}'] = "Please shorten the text" 
-
-                elif row['detailedDiagnostics No']:
-                    utf8_length = len(str(row[f'text-{lang.upper()}']).encode('utf-8')) 
-                    if utf8_length > 250:
-                        message[f'text-{lang.upper()} too long in row {excel_row}'] = "Please shorten the text" 
-
-                if not row[f'text-{lang.upper()}']:
-                    empty_languages.append(lang.upper())
-                    print(f"In row {excel_row}", f'text-{lang.upper()}', "is empty") 
-
-            if empty_languages:
-                if not all(not value for value in row.values()): #if row in excel is not empty
-                    message[f'Empty text in row {excel_row}'] = empty_languages 
-
-            previous_detailed_no = row['detailedDiagnostics No']   
-            previous_main_no = row['mainDiag No']    
+        from appdata.diag_validator import compile_and_validate
+        message, builder = compile_and_validate(csv_path, progress=progress)
+        print("INFO languages: ", builder.languages if builder is not None else None, flush=True)
+
+        self._compiled = None
+        if not message and builder is not None:
+            self._compiled = (AppDataControl.file_signature(csv_path), builder.catalogs(), builder.languages)
         
         return message  
 
 
+    #This method returns the compiled catalogs of the CSV file, reusing the result of search_for_error() if the file is unchanged
+    def compiled_catalogs(self, progress=None):
+        csv_path = self.storage_file
+        compiled = self._compiled
+        self._compiled = None
+        if compiled is not None and compiled[0] == AppDataControl.file_signature(csv_path):
+            return compiled[1], compiled[2]
+        return self._convert_csv_to_json(csv_path, progress)
+
 
+    #This method returns a signature that changes whenever a file is rewritten
+    @staticmethod
+    def file_signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
@@ -0,0 +1,193 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import os
+import struct
+import time
+import zlib
+
+from appdata.atomic_file import atomic_write
+
+try:
+    import brotli
+except ImportError:
+    # Optional, without it only the gzip variants are written
+    brotli = None
+
+# Compressed variants of the JSON catalogs are written once, when the catalogs are compiled, into this folder of the
+# storage location: .compressed/<file>.gz and .compressed/<file>.br
+COMPRESSED_FOLDER = ".compressed"
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+# Content-Encoding -> file extension, in the order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+CHUNK_SIZE = 1 << 16
+
+GZIP_HEADER_SIZE = 10
+
+# Zip format (version 2.0, UTF-8 names, no zip64): the members are deflate streams or stored files
+ZIP_MADE_BY_UNIX = (3 << 8) | 20
+ZIP_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+ZIP_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+ZIP_END_RECORD = struct.Struct("<IHHHHIIH")
+
+
+#This function returns the path (relative to the storage location) of a compressed variant of a file
+def compressed_name(file_name, encoding):
+    return os.path.join(COMPRESSED_FOLDER, file_name + dict(ENCODINGS)[encoding])
+
+
+#This function writes the compressed variants of a JSON catalog and returns their names (relative path -> size)
+#The gzip variant has no file name and mtime 0 in its header, so its deflate stream can be put into a zip file as is
+def write_compressed(storage_location, file_name, data):
+    os.makedirs(os.path.join(storage_location, COMPRESSED_FOLDER), exist_ok=True)
+    variants = {compressed_name(file_name, "gzip"): zlib.compress(data, level=GZIP_LEVEL, wbits=31)}
+    if brotli is not None:
+        variants[compressed_name(file_name, "br")] = brotli.compress(data, quality=BROTLI_QUALITY)
+    for name, compressed in variants.items():
+        atomic_write(os.path.join(storage_location, name), compressed)
+    return {name: len(compressed) for name, compressed in variants.items()}
+
+
+#This function returns the encoding and path of the best compressed variant of a file accepted by the client,
+#or (None, path of the file) if none is accepted or available
+def select_variant(storage_location, file_name, accepted):
+    for encoding, _ in ENCODINGS:
+        if encoding in accepted:
+            path = os.path.join(storage_location, compressed_name(file_name, encoding))
+            if os.path.isfile(path):
+                return encoding, path
+    return None, os.path.join(storage_location, file_name)
+
+
+#This function returns the (time, date) of a timestamp in the MS-DOS format of zip files
+def _dos_time(timestamp):
+    t = time.localtime(timestamp)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+#This function returns the stamp of a file as the compile cache records it, or None if it does not exist
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _read_range(file, start, end):
+    file.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = file.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise OSError(f"{file.name} was truncated")
+        remaining -= len(chunk)
+        yield chunk
+
+
+#This function describes one member of a bundle: the deflate stream of the gzip variant if there is one, else the
+#stored file. The CRC and the sizes are taken from the gzip trailer, so nothing is compressed per request.
+#The gzip variant is only used if it and the file still have the stamps ([size, mtime in ns]) recorded by the compile
+#cache when it wrote them (see CompileCache.file_stamps), a file that was replaced may have the same size.
+#The file is opened here, so a catalog that is replaced while the bundle is sent does not change its content
+def _bundle_member(storage_location, file_name, stamps=None):
+    path = os.path.join(storage_location, file_name)
+    gzip_name = compressed_name(file_name, "gzip")
+    if stamps is not None and file_name in stamps and gzip_name in stamps:
+        try:
+            gzip_file = open(os.path.join(storage_location, gzip_name), 'rb')
+        except OSError:
+            gzip_file = None
+        if gzip_file is not None:
+            stat = os.fstat(gzip_file.fileno())
+            header = gzip_file.read(GZIP_HEADER_SIZE)
+            gzip_file.seek(max(0, stat.st_size - 8))
+            trailer = gzip_file.read(8)
+            # Only the plain header written by write_compressed() is supported (deflate, no flags)
+            if [stat.st_size, stat.st_mtime_ns] == stamps[gzip_name] and _stamp(path) == stamps[file_name] and \
+                    header[:4] == b'\x1f\x8b\x08\x00' and len(trailer) == 8:
+                crc, _ = struct.unpack("<II", trailer)
+                size, mtime_ns = stamps[file_name]
+                return {"name": file_name, "file": gzip_file, "start": GZIP_HEADER_SIZE, "end": stat.st_size - 8,
+                        "method": 8, "crc": crc, "size": size, "mtime": mtime_ns / 1e9}
+            gzip_file.close()
+
+    file = open(path, 'rb')
+    size = os.fstat(file.fileno()).st_size
+    crc = 0
+    for chunk in _read_range(file, 0, size):
+        crc = zlib.crc32(chunk, crc)
+    return {"name": file_name, "file": file, "start": 0, "end": size, "method": 0, "crc": crc, "size": size,
+            "mtime": os.fstat(file.fileno()).st_mtime}
+
+
+#This class streams the JSON catalogs as one zip file without building it in memory
+#The members are described up front, so the size of the zip file is known before it is sent
+class CatalogBundle():
+    """CatalogBundle
+    """
+    #stamps: file name -> stamps recorded by the compile cache (see CompileCache.file_stamps), or None if not known
+    def __init__(self, storage_location, file_names, stamps=None):
+        """__init__
+        """
+        stamps = stamps or {}
+        self.members = []
+        try:
+            for file_name in file_names:
+                self.members.append(_bundle_member(storage_location, file_name, stamps.get(file_name)))
+        except BaseException:
+            self.close()
+            raise
+        offset = 0
+        for member in self.members:
+            member["offset"] = offset
+            offset += ZIP_LOCAL_HEADER.size + len(member["name"].encode('utf-8')) + member["end"] - member["start"]
+        self._central_directory = b''.join(self._central_header(member) for member in self.members)
+        self.size = offset + len(self._central_directory) + ZIP_END_RECORD.size
+        if self.size > 0xffffffff or len(self.members) > 0xffff:
+            self.close()
+            raise ValueError("The catalogs are too large for a zip file without zip64")
+
+
+    #The following method returns an identifier of the content, used as ETag
+    def etag(self):
+        digest = hashlib.sha1()
+        for member in self.members:
+            digest.update(f"{member['name']}:{member['crc']:08x}:{member['size']};".encode('utf-8'))
+        return digest.hexdigest()
+
+
+    def _central_header(self, member):
+        name = member["name"].encode('utf-8')
+        dos_time, dos_date = _dos_time(member["mtime"])
+        return ZIP_CENTRAL_HEADER.pack(0x02014b50, ZIP_MADE_BY_UNIX, 20, 0x0800, member["method"], dos_time, dos_date,
+                                       member["crc"], member["end"] - member["start"], member["size"], len(name),
+                                       0, 0, 0, 0, 0o100644 << 16, member["offset"]) + name
+
+
+    #The following method yields the zip file in chunks
+    def __iter__(self):
+        for member in self.members:
+            name = member["name"].encode('utf-8')
+            dos_time, dos_date = _dos_time(member["mtime"])
+            yield ZIP_LOCAL_HEADER.pack(0x04034b50, 20, 0x0800, member["method"], dos_time, dos_date, member["crc"],
+                                        member["end"] - member["start"], member["size"], len(name), 0) + name
+            yield from _read_range(member["file"], member["start"], member["end"])
+        yield self._central_directory
+        yield ZIP_END_RECORD.pack(0x06054b50, 0, 0, len(self.members), len(self.members),
+                                  len(self._central_directory), self.size - len(self._central_directory)
+                                  - ZIP_END_RECORD.size, 0)
+
+
+    #The following method closes the files, the web server calls it when the response is finished or aborted
+    def close(self):
+        for member in self.members:
+            member["file"].close()
@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import re
+
+from appdata.after_reboot import AFTER_REBOOT_PREFIX, atomic_copy
+from appdata.atomic_file import file_sha256
+
+# A registered catalog is updated by registering a new version of it, 'Diag<LANG>.<hash>.json', before the old
+# version is unregistered; the hash is the start of the SHA-256 of the content
+VERSIONED_CATALOG = re.compile(r'(Diag[A-Za-z0-9_]+)\.([0-9a-f]{12})\.json')
+
+
+#This function returns the name of the version of a catalog file with the given content hash
+def versioned_file_name(file_name, sha256):
+    return f"{file_name[:-len('.json')]}.{sha256[:12]}.json"
+
+
+#This function returns the name of the catalog file a registered file is a version of (the name itself if it is none)
+def base_file_name(file_name):
+    match = VERSIONED_CATALOG.fullmatch(file_name)
+    return f"{match.group(1)}.json" if match else file_name
+
+
+#This function returns the texts of a catalog keyed by main diagnosis number and main/detailed diagnosis number
+def catalog_texts(catalog):
+    texts = {}
+    for main_no, main in catalog.get("mainDiagnostics", {}).items():
+        texts[main_no] = main.get("text")
+        for detailed_no, detailed in main.get("detailedDiagnostics", {}).items():
+            texts[f"{main_no}/{detailed_no}"] = detailed.get("text")
+    return texts
+
+
+#This function compares two catalogs and returns the number of added, removed and changed texts
+def catalog_diff(old_catalog, new_catalog):
+    old_texts = catalog_texts(old_catalog)
+    new_texts = catalog_texts(new_catalog)
+    diff = {
+        "added": sum(1 for key in new_texts if key not in old_texts),
+        "removed": sum(1 for key in old_texts if key not in new_texts),
+        "changed": sum(1 for key, text in new_texts.items() if key in old_texts and old_texts[key] != text),
+    }
+    if old_catalog.get("product") != new_catalog.get("product"):
+        diff["product"] = new_catalog.get("product")
+    return diff
+
+
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as json_file:
+        return json.load(json_file)
+
+
+#This function plans the update of the registered files to the current catalogs in the storage location
+#The registered content is the copy made at registration (see after_reboot.py), registered_hashes are the hashes of
+#the manifest. For every registered file it returns {"registered", "file", "diff", "version"}; "version" is the new
+#version to register (the file is created), or None if the texts did not change and nothing needs to be registered
+def plan_update(storage_location, registered_files, registered_hashes, current_hashes):
+    plans = []
+    for registered in registered_files:
+        file_name = base_file_name(registered)
+        path = os.path.join(storage_location, file_name)
+        sha256 = current_hashes.get(file_name) or file_sha256(path)
+        plan = {"registered": registered, "file": file_name, "diff": None, "version": None}
+        plans.append(plan)
+        if registered_hashes.get(registered) == sha256:
+            continue
+
+        old_path = os.path.join(storage_location, AFTER_REBOOT_PREFIX + registered)
+        if not os.path.isfile(old_path):
+            old_path = os.path.join(storage_location, registered)
+        try:
+            plan["diff"] = catalog_diff(_load(old_path), _load(path))
+        except (OSError, ValueError) as e:
+            # The registered content is not known: the file is registered again
+            print("WARNING Comparing", registered, "with", file_name, "failed:", e, flush=True)
+        if plan["diff"] is not None and not any(plan["diff"].values()):
+            continue
+
+        plan["version"] = versioned_file_name(file_name, sha256)
+        atomic_copy(path, os.path.join(storage_location, plan["version"]))
+    return plans
+
+
+#This function deletes the versions of catalogs that are not registered (anymore)
+#files are the names of the files of the storage location, if they are known (see storage_index.py)
+def delete_unregistered_versions(storage_location, registered_files, files=None):
+    if files is None:
+        try:
+            files = os.listdir(storage_location)
+        except OSError:
+            return
+    for file in files:
+        if VERSIONED_CATALOG.fullmatch(file) and file not in registered_files:
+            try:
+                os.remove(os.path.join(storage_location, file))
+            except OSError as e:
+                print(f"Error deleting file {file}: {e}")
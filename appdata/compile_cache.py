@@ -0,0 +1,190 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import json
+import os
+
+from appdata.atomic_file import atomic_write, file_sha256
+from appdata.catalog_download import COMPRESSED_FOLDER, write_compressed
+from appdata.diag_catalog_bin import catalog_to_bytes
+from appdata.diag_compiler import GENERATOR_VERSION
+
+CACHE_FILE_NAME = ".compile-cache.json"
+
+
+#This function serializes the catalog of one language exactly as it is written to Diag<LANG>.json
+def serialize_catalog(catalog):
+    return json.dumps(catalog, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+#This function returns the name of the catalog file of a language
+#The catalogs of Diag.csv are Diag<LANG>.json, those of a product CSV Diag_<PRODUCT>.csv are Diag_<PRODUCT>_<LANG>.json
+def catalog_file_name(language, product=None, extension='json'):
+    if product:
+        return f'Diag_{product}_{language.upper()}.{extension}'
+    return f'Diag{language.upper()}.{extension}'
+
+
+#This function returns the stamp of a file recorded in the cache: [size, modification time in ns]
+def file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+#This function checks if files (name -> stamp) in the storage location are still the ones that were written
+#A file that was replaced or edited has another modification time, even if its size is the same
+def files_are_current(storage_location, files):
+    try:
+        return all(file_stamp(os.path.join(storage_location, file_name)) == stamp
+                   for file_name, stamp in files.items())
+    except OSError:
+        return False
+
+
+#This function writes the files of one language if its content changed and returns the cache entry and the written files
+#The compressed variants of the JSON file for downloads are written with it (see catalog_download.py)
+#With binary=True the compact binary catalog (see diag_catalog_bin.py) is written next to the JSON file
+#It is called by CompileCache.write_catalogs and by the worker processes of parallel_compiler.py
+def write_language(storage_location, catalog, language, cached=None, binary=False, product=None):
+    file_name = catalog_file_name(language, product)
+    data = serialize_catalog(catalog)
+    entry = {"sha256": hashlib.sha256(data).hexdigest(), "files": {}}
+    written = []
+
+    changed = cached is None or cached.get("sha256") != entry["sha256"]
+    cached_files = cached.get("files", {}) if not changed else {}
+    stamp = cached_files.get(file_name)
+    if stamp is None or not files_are_current(storage_location, {file_name: stamp}):
+        atomic_write(os.path.join(storage_location, file_name), data)
+        written.append(file_name)
+        stamp = file_stamp(os.path.join(storage_location, file_name))
+    entry["files"][file_name] = stamp
+
+    compressed = {name: stamp for name, stamp in cached_files.items() if name.startswith(COMPRESSED_FOLDER)}
+    if not compressed or not files_are_current(storage_location, compressed):
+        compressed = {name: file_stamp(os.path.join(storage_location, name))
+                      for name in write_compressed(storage_location, file_name, data)}
+    entry["files"].update(compressed)
+
+    if binary:
+        binary_name = catalog_file_name(language, product, 'bin')
+        stamp = cached_files.get(binary_name)
+        if stamp is None or not files_are_current(storage_location, {binary_name: stamp}):
+            atomic_write(os.path.join(storage_location, binary_name), catalog_to_bytes(catalog))
+            written.append(binary_name)
+            stamp = file_stamp(os.path.join(storage_location, binary_name))
+        entry["files"][binary_name] = stamp
+
+    return entry, written
+
+
+#This class remembers which CSV content was compiled into which language files, so unchanged catalogs are not rewritten
+#The cache is stored next to the catalogs in the storage location, one cache file per product
+class CompileCache():
+    """CompileCache
+    """
+    def __init__(self, storage_location, product=None):
+        """__init__
+        """
+        self.storage_location = storage_location
+        self.product = product
+        cache_file_name = f".compile-cache_{product}.json" if product else CACHE_FILE_NAME
+        self.cache_path = os.path.join(storage_location, cache_file_name)
+        self._entries = self._load()
+
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        if entries.get("generator") != GENERATOR_VERSION:
+            return {}
+        return entries
+
+
+    #The following method checks if the files of a language are still the ones written for the cached entry
+    def _file_is_current(self, entry):
+        try:
+            return files_are_current(self.storage_location, entry["files"])
+        except KeyError:
+            return False
+
+
+    #The following method returns True if the CSV content was already compiled and all language files are in place
+    def is_up_to_date(self, csv_hash, binary=False):
+        if self._entries.get("csv_sha256") != csv_hash or self._entries.get("binary", False) != binary:
+            return False
+        languages = self._entries.get("languages", {})
+        return bool(languages) and all(self._file_is_current(entry) for entry in languages.values())
+
+
+    #The following method returns the cached entries of the languages (language -> entry)
+    def language_entries(self):
+        return dict(self._entries.get("languages", {}))
+
+
+    #The following method returns the entry of the language a JSON file was written for, or None if it is not known or
+    #one of the files of the language changed
+    def _current_entry(self, file_name):
+        for entry in self._entries.get("languages", {}).values():
+            if file_name in entry.get("files", {}) and file_name.endswith('.json'):
+                return entry if self._file_is_current(entry) else None
+        return None
+
+
+    #The following method returns the recorded hash of a JSON file written by the cache, or None if it is not known or changed
+    def file_hash(self, file_name):
+        entry = self._current_entry(file_name)
+        return entry["sha256"] if entry is not None else None
+
+
+    #The following method returns the recorded stamps (name -> stamp) of a JSON file and of the files written with it
+    #(its compressed variants), or None if it is not known or changed
+    def file_stamps(self, file_name):
+        entry = self._current_entry(file_name)
+        return dict(entry["files"]) if entry is not None else None
+
+
+    #The following method writes the catalogs whose content changed and returns the names of the written files
+    #progress is called with the number of languages done after every language
+    def write_catalogs(self, csv_hash, catalogs, languages, binary=False, progress=None):
+        cached_languages = self.language_entries()
+        new_languages = {}
+        written = []
+
+        try:
+            for catalog, language in zip(catalogs, languages):
+                entry, files = write_language(self.storage_location, catalog, language,
+                                              cached_languages.get(language.upper()), binary, self.product)
+                new_languages[language.upper()] = entry
+                written.extend(files)
+                if progress is not None:
+                    progress(languages_done=len(new_languages), languages=len(languages))
+        except BaseException:
+            # Interrupted (e.g. a cancelled job): the files written so far are recorded, but not the CSV content,
+            # so the next save compiles it again
+            self.store(None, {**cached_languages, **new_languages}, binary)
+            raise
+
+        self.store(csv_hash, new_languages, binary)
+        return written
+
+
+    #The following method records the entries of the languages written for a CSV content
+    def store(self, csv_hash, languages, binary=False):
+        self._entries = {
+            "generator": GENERATOR_VERSION,
+            "csv_sha256": csv_hash,
+            "binary": binary,
+            "languages": languages
+        }
+        atomic_write(self.cache_path, json.dumps(self._entries, indent=2).encode('utf-8'))
+
+
+#This function returns the hash used as cache key of a CSV file
+def csv_content_hash(csv_path):
+    return file_sha256(csv_path)
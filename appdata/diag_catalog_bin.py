@@ -0,0 +1,187 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Compact binary format of a diagnostics catalog that can be memory-mapped.
+#
+# Layout (little endian):
+#   header        MAGIC, format version, key width, counts, offsets and file size (see HEADER)
+#   main table    one record per main diagnostic, sorted by number
+#   detailed tab. one record per detailed diagnostic, grouped by main diagnostic and sorted by number
+#   string table  UTF-8 texts, identical texts are stored once
+#
+# Diagnostic numbers are stored as fixed-width UTF-8 keys padded with zero bytes, so a
+# single text can be found with a binary search directly on the mapped file.
+
+import mmap
+import os
+import struct
+
+MAGIC = b'DIAGCAT\0'
+FORMAT_VERSION = 2
+
+# magic, version, key width, product offset, product length, main count, detailed count,
+# main table offset, detailed table offset, file size
+HEADER = struct.Struct('<8sHHIIIIIII')
+
+# text offset, text length, version, first detailed record, detailed count
+MAIN_RECORD = struct.Struct('<IIIII')
+
+# text offset, text length
+DETAILED_RECORD = struct.Struct('<II')
+
+# Text length that marks a missing (null) text
+NULL_TEXT = 0xFFFFFFFF
+
+
+#This class collects the texts of a catalog, storing identical texts once
+class _StringTable():
+
+    def __init__(self, base):
+        self._base = base
+        self._offsets = {}
+        self._chunks = []
+        self._size = 0
+
+    def add(self, text):
+        if text is None:
+            return 0, NULL_TEXT
+        data = text.encode('utf-8')
+        offset = self._offsets.get(data)
+        if offset is None:
+            offset = self._offsets[data] = self._base + self._size
+            self._chunks.append(data)
+            self._size += len(data)
+        return offset, len(data)
+
+    def to_bytes(self):
+        return b''.join(self._chunks)
+
+
+def _encode_key(number, key_width):
+    return str(number).encode('utf-8').ljust(key_width, b'\0')
+
+
+#This function converts a catalog (as written to Diag<LANG>.json) to the binary format
+def catalog_to_bytes(catalog):
+    main_diagnostics = catalog["mainDiagnostics"]
+    main_numbers = sorted(main_diagnostics)
+    detailed_numbers = [sorted(main_diagnostics[number].get('detailedDiagnostics', {})) for number in main_numbers]
+
+    key_width = max([8] + [len(number.encode('utf-8')) for number in main_numbers] +
+                    [len(number.encode('utf-8')) for numbers in detailed_numbers for number in numbers])
+    detailed_count = sum(len(numbers) for numbers in detailed_numbers)
+
+    main_table_offset = HEADER.size
+    detailed_table_offset = main_table_offset + len(main_numbers) * (key_width + MAIN_RECORD.size)
+    strings = _StringTable(detailed_table_offset + detailed_count * (key_width + DETAILED_RECORD.size))
+    product_offset, product_length = strings.add(catalog.get("product"))
+
+    main_table = bytearray()
+    detailed_table = bytearray()
+    first_detailed = 0
+    for number, numbers in zip(main_numbers, detailed_numbers):
+        entry = main_diagnostics[number]
+        text_offset, text_length = strings.add(entry.get("text"))
+        main_table += _encode_key(number, key_width)
+        main_table += MAIN_RECORD.pack(text_offset, text_length, entry.get("version", 1), first_detailed, len(numbers))
+
+        detailed_diagnostics = entry.get('detailedDiagnostics', {})
+        for detailed_number in numbers:
+            text_offset, text_length = strings.add(detailed_diagnostics[detailed_number].get("text"))
+            detailed_table += _encode_key(detailed_number, key_width)
+            detailed_table += DETAILED_RECORD.pack(text_offset, text_length)
+        first_detailed += len(numbers)
+
+    string_table = strings.to_bytes()
+    size = HEADER.size + len(main_table) + len(detailed_table) + len(string_table)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, key_width, product_offset, product_length,
+                         len(main_numbers), detailed_count, main_table_offset, detailed_table_offset, size)
+    return header + bytes(main_table) + bytes(detailed_table) + string_table
+
+
+#This class looks up single texts in a binary catalog file without parsing the whole file
+class CatalogReader():
+    """CatalogReader
+    """
+    def __init__(self, path):
+        """__init__
+        """
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is not a diagnostics catalog: the file is truncated")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.key_width, product_offset, product_length, self.main_count, self.detailed_count,
+         self._main_offset, self._detailed_offset, size) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a diagnostics catalog of version {FORMAT_VERSION}")
+
+        self._main_size = self.key_width + MAIN_RECORD.size
+        self._detailed_size = self.key_width + DETAILED_RECORD.size
+        # A file that was cut off (e.g. copied partially) is rejected here, not at the first lookup
+        if (len(self._map) != size or self._main_offset + self.main_count * self._main_size > self._detailed_offset
+                or self._detailed_offset + self.detailed_count * self._detailed_size > size):
+            self._map.close()
+            raise ValueError(f"{path} is not a diagnostics catalog: the file is truncated or corrupt")
+        self.product = self._text(product_offset, product_length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """close"""
+        self._map.close()
+
+    def _text(self, offset, length):
+        if length == NULL_TEXT:
+            return None
+        if offset + length > len(self._map):
+            raise ValueError("The diagnostics catalog is corrupt: a text is outside of the file")
+        return self._map[offset:offset + length].decode('utf-8')
+
+    def _key(self, offset):
+        return self._map[offset:offset + self.key_width]
+
+    def _search(self, key, table_offset, record_size, low, high):
+        while low < high:
+            middle = (low + high) // 2
+            current = self._key(table_offset + middle * record_size)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return table_offset + middle * record_size + self.key_width
+        return None
+
+    #The following method returns the text of a main diagnostic or of one of its detailed diagnostics (None if not found)
+    def lookup(self, main_diag_no, detailed_diag_no=None):
+        key = _encode_key(main_diag_no, self.key_width)
+        if len(key) > self.key_width:
+            return None
+        record = self._search(key, self._main_offset, self._main_size, 0, self.main_count)
+        if record is None:
+            return None
+
+        text_offset, text_length, _, first_detailed, detailed_count = MAIN_RECORD.unpack_from(self._map, record)
+        if detailed_diag_no is None:
+            return self._text(text_offset, text_length)
+        key = _encode_key(detailed_diag_no, self.key_width)
+        if len(key) > self.key_width:
+            return None
+
+        record = self._search(key, self._detailed_offset, self._detailed_size,
+                              first_detailed, first_detailed + detailed_count)
+        if record is None:
+            return None
+        return self._text(*DETAILED_RECORD.unpack_from(self._map, record))
+
+    #The following method yields all main diagnostic numbers in sorted order
+    def main_numbers(self):
+        for i in range(self.main_count):
+            yield self._key(self._main_offset + i * self._main_size).rstrip(b'\0').decode('utf-8')
@@ -0,0 +1,120 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import csv
+
+# Increase whenever the generated catalogs change for the same CSV input
+GENERATOR_VERSION = 3
+
+CSV_DELIMITER = ';'
+CSV_ENCODING = 'utf-8-sig'
+TEXT_PREFIX = 'text-'
+
+PRODUCT_HEADER = 'product name'
+MAIN_HEADER = 'mainDiag No'
+DETAILED_HEADER = 'detailedDiagnostics No'
+
+# Number of rows after which the progress callback of a compilation or validation is called
+PROGRESS_INTERVAL = 5000
+
+
+#This class builds the mainDiagnostics tree of every language while the rows of the CSV file are fed in one by one
+class CatalogBuilder():
+    """CatalogBuilder
+    """
+    def __init__(self, fieldnames, languages=None):
+        """__init__
+        """
+        self.fieldnames = list(fieldnames)
+        # If languages is given, only the text columns of these languages are compiled
+        self.text_columns = [i for i, header in enumerate(self.fieldnames) if header.startswith(TEXT_PREFIX)
+                             and (languages is None or header.split('-')[1] in languages)]
+        self.languages = [self.fieldnames[i].split('-')[1] for i in self.text_columns]
+        self.product_column = self.fieldnames.index(PRODUCT_HEADER)
+        self.main_column = self.fieldnames.index(MAIN_HEADER)
+        self.detailed_column = self.fieldnames.index(DETAILED_HEADER)
+        self.width = len(self.fieldnames)
+
+        self.product_name = None
+        self.row_count = 0
+
+        # One mainDiagnostics dict per language, filled in parallel
+        self._trees = [{} for _ in self.languages]
+
+        # Entries of the current main diagnostic, one per language
+        self._current_main = None
+
+
+    #The following method adds one parsed CSV row (a list of strings) to all language trees
+    def add_row(self, row):
+        if len(row) < self.width:
+            row = row + [None] * (self.width - len(row))
+
+        if self.product_name is None:
+            self.product_name = str(row[self.product_column])
+        self.row_count += 1
+
+        main_diag_no = row[self.main_column]
+        detailed_diag_no = row[self.detailed_column]
+        texts = [row[column] for column in self.text_columns]
+
+        if main_diag_no:
+            key = str(main_diag_no)
+            entries = []
+            for tree, text in zip(self._trees, texts):
+                entry = {"text": text, "version": 1}
+                tree[key] = entry
+                entries.append(entry)
+            self._current_main = entries
+
+        if detailed_diag_no and self._current_main is not None:
+            key = str(detailed_diag_no)
+            for entry, text in zip(self._current_main, texts):
+                detailed = entry.get('detailedDiagnostics')
+                if detailed is None:
+                    detailed = entry['detailedDiagnostics'] = {}
+                detailed[key] = {"text": text}
+
+
+    #The following method returns the catalog of one language
+    def catalog(self, index):
+        return {
+            "product": self.product_name,
+            "mainDiagnostics": self._trees[index]
+        }
+
+
+    #The following method returns the catalogs of all languages in the order of the language columns
+    def catalogs(self):
+        return [self.catalog(i) for i in range(len(self.languages))]
+
+
+#This function yields the rows of a Diag.csv file object, skipping blank lines
+def iter_csv_rows(file):
+    for row in csv.reader(file, delimiter=CSV_DELIMITER):
+        if row:
+            yield row
+
+
+#This function returns the languages of the text columns of a CSV file, only the header is read
+def read_languages(csv_path):
+    with open(csv_path, mode='r', encoding=CSV_ENCODING, newline='') as file:
+        fieldnames = next(iter_csv_rows(file), [])
+    return [header.split('-')[1] for header in fieldnames if header.startswith(TEXT_PREFIX)]
+
+
+#This function compiles the catalogs of all languages (or of the given languages) with a single pass over the CSV file
+#progress is called with the number of rows processed every PROGRESS_INTERVAL rows (see app/job_queue.py)
+def compile_csv(csv_path, languages=None, progress=None):
+    with open(csv_path, mode='r', encoding=CSV_ENCODING, newline='') as file:
+        rows = iter_csv_rows(file)
+        builder = CatalogBuilder(next(rows), languages)
+        for row in rows:
+            builder.add_row(row)
+            if progress is not None and builder.row_count % PROGRESS_INTERVAL == 0:
+                progress(rows=builder.row_count)
+    if progress is not None:
+        progress(rows=builder.row_count)
+
+    return builder.catalogs(), builder.languages
@@ -0,0 +1,207 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import re
+
+from appdata.diag_compiler import (CSV_ENCODING, TEXT_PREFIX, PRODUCT_HEADER, MAIN_HEADER, DETAILED_HEADER,
+                                   PROGRESS_INTERVAL, CatalogBuilder, iter_csv_rows)
+
+HEX_DIGITS = '0123456789ABCDEF'
+DEC_DIGITS = '0123456789'
+
+MAIN_TEXT_LIMIT = 60
+DETAILED_TEXT_LIMIT = 250
+
+# A main diagnostic number that passes every rule of the documentation
+VALID_MAIN_DIAG_NO = re.compile(r'(?:0[EF]|3[0-7])[01](?:[AE]0|F[02689])[0-9A-F]{3}')
+
+# Allowed values of the first two digits of a main diagnostic number
+VALID_FIRST_TWO_DIGITS = frozenset(['0E', '0F'] + [f'3{i}' for i in range(8)])
+
+
+#This function checks if the required headers are available in a list of headers
+def has_required_headers(headers):
+    required_headers = {PRODUCT_HEADER, MAIN_HEADER, DETAILED_HEADER}
+    return required_headers.issubset(headers) and any(header.startswith(TEXT_PREFIX) for header in headers)
+
+
+#This function returns the errors of a main diagnostic number with 8 characters, one entry per failed rule
+def main_diag_no_errors(number):
+    if VALID_MAIN_DIAG_NO.fullmatch(number):
+        return ()
+
+    errors = []
+    if number[:2] not in VALID_FIRST_TWO_DIGITS:
+        errors.append('first two digits')
+
+    if number[2] not in '01':
+        errors.append('third digit')
+
+    if number[3] in HEX_DIGITS:
+        if number[3] not in 'AEF':
+            errors.append('4th digit')
+
+        if number[4] in DEC_DIGITS and all(digit in HEX_DIGITS for digit in number[5:]):
+            if number[3] in 'AE' and number[4] != '0':
+                errors.append('last four digits')
+            if number[3] == 'F' and number[4] not in '02689':
+                errors.append('5th digit')
+        else:
+            errors.append('last four digits')
+    else:
+        errors.append('4th digit')
+
+    return errors
+
+
+#This function returns the size of a text in bytes when encoded as UTF-8
+def utf8_length(text):
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-8'))
+
+
+#This class validates the rows of a Diag.csv file while they are fed in one by one and collects all errors
+class DiagValidator():
+    """DiagValidator
+    """
+    def __init__(self, fieldnames):
+        """__init__
+        """
+        self.fieldnames = list(fieldnames)
+        self.message = {}
+        self.row_count = 0
+
+        self.headers_ok = has_required_headers(self.fieldnames)
+        if not self.headers_ok:
+            self.message['Error in headers'] = "Please make sure all required headers are available"
+            return
+
+        self.languages = [header.split('-')[1] for header in self.fieldnames if header.startswith(TEXT_PREFIX)]
+        self.text_headers = [f'text-{lang.upper()}' for lang in self.languages]
+        self.text_columns = [i for i, header in enumerate(self.fieldnames) if header.startswith(TEXT_PREFIX)]
+        self.product_column = self.fieldnames.index(PRODUCT_HEADER)
+        self.main_column = self.fieldnames.index(MAIN_HEADER)
+        self.detailed_column = self.fieldnames.index(DETAILED_HEADER)
+        self.width = len(self.fieldnames)
+
+        self._previous_main_no = None
+        self._previous_detailed_no = None
+
+
+    #The following method validates one parsed CSV row (a list of strings)
+    def add_row(self, row):
+        if not self.headers_ok:
+            return
+
+        if len(row) < self.width:
+            row = row + [''] * (self.width - len(row))
+
+        message = self.message
+        excel_row = self.row_count + 2
+        self.row_count += 1
+
+        main_diag_no = row[self.main_column]
+        detailed_diag_no = row[self.detailed_column]
+        row_not_empty = any(row)
+
+        if excel_row == 2 and not row[self.product_column]:
+            message['No product name'] = "Please enter product name in row 2"
+
+        if not main_diag_no and not detailed_diag_no and row_not_empty:
+            message[f'No main diagnostic number in row {excel_row}'] = "Please enter main diagnostic number"
+
+        if detailed_diag_no and self._previous_detailed_no == '' and self._previous_main_no == '':
+            message[f'No main diagnostic No. for detailed diagnostic No. in row {excel_row}'] = "Please make sure that every detailed diagnostic No. has a corresponding main diagnostic No."
+
+        if main_diag_no and detailed_diag_no:
+            message[f'Error in handling diagnostic No. in row {excel_row}'] = "Please make sure that either main or detailed diagnostic No. is described"
+
+        # The diagnostic number does not depend on the language, so it is checked once per row
+        if main_diag_no:
+            if len(main_diag_no) != 8:
+                message[f'size of main diagnostic number not correct in row {excel_row}'] = "Check documentation"
+            else:
+                for error in main_diag_no_errors(main_diag_no):
+                    message[f'Invalid main diagnostic number ({error}) in row {excel_row}'] = "Check documentation"
+            limit = MAIN_TEXT_LIMIT
+        elif detailed_diag_no:
+            limit = DETAILED_TEXT_LIMIT
+        else:
+            limit = None
+
+        # The texts of all languages are checked in one step
+        texts = [row[column] or '' for column in self.text_columns]
+        if limit is not None:
+            for header in [header for header, text in zip(self.text_headers, texts) if len(text) > limit // 4 and utf8_length(text) > limit]:
+                message[f'{header} too long in row {excel_row}'] = "Please shorten the text"
+
+        if row_not_empty and not all(texts):
+            message[f'Empty text in row {excel_row}'] = [lang.upper() for lang, text in zip(self.languages, texts) if not text]
+
+        self._previous_main_no = main_diag_no
+        self._previous_detailed_no = detailed_diag_no
+
+
+    #The following method finishes the validation and returns the collected errors
+    def result(self):
+        if self.headers_ok and self.row_count == 0:
+            self.message['No product name'] = "Please enter product name in row 2"
+        return self.message
+
+
+#This class feeds parsed CSV rows to the validator and, if requested, to the catalog builder
+#The first row fed in is the header row
+class DiagPipeline():
+    """DiagPipeline
+    """
+    def __init__(self, compile=True):
+        """__init__
+        """
+        self.compile = compile
+        self.validator = None
+        self.builder = None
+
+
+    #The following method adds one parsed CSV row (a list of strings)
+    def add_row(self, row):
+        if self.validator is None:
+            self.validator = DiagValidator(row)
+            if self.compile and self.validator.headers_ok:
+                self.builder = CatalogBuilder(row)
+            return
+
+        self.validator.add_row(row)
+        if self.builder is not None:
+            self.builder.add_row(row)
+
+
+    #The following method returns the collected errors and the builder (None if not requested or if the headers are not valid)
+    def result(self):
+        if self.validator is None:
+            self.validator = DiagValidator([])
+        return self.validator.result(), self.builder
+
+
+#This function parses the CSV file once and feeds every row to the validator and, if requested, to the catalog builder
+#progress is called with the number of rows processed every PROGRESS_INTERVAL rows
+def compile_and_validate(csv_path, compile=True, progress=None):
+    pipeline = DiagPipeline(compile)
+    rows = 0
+    with open(csv_path, mode='r', encoding=CSV_ENCODING, newline='') as file:
+        for row in iter_csv_rows(file):
+            pipeline.add_row(row)
+            rows += 1
+            if progress is not None and rows % PROGRESS_INTERVAL == 0:
+                progress(rows=rows - 1)
+    if progress is not None:
+        progress(rows=max(0, rows - 1))
+
+    return pipeline.result()
+
+
+#This function returns the errors of a CSV file without compiling it
+def validate_csv(csv_path):
+    message, _ = compile_and_validate(csv_path, compile=False)
+    return message
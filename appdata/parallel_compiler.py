@@ -0,0 +1,153 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from appdata.compile_cache import CompileCache, csv_content_hash, write_language
+from appdata.diag_compiler import compile_csv, read_languages
+
+
+#This function runs in a worker process: it compiles the CSV file of a product in one pass over the file (all
+#languages at once) and writes the catalog files of all its languages
+#Only the cache entries and the names of the written files are sent back, not the catalogs
+def compile_product(csv_path, storage_location, product, cached_entries, binary):
+    catalogs, languages = compile_csv(csv_path)
+    entries = {}
+    written = []
+    for catalog, language in zip(catalogs, languages):
+        entry, files = write_language(storage_location, catalog, language, cached_entries.get(language.upper()),
+                                      binary, product)
+        entries[language.upper()] = entry
+        written.extend(files)
+    return entries, written
+
+
+#This function compiles the CSV files of several products (product -> CSV path, None is the product of Diag.csv)
+#Every product is compiled by one worker of a pool of worker processes, the largest products first, so a rebuild
+#of all products takes about as long as the largest product. Products whose CSV content is unchanged are skipped.
+#progress is called with products_done and products after every finished product (see app/job_queue.py)
+#It returns product -> names of the written files, or None if the compilation of the product failed
+def compile_products(storage_location, products: dict, binary=False, workers=None, force=False, progress=None):
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    jobs = []
+    for product, csv_path in products.items():
+        cache = CompileCache(storage_location, product)
+        csv_hash = csv_content_hash(csv_path)
+        if not force and cache.is_up_to_date(csv_hash, binary):
+            results[product] = []
+            continue
+        languages = read_languages(csv_path)
+        if not languages:
+            print("ERROR No text columns in", csv_path, flush=True)
+            results[product] = None
+            continue
+        jobs.append((os.path.getsize(csv_path), product, csv_path, cache, csv_hash, languages))
+    if progress is not None:
+        progress(products_done=len(results), products=len(products))
+    if not jobs:
+        return results
+
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    tasks = [{"product": product, "csv_path": csv_path, "cached": cache.language_entries()}
+             for _, product, csv_path, cache, _, _ in jobs]
+    request = {"storage_location": storage_location, "binary": binary, "workers": min(workers, len(jobs)),
+               "tasks": tasks}
+
+    # The cache of a product is stored as soon as its outcome arrives, so the products finished before a
+    # cancellation (an exception of progress) are not compiled again
+    def on_outcome(index, outcome):
+        _, product, csv_path, cache, csv_hash, languages = jobs[index]
+        if "error" in outcome:
+            print("ERROR Compiling", csv_path, "failed:", outcome["error"], flush=True)
+            results[product] = None
+        else:
+            entries = outcome["entries"]
+            cache.store(csv_hash, {language.upper(): entries[language.upper()] for language in languages}, binary)
+            results[product] = outcome["written"]
+        if progress is not None:
+            progress(products_done=len(results), products=len(products))
+
+    try:
+        run_compiler_process(request, on_outcome)
+    except (OSError, RuntimeError, ValueError) as e:
+        print("ERROR Compiling", [job[2] for job in jobs], "failed:", e, flush=True)
+        for _, product, _, _, _, _ in jobs:
+            results.setdefault(product, None)
+    return results
+
+
+# Command of the compiler process. Its main module is '-c', so the workers it starts do not import any main module
+COMPILER_COMMAND = "import sys; from appdata.parallel_compiler import main; main(*sys.argv[1:])"
+
+
+#This function runs the worker pool in a separate Python process (see main()) and calls on_outcome with the index
+#of the task and its outcome as soon as a product is finished; the outcomes are sent as JSON lines through a pipe.
+#The app process runs threads (web server, Data Layer, storage index, job queue), so it is not forked; and workers
+#started with spawn or forkserver from the app would run main.py again. The compiler process has a single thread
+#and only imports the appdata modules it needs. If on_outcome raises, the compiler process is terminated
+def run_compiler_process(request, on_outcome):
+    with tempfile.TemporaryDirectory(prefix="diag-compile-") as folder:
+        request_path = os.path.join(folder, "request.json")
+        with open(request_path, 'w', encoding='utf-8') as request_file:
+            json.dump(request, request_file)
+
+        env = dict(os.environ)
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(path for path in (package_root, env.get("PYTHONPATH")) if path)
+        read_fd, write_fd = os.pipe()
+        try:
+            process = subprocess.Popen([sys.executable, "-c", COMPILER_COMMAND, request_path, str(write_fd)],
+                                       env=env, stdin=subprocess.DEVNULL, pass_fds=(write_fd,))
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        try:
+            with os.fdopen(read_fd, 'r', encoding='utf-8') as results:
+                for line in results:
+                    outcome = json.loads(line)
+                    on_outcome(outcome.pop("task"), outcome)
+        except BaseException:
+            process.terminate()
+            raise
+        finally:
+            process.wait()
+        if process.returncode != 0:
+            raise RuntimeError(f"Compiler process exited with {process.returncode}")
+
+
+#This function is the compiler process: it compiles the products of the tasks of a request in a pool of worker
+#processes and writes the outcome of every task (cache entries and written files, or its error) as a JSON line to
+#the file descriptor result_fd as soon as the task is finished
+#The workers are forked by a fork server that has this module preloaded, so they start without importing anything
+def main(request_path, result_fd):
+    with open(request_path, 'r', encoding='utf-8') as request_file:
+        request = json.load(request_file)
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    with ProcessPoolExecutor(max_workers=request["workers"], mp_context=context) as executor, \
+            os.fdopen(int(result_fd), 'w', encoding='utf-8') as results:
+        futures = {executor.submit(compile_product, task["csv_path"], request["storage_location"], task["product"],
+                                   task["cached"], request["binary"]): index
+                   for index, task in enumerate(request["tasks"])}
+
+        for future in as_completed(futures):
+            try:
+                entries, written = future.result()
+                outcome = {"entries": entries, "written": written}
+            except Exception as e:
+                outcome = {"error": str(e)}
+            outcome["task"] = futures[future]
+            results.write(json.dumps(outcome) + "\n")
+            results.flush()
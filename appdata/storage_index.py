@@ -0,0 +1,281 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from appdata.after_reboot import AFTER_REBOOT_PREFIX
+from appdata.catalog_update import VERSIONED_CATALOG
+
+# Categories of the files of the storage location
+CATALOGS = "catalogs"
+VERSIONS = "versions"
+AFTER_REBOOT = "after_reboot"
+CSV = "csv"
+CATEGORIES = (CATALOGS, VERSIONS, AFTER_REBOOT, CSV)
+
+# inotify events (see inotify(7)): names created, deleted or renamed in the directory, and the directory itself
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+#This function returns the category of a file name of the storage location, or None if it is not indexed
+def file_category(file_name):
+    if file_name.startswith(AFTER_REBOOT_PREFIX) and file_name.endswith('.json'):
+        return AFTER_REBOOT
+    if file_name.startswith('Diag'):
+        if file_name.endswith('.csv'):
+            return CSV
+        if file_name.endswith('.json'):
+            return VERSIONS if VERSIONED_CATALOG.fullmatch(file_name) else CATALOGS
+    return None
+
+
+#This function returns the inotify functions of the C library, or None if they are not available (not Linux)
+def load_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+#This class keeps the names of the files of the storage location in memory, by category
+#The directory is listed once; afterwards the index is kept current with inotify events, or by checking the
+#modification time of the directory if inotify is not available or the watcher is not started. Listeners are
+#called with the changed categories whenever files are added or removed
+class StorageIndex():
+    """StorageIndex
+    """
+    def __init__(self, storage_location, poll_interval=1.0):
+        """__init__
+        """
+        self.storage_location = storage_location
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._files = None
+        self._listeners = []
+        self._pending = set()
+
+        # Signature of the directory (modification time, inode) at the last scan, for the polling mode
+        self._signature = None
+        self._libc = None
+        self._fd = None
+        self._watch = None
+        # Pipe (read end, write end) the thread waits on besides the inotify descriptor, stop() wakes it with it
+        self._wakeup = None
+        self._thread = None
+        self._stopped = False
+
+
+    #The following method adds a listener, it is called with the index and the set of changed categories
+    def on_change(self, listener):
+        self._listeners.append(listener)
+
+
+    #The following method starts watching the directory in a background thread
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._libc = load_inotify()
+            if self._libc is not None:
+                fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+                if fd >= 0:
+                    self._fd = fd
+                else:
+                    print("WARNING inotify not available, polling the storage location:",
+                          os.strerror(ctypes.get_errno()), flush=True)
+            self._wakeup = os.pipe()
+            self._sync()
+            self._thread = threading.Thread(target=self._run, name="storage-index", daemon=True)
+            self._thread.start()
+        self._publish()
+        if self._fd is None:
+            print("INFO Watching storage location by polling", flush=True)
+
+
+    #The following method stops the background thread
+    #The thread is woken through the pipe and joined before the descriptors are closed, it may be waiting in select()
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+            if self._wakeup is not None:
+                os.write(self._wakeup[1], b'\0')
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+                self._watch = None
+            if self._wakeup is not None:
+                for fd in self._wakeup:
+                    os.close(fd)
+                self._wakeup = None
+
+
+    #The following method returns the sorted names of the files of a category
+    def files(self, category):
+        with self._lock:
+            self._sync()
+            names = sorted(self._files[category])
+        self._publish()
+        return names
+
+
+    #The following method returns the JSON catalogs (Diag*.json, without the registered versions)
+    def json_files(self):
+        return self.files(CATALOGS)
+
+
+    #The following method returns the copies of the registered files (AfterReboot*.json)
+    def after_reboot_files(self):
+        return self.files(AFTER_REBOOT)
+
+
+    #The following method returns the versions of registered catalogs (Diag<LANG>.<hash>.json)
+    def version_files(self):
+        return self.files(VERSIONS)
+
+
+    #The following method returns the CSV files (Diag*.csv)
+    def csv_files(self):
+        return self.files(CSV)
+
+
+    #The following method brings the index up to date: the pending inotify events are read, or the directory is
+    #listed again if it changed. Events of file operations are queued by the kernel before the operation returns,
+    #so the index reflects every change made before the call
+    def _sync(self):
+        if self._files is None:
+            self._scan()
+        if self._watch is not None:
+            self._read_events()
+        elif self._signature != self._directory_signature():
+            self._scan()
+
+
+    def _directory_signature(self):
+        try:
+            stat = os.stat(self.storage_location)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino)
+
+
+    def _scan(self):
+        # Watched before it is listed, so no change between the listing and the watch is lost
+        if self._fd is not None and not self._stopped and self._watch is None:
+            watch = self._libc.inotify_add_watch(self._fd, os.fsencode(self.storage_location), WATCH_MASK)
+            if watch >= 0:
+                self._watch = watch
+                print("INFO Watching storage location with inotify", flush=True)
+        self._signature = self._directory_signature()
+        try:
+            names = os.listdir(self.storage_location)
+        except OSError:
+            names = []
+        files = {category: set() for category in CATEGORIES}
+        for name in names:
+            category = file_category(name)
+            if category is not None:
+                files[category].add(name)
+        if self._files is not None:
+            self._pending.update(category for category in CATEGORIES if files[category] != self._files[category])
+        else:
+            self._pending.update(CATEGORIES)
+        self._files = files
+
+
+    def _read_events(self):
+        rescan = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                print("ERROR Reading inotify events failed:", e, flush=True)
+                self._watch = None
+                rescan = True
+                break
+            offset = 0
+            while offset < len(data) and not rescan:
+                watch, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    self._watch = None
+                    rescan = True
+                elif mask & IN_Q_OVERFLOW:
+                    rescan = True
+                elif watch == self._watch:
+                    self._apply_event(mask, os.fsdecode(name))
+
+        # Events were lost or the directory is gone: the remaining events are dropped and the directory is listed
+        # again (and watched again once it exists)
+        if rescan:
+            self._scan()
+
+
+    def _apply_event(self, mask, name):
+        category = file_category(name)
+        if category is None:
+            return
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            self._files[category].add(name)
+        else:
+            self._files[category].discard(name)
+        self._pending.add(category)
+
+
+    def _publish(self):
+        with self._lock:
+            changed = self._pending
+            self._pending = set()
+        if changed:
+            for listener in self._listeners:
+                try:
+                    listener(self, changed)
+                except Exception as e:
+                    print("ERROR Storage index listener failed:", e, flush=True)
+
+
+    def _run(self):
+        # The descriptors are closed by stop() only after this thread has ended
+        while not self._stopped:
+            fds = [self._wakeup[0]]
+            if self._watch is not None:
+                fds.append(self._fd)
+            try:
+                select.select(fds, [], [], self.poll_interval)
+            except OSError as e:
+                print("ERROR Waiting for storage location events failed:", e, flush=True)
+                time.sleep(self.poll_interval)
+            with self._lock:
+                if self._stopped:
+                    return
+                self._sync()
+            self._publish()
@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import codecs
+import csv
+
+from appdata.diag_compiler import CSV_DELIMITER, CSV_ENCODING
+from appdata.diag_validator import DiagPipeline
+
+
+#This exception is raised when an upload exceeds the configured size limit
+class UploadTooLarge(Exception):
+    pass
+
+
+#This class parses and validates a Diag.csv file from chunks of bytes as they are received
+class CsvChunkParser():
+    """CsvChunkParser
+    """
+    def __init__(self, compile=True):
+        """__init__
+        """
+        self.pipeline = DiagPipeline(compile)
+        self._decoder = codecs.getincrementaldecoder(CSV_ENCODING)()
+
+        # Incomplete last line of the data received so far
+        self._pending = ''
+
+        # Lines of a record that is still inside a quoted field, and the number of quotes in it
+        self._record = []
+        self._quotes = 0
+
+
+    #The following method parses all complete records of a chunk of bytes
+    def feed(self, chunk):
+        self._parse(self._pending + self._decoder.decode(chunk), final=False)
+
+
+    #The following method parses the rest of the data and returns the collected errors and the catalog builder
+    def close(self):
+        self._parse(self._pending + self._decoder.decode(b'', final=True), final=True)
+        return self.pipeline.result()
+
+
+    def _parse(self, text, final):
+        lines = text.split('\n')
+        self._pending = '' if final else lines.pop()
+
+        records = []
+        for line in lines:
+            self._record.append(line)
+            self._quotes += line.count('"')
+            # A record ends at a line break outside of quotes
+            if self._quotes % 2 == 0:
+                records.append('\n'.join(self._record) + '\n')
+                self._record = []
+                self._quotes = 0
+
+        if final and self._record:
+            records.append('\n'.join(self._record))
+            self._record = []
+
+        for row in csv.reader(records, delimiter=CSV_DELIMITER):
+            if row:
+                self.pipeline.add_row(row)
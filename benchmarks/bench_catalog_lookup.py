@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Compares looking up single texts in the JSON catalog (json.load of the whole file) with the binary catalog (mmap).
+#
+# Usage: python3 benchmarks/bench_catalog_lookup.py [rows] [lookups]
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appdata.compile_cache import serialize_catalog
+from appdata.diag_catalog_bin import CatalogReader, catalog_to_bytes
+from appdata.diag_compiler import compile_csv
+from benchmarks.diag_csv_generator import write_diag_csv
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'Diag.csv')
+        write_diag_csv(csv_path, rows, 1)
+        catalog = compile_csv(csv_path)[0][0]
+
+        json_path = os.path.join(directory, 'DiagEN.json')
+        bin_path = os.path.join(directory, 'DiagEN.bin')
+        with open(json_path, 'wb') as file:
+            file.write(serialize_catalog(catalog))
+        with open(bin_path, 'wb') as file:
+            file.write(catalog_to_bytes(catalog))
+
+        keys = []
+        for main_no, entry in catalog["mainDiagnostics"].items():
+            keys.append((main_no, None, entry["text"]))
+            for detailed_no, detailed in entry.get("detailedDiagnostics", {}).items():
+                keys.append((main_no, detailed_no, detailed["text"]))
+        keys = random.sample(keys, min(lookups, len(keys)))
+
+        loaded, json_time, json_peak = measure(lambda: load_json(json_path))
+        reader, bin_time, bin_peak = measure(lambda: CatalogReader(bin_path))
+
+        start = time.perf_counter()
+        for main_no, detailed_no, text in keys:
+            if reader.lookup(main_no, detailed_no) != text:
+                print("ERROR Binary catalog lookup differs for", main_no, detailed_no)
+                sys.exit(1)
+        lookup_time = time.perf_counter() - start
+        reader.close()
+
+        print(f"rows={rows} json={os.path.getsize(json_path) / 1e6:.1f} MB bin={os.path.getsize(bin_path) / 1e6:.1f} MB")
+        print(f"json load  {json_time * 1000:9.1f} ms  peak {json_peak / 1e6:8.1f} MB")
+        print(f"bin open   {bin_time * 1000:9.3f} ms  peak {bin_peak / 1e6:8.3f} MB")
+        print(f"bin lookup {lookup_time / len(keys) * 1e6:9.2f} us per text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Compares the streaming compiler against the previous row list based convert_csv_to_json.
+#
+# Usage: python3 benchmarks/bench_convert_csv_to_json.py [rows] [languages]
+
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appdata.diag_compiler import compile_csv
+from benchmarks.diag_csv_generator import write_diag_csv
+
+
+# Previous implementation of convert_csv_to_json, kept here as the baseline
+def legacy_convert_csv_to_json(csv_path):
+    with open(csv_path, mode='r', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file, delimiter=';')
+        rows = list(reader)
+        product_name = str(rows[0]['product name'])
+
+    languages = [header.split('-')[1] for header in reader.fieldnames if header.startswith('text-')]
+    json_data_list = []
+
+    for i, lang in enumerate(languages):
+        main_diagnostics = {}
+        current_main_diag_no = None
+
+        for row in rows:
+            main_diag_no = row['mainDiag No']
+            detailed_diag_no = row['detailedDiagnostics No']
+            text = row[f'text-{lang.upper()}']
+
+            if main_diag_no:
+                current_main_diag_no = main_diag_no
+                main_diagnostics[str(current_main_diag_no)] = {
+                    "text": text,
+                    "version": 1
+                }
+
+            if detailed_diag_no and current_main_diag_no:
+                if 'detailedDiagnostics' not in main_diagnostics[str(current_main_diag_no)]:
+                    main_diagnostics[str(current_main_diag_no)]['detailedDiagnostics'] = {}
+
+                main_diagnostics[str(current_main_diag_no)]['detailedDiagnostics'][str(detailed_diag_no)] = {
+                    "text": text
+                    }
+
+            json_data = {
+                "product": product_name,
+                "mainDiagnostics": main_diagnostics
+            }
+
+        json_data_list.append(json_data)
+
+    return json_data_list, languages
+
+
+def measure(function, csv_path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(csv_path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    languages = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'Diag.csv')
+        write_diag_csv(csv_path, rows, languages)
+
+        legacy, legacy_time, legacy_peak = measure(legacy_convert_csv_to_json, csv_path)
+        streaming, streaming_time, streaming_peak = measure(compile_csv, csv_path)
+
+    if legacy != streaming:
+        print("ERROR Streaming compiler output differs from convert_csv_to_json")
+        sys.exit(1)
+
+    print(f"rows={rows} languages={languages}")
+    print(f"legacy    {legacy_time * 1000:9.1f} ms  peak {legacy_peak / 1e6:8.1f} MB")
+    print(f"streaming {streaming_time * 1000:9.1f} ms  peak {streaming_peak / 1e6:8.1f} MB")
+    print(f"speedup   {legacy_time / streaming_time:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
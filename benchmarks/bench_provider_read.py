@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Read latency of provider nodes under a high-rate client: the previous MyProviderNode (print with flush on every
+# read) against the current one (cached Variant, no output). Starts a Data Layer broker in this process.
+# The output of the previous node goes to a log file, as it goes to the journal in the snap.
+#
+# Usage: python3 benchmarks/bench_provider_read.py [reads] [log file]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ctrlxdatalayer
+from ctrlxdatalayer.provider_node import ProviderNode, ProviderNodeCallbacks
+from ctrlxdatalayer.variant import Result, Variant
+
+from app.my_provider_node import MyProviderNode
+
+
+# Read path of MyProviderNode before it was reworked
+class LegacyNode:
+
+    def __init__(self, provider, address, initial_value, log):
+        self._cbs = ProviderNodeCallbacks(self.on_create, self.on_remove, self.on_browse, self.on_read,
+                                          self.on_write, self.on_metadata)
+        self._providerNode = ProviderNode(self._cbs)
+        self._provider = provider
+        self._address = address
+        self._data = initial_value
+        self._log = log
+
+    def register_node(self):
+        return self._provider.register_node(self._address, self._providerNode)
+
+    def on_create(self, userdata, address, data, cb):
+        cb(Result.OK, data)
+
+    def on_remove(self, userdata, address, cb):
+        cb(Result.UNSUPPORTED, None)
+
+    def on_browse(self, userdata, address, cb):
+        with Variant() as new_data:
+            new_data.set_array_string([])
+            cb(Result.OK, new_data)
+
+    def on_read(self, userdata, address, data, cb):
+        print("__on_read()", "address:", address, "data:", self._data, "userdata:", userdata,
+              file=self._log, flush=True)
+        new_data = self._data
+        cb(Result.OK, new_data)
+
+    def on_write(self, userdata, address, data, cb):
+        print("__on_write()", "address:", address, "data:", data, "userdata:", userdata, file=self._log, flush=True)
+        result, self._data = data.clone()
+        cb(Result.OK, self._data)
+
+    def on_metadata(self, userdata, address, cb):
+        cb(Result.FAILED, None)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(client, address, reads):
+    latencies = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        result, data = client.read_sync(address)
+        latencies.append(time.perf_counter() - start)
+        if result != Result.OK:
+            raise RuntimeError(f"Reading {address} failed: {result}")
+    latencies.sort()
+    return latencies
+
+
+def main():
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    log_path = sys.argv[2] if len(sys.argv) > 2 else os.devnull
+
+    system = ctrlxdatalayer.system.System("")
+    system.start(True)
+    time.sleep(0.5)
+    provider = system.factory().create_provider("ipc://")
+    provider.start()
+    client = system.factory().create_client("ipc://")
+    time.sleep(0.5)
+
+    with open(log_path, 'a') as log:
+        legacy_value = Variant()
+        legacy_value.set_float64(1.5)
+        legacy = LegacyNode(provider, "bench/legacy", legacy_value, log)
+        legacy.register_node()
+
+        current_value = Variant()
+        current_value.set_float64(1.5)
+        current = MyProviderNode(provider, "bench/current", current_value)
+        current.register_node()
+
+        # Warm up both nodes
+        measure(client, "bench/legacy", 100)
+        measure(client, "bench/current", 100)
+
+        print(f"reads={reads} log={log_path}")
+        for name, address in (("previous", "bench/legacy"), ("current", "bench/current")):
+            start = time.perf_counter()
+            latencies = measure(client, address, reads)
+            elapsed = time.perf_counter() - start
+            print(f"{name:9} {reads / elapsed:9.1f} reads/s  p50 {percentile(latencies, 0.50) * 1e6:8.1f} us"
+                  f"  p99 {percentile(latencies, 0.99) * 1e6:8.1f} us")
+
+        provider.unregister_node("bench/legacy")
+        current.unregister_node()
+
+    client.close()
+    provider.stop()
+    provider.close()
+    system.stop(False)
+
+
+if __name__ == "__main__":
+    main()
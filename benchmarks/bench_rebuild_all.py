@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Rebuild of the catalogs of several products: one after the other in this process (as save() does for Diag.csv)
+# against the process pool of appdata/parallel_compiler.py, and the time of the largest product alone.
+#
+# Usage: python3 benchmarks/bench_rebuild_all.py [products] [rows of the largest product] [languages] [workers]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from appdata.compile_cache import CompileCache, csv_content_hash
+from appdata.diag_compiler import compile_csv
+from appdata.parallel_compiler import compile_products
+from diag_csv_generator import write_diag_csv
+
+
+def compile_sequential(storage_location, products):
+    for product, csv_path in products.items():
+        catalogs, languages = compile_csv(csv_path)
+        CompileCache(storage_location, product).write_catalogs(csv_content_hash(csv_path), catalogs, languages)
+
+
+def measure(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    product_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    languages = int(sys.argv[3]) if len(sys.argv) > 3 else 12
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else os.cpu_count()
+
+    with tempfile.TemporaryDirectory() as storage_location:
+        # The products get different sizes, from the full row count down to a quarter of it
+        products = {}
+        for i in range(product_count):
+            product = f"Variant{i + 1}"
+            products[product] = os.path.join(storage_location, f"Diag_{product}.csv")
+            write_diag_csv(products[product], rows - rows * 3 * i // (4 * max(1, product_count - 1)), languages)
+        largest = dict(list(products.items())[:1])
+
+        sequential_time = measure(compile_sequential, storage_location, products)
+        largest_time = measure(compile_sequential, storage_location, largest)
+        parallel_time = measure(compile_products, storage_location, products, workers=workers, force=True)
+        up_to_date_time = measure(compile_products, storage_location, products, workers=workers)
+
+    print(f"products={product_count} rows={rows} languages={languages} workers={workers}")
+    print(f"sequential     {sequential_time * 1000:9.1f} ms")
+    print(f"largest alone  {largest_time * 1000:9.1f} ms")
+    print(f"process pool   {parallel_time * 1000:9.1f} ms")
+    print(f"up to date     {up_to_date_time * 1000:9.1f} ms")
+    print(f"speedup        {sequential_time / parallel_time:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Compares the single pass validation engine against the previous per-row/per-language search_for_error loop.
+#
+# Usage: python3 benchmarks/bench_search_for_error.py [rows] [languages]
+
+import contextlib
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appdata.diag_validator import validate_csv
+from benchmarks.diag_csv_generator import write_diag_csv
+
+
+# Previous implementation of check_headers and AppDataControl.search_for_error, kept here as the baseline
+def check_headers(reader):
+    required_headers = {"product name", "mainDiag No", "detailedDiagnostics No"}
+    text_prefix = "text-"
+    headers = reader.fieldnames
+    has_required_headers = required_headers.issubset(headers)
+    has_text_headers = any(header.startswith(text_prefix) for header in headers)
+    return has_required_headers and has_text_headers
+
+
+def legacy_search_for_error(csv_path):
+    message = {}
+    languages = None
+
+    with open(csv_path, mode='r', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file, delimiter=';')
+        rows = list(reader)
+        languages = [header.split('-')[1] for header in reader.fieldnames if header.startswith('text-')]
+
+        print("INFO check headers correctness: ", check_headers(reader), flush=True)
+        if not check_headers(reader):
+            message['Error in headers'] = "Please make sure all required headers are available"
+            return message
+
+    print("INFO languages: ", languages, flush=True)
+
+    product_name = str(rows[0]['product name'])
+    if not product_name:
+        message['No product name'] = "Please enter product name in row 2"
+        return message
+
+    previous_detailed_no = None
+    previous_main_no = None
+    for i, row in enumerate(rows):
+        excel_row = i + 2
+
+        if not row['mainDiag No'] and not row['detailedDiagnostics No']:
+            if not all(not value for value in row.values()): #if row in excel is not empty
+                message[f'No main diagnostic number in row {excel_row}'] = "Please enter main diagnostic number"
+
+        if row['detailedDiagnostics No']:
+            if previous_detailed_no is not None and previous_main_no is not None:
+                if not previous_detailed_no and not previous_main_no:
+                    message[f'No main diagnostic No. for detailed diagnostic No. in row {excel_row}'] = "Please make sure that every detailed diagnostic No. has a corresponding main diagnostic No."
+
+        if row['mainDiag No'] and row['detailedDiagnostics No']:
+            message[f'Error in handling diagnostic No. in row {excel_row}'] = "Please make sure that either main or detailed diagnostic No. is described"
+
+        empty_languages = []
+        for j, lang in enumerate(languages):
+
+            if row['mainDiag No']:
+
+                DiagCopyString = str(row['mainDiag No'])
+
+                if len(DiagCopyString) != 8:
+                    message[f'size of main diagnostic number not correct in row {excel_row}'] = "Check documentation"
+                    return message
+
+                if DiagCopyString[0] in '0123456789ABCDEF' and DiagCopyString[1] in '0123456789ABCDEF':
+                    if (int(DiagCopyString[:2], 16) != 0x0E) and (int(DiagCopyString[:2], 16) != 0x0F) and not (0x30 <= int(DiagCopyString[:2], 16) <= 0x37):
+                        message[f'Invalid main diagnostic number (first two digits) in row {excel_row}'] = "Check documentation"
+                else:
+                    message[f'Invalid main diagnostic number (first two digits) in row {excel_row}'] = "Check documentation"
+
+                if DiagCopyString[2] in '01':
+                    if (int(DiagCopyString[2], 2) != 0b0) and (int(DiagCopyString[2], 2) != 0b1):
+                        message[f'Invalid main diagnostic number (third digit) in row {excel_row}'] = "Check documentation"
+                else:
+                    message[f'Invalid main diagnostic number (third digit) in row {excel_row}'] = "Check documentation"
+
+                if DiagCopyString[3] in '0123456789ABCDEF':
+                    if (int(DiagCopyString[3], 16) != 0xA) and (int(DiagCopyString[3], 16) != 0xE)  and (int(DiagCopyString[3], 16) != 0xF):
+                        message[f'Invalid main diagnostic number (4th digit) in row {excel_row}'] = "Check documentation"
+
+                    if DiagCopyString[4] in '0123456789' and DiagCopyString[5] in '0123456789ABCDEF' and DiagCopyString[6] in '0123456789ABCDEF' and DiagCopyString[7] in '0123456789ABCDEF':
+                        if (int(DiagCopyString[3], 16) == 0xA):
+                            if not (0x0000 <= int(DiagCopyString[-4:], 16) <= 0x0FFF):
+                                message[f'Invalid main diagnostic number (last four digits) in row {excel_row}'] = "Check documentation"
+
+                        if (int(DiagCopyString[3], 16) == 0xE):
+                            if not (0x0000 <= int(DiagCopyString[-4:], 16) <= 0x0FFF):
+                                message[f'Invalid main diagnostic number (last four digits) in row {excel_row}'] = "Check documentation"
+
+                        if (int(DiagCopyString[3], 16) == 0xF):
+                            if (int(DiagCopyString[4]) != 0) and (int(DiagCopyString[4]) != 2) and (int(DiagCopyString[4]) != 6) and (int(DiagCopyString[4]) != 8) and (int(DiagCopyString[4]) != 9):
+                                message[f'Invalid main diagnostic number (5th digit) in row {excel_row}'] = "Check documentation"
+
+                            if not (0x000 <= int(DiagCopyString[-3:], 16) <= 0xFFF):
+                                message[f'Invalid main diagnostic number (last three digits) in row {excel_row}'] = "Check documentation"
+                    else:
+                        message[f'Invalid main diagnostic number (last four digits) in row {excel_row}'] = "Check documentation"
+                else:
+                    message[f'Invalid main diagnostic number (4th digit) in row {excel_row}'] = "Check documentation"
+
+                utf8_length = len(str(row[f'text-{lang.upper()}']).encode('utf-8'))
+                if utf8_length > 60:
+                    message[f'text-{lang.upper()} too long in row {excel_row}'] = "Please shorten the text"
+
+            elif row['detailedDiagnostics No']:
+                utf8_length = len(str(row[f'text-{lang.upper()}']).encode('utf-8'))
+                if utf8_length > 250:
+                    message[f'text-{lang.upper()} too long in row {excel_row}'] = "Please shorten the text"
+
+            if not row[f'text-{lang.upper()}']:
+                empty_languages.append(lang.upper())
+                print(f"In row {excel_row}", f'text-{lang.upper()}', "is empty")
+
+        if empty_languages:
+            if not all(not value for value in row.values()): #if row in excel is not empty
+                message[f'Empty text in row {excel_row}'] = empty_languages
+
+        previous_detailed_no = row['detailedDiagnostics No']
+        previous_main_no = row['mainDiag No']
+
+    return message
+
+
+def measure(function, csv_path):
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = function(csv_path)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    languages = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    with tempfile.TemporaryDirectory() as directory:
+        for invalid in (False, True):
+            csv_path = os.path.join(directory, 'Diag.csv')
+            write_diag_csv(csv_path, rows, languages, invalid=invalid)
+
+            legacy, legacy_time = measure(legacy_search_for_error, csv_path)
+            engine, engine_time = measure(validate_csv, csv_path)
+
+            if legacy != engine:
+                print("ERROR Validation engine result differs from search_for_error")
+                sys.exit(1)
+
+            print(f"rows={rows} languages={languages} invalid={invalid} errors={len(engine)}")
+            print(f"legacy {legacy_time * 1000:9.1f} ms")
+            print(f"engine {engine_time * 1000:9.1f} ms")
+            print(f"ratio  {engine_time / legacy_time:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
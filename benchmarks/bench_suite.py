@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Benchmark suite of the diagnostics pipeline: check_headers, search_for_error, convert_csv_to_json, save and
+# copy_json_file of appdata/app_data_control.py, and the upload/update/register routes through the Flask test
+# client, on synthetic Diag.csv files (see diag_csv_generator.py). The Data Layer is replaced by a local fake
+# client (see fake_datalayer.py). Every case runs several rounds; min/median/mean/stddev are printed and stored
+# as JSON, and --compare reports the cases whose median got slower than the threshold against a previous run.
+#
+# Usage: python3 benchmarks/bench_suite.py [--rows 1000 10000] [--languages 2 12] [--detailed-per-main 4]
+#                                          [--rounds 5] [--output results.json] [--compare previous.json]
+#                                          [--threshold 1.2] [--no-routes]
+
+import argparse
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from diag_csv_generator import write_diag_csv
+
+# The output of the app (INFO ... lines) is discarded, the results are printed here
+out = sys.stdout
+
+
+def report(text):
+    print(text, file=out, flush=True)
+
+
+#This class runs the cases and collects their results
+class Suite:
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+        self.results = []
+
+    def run(self, name, function, setup=None, **parameters):
+        times = []
+        # The first round warms up the caches (files, imports) and is not counted
+        for _ in range(self.rounds + 1):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        times = times[1:]
+        result = dict(name=name, **parameters, rounds=self.rounds, min=min(times), max=max(times),
+                      mean=statistics.mean(times), median=statistics.median(times),
+                      stddev=statistics.stdev(times) if len(times) > 1 else 0.0)
+        self.results.append(result)
+        report(f"{name:28} rows={parameters.get('rows', ''):<7} languages={parameters.get('languages', ''):<3}"
+               f" invalid={str(parameters.get('invalid', False)):5}  median {result['median'] * 1000:10.2f} ms"
+               f"  min {result['min'] * 1000:10.2f} ms  stddev {result['stddev'] * 1000:8.2f} ms")
+        return result
+
+
+def clear_outputs(storage_location):
+    for file in os.listdir(storage_location):
+        if file != "Diag.csv":
+            path = os.path.join(storage_location, file)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+
+def bench_app_data_control(suite, rows, languages, detailed_per_main, invalid):
+    from appdata.app_data_control import AppDataControl, check_headers, convert_csv_to_json
+
+    control = AppDataControl()
+    control.ensure_storage_location()
+    clear_outputs(control.storage_location)
+    write_diag_csv(control.storage_file, rows, languages, detailed_per_main, invalid)
+    parameters = dict(rows=rows, languages=languages, invalid=invalid)
+
+    def headers():
+        with open(control.storage_file, encoding="utf-8-sig", newline="") as file:
+            check_headers(csv.DictReader(file, delimiter=";"))
+
+    suite.run("check_headers", headers, **parameters)
+    suite.run("search_for_error", lambda: AppDataControl().search_for_error(), **parameters)
+    if invalid:
+        return
+
+    suite.run("convert_csv_to_json", lambda: convert_csv_to_json(control.storage_file), **parameters)
+    suite.run("save", lambda: AppDataControl().save(), setup=lambda: clear_outputs(control.storage_location),
+              **parameters)
+    suite.run("save_up_to_date", control.save, **parameters)
+    json_file = sorted(control.list_json_files())[0]
+    suite.run("copy_json_file", lambda: control.copy_json_file(json_file), **parameters)
+
+
+def bench_routes(suite, main, rows, languages, detailed_per_main, invalid):
+    storage_location = main.app_data_control.storage_location
+    client = main.app.test_client()
+    parameters = dict(rows=rows, languages=languages, invalid=invalid)
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "Diag.csv")
+        write_diag_csv(csv_path, rows, languages, detailed_per_main, invalid)
+        with open(csv_path, "rb") as file:
+            content = file.read()
+
+    def upload():
+        response = client.post("/webserver/api/upload_file", data={"file": (io.BytesIO(content), "Diag.csv")},
+                               content_type="multipart/form-data")
+        if response.status_code != 302:
+            raise RuntimeError(f"Upload failed with {response.status_code}")
+
+    def clear_and_upload():
+        clear_outputs(storage_location)
+        upload()
+
+    suite.run("route_upload", upload, **parameters)
+    if invalid:
+        return
+
+    # The JSON files are created by a background job, the case ends when it is finished
+    def update():
+        client.post("/webserver/api/update")
+        job = main.state.last_job
+        while job.status in ("queued", "running"):
+            time.sleep(0.0005)
+
+    suite.run("route_update", update, setup=clear_and_upload, **parameters)
+    json_file = sorted(main.app_data_control.list_json_files())[0]
+    suite.run("route_register", lambda: client.post("/webserver/api/datalayer/register",
+                                                    data={"selected_file": json_file}), **parameters)
+
+    # The bulk registration runs in a worker thread, the case ends when it is done
+    def register_all():
+        client.post("/webserver/api/datalayer/register_all")
+        while main.registration_service.in_flight() is not None:
+            time.sleep(0.0005)
+
+    suite.run("route_register_all", register_all, **parameters)
+
+
+def import_main(fake_client):
+    try:
+        import main
+    except ImportError as e:
+        report(f"WARNING Routes not benchmarked, main.py cannot be imported: {e}")
+        return None
+    from app.registration_service import RegistrationService
+
+    # Registrations are written to the fake client, the Data Layer connection of main.py is not used
+    main.registration_service = RegistrationService(lambda: fake_client, timeout=main.datalayer_timeout)
+    return main
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_key(result):
+    return result["name"], result.get("rows"), result.get("languages"), result.get("invalid")
+
+
+def compare(results, previous_path, threshold):
+    with open(previous_path, encoding="utf-8") as file:
+        previous = {case_key(result): result for result in json.load(file)["results"]}
+
+    regressions = 0
+    report(f"Compared with {previous_path} (threshold {threshold:.2f}x)")
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None or old["median"] == 0:
+            continue
+        ratio = result["median"] / old["median"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        regressions += 1 if flag else 0
+        report(f"{result['name']:28} rows={result.get('rows', ''):<7} languages={result.get('languages', ''):<3}"
+               f" invalid={str(result.get('invalid', False)):5}  {old['median'] * 1000:10.2f} ms ->"
+               f" {result['median'] * 1000:10.2f} ms  {ratio:6.2f}x {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite of the diagnostics pipeline")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000], help="rows of the CSV files")
+    parser.add_argument("--languages", type=int, nargs="+", default=[2, 12], help="languages (1-20)")
+    parser.add_argument("--detailed-per-main", type=int, default=4, help="detailed diagnostics per main diagnostic")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds per case")
+    parser.add_argument("--output", default=None, help="JSON file of the results (default: bench_suite_<time>.json)")
+    parser.add_argument("--compare", default=None, help="JSON file of a previous run")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown of the median reported as regression")
+    parser.add_argument("--no-routes", action="store_true", help="do not benchmark the Flask routes")
+    args = parser.parse_args()
+
+    started = datetime.datetime.now()
+    with tempfile.TemporaryDirectory() as common:
+        # The app stores its files below SNAP_COMMON, uploads of the largest files must not be rejected
+        os.environ["SNAP"] = ROOT
+        os.environ["SNAP_COMMON"] = common
+        os.environ.setdefault("DIAG_MAX_UPLOAD_SIZE", str(1 << 40))
+        os.environ.setdefault("DIAG_LIVE_ADDRESSES", "")
+
+        suite = Suite(args.rounds)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            main_module = None
+            if not args.no_routes:
+                from fake_datalayer import FakeClient
+                main_module = import_main(FakeClient())
+
+            for rows in args.rows:
+                for languages in args.languages:
+                    for invalid in (False, True):
+                        bench_app_data_control(suite, rows, languages, args.detailed_per_main, invalid)
+                        if main_module is not None:
+                            bench_routes(suite, main_module, rows, languages, args.detailed_per_main, invalid)
+
+    output = args.output or f"bench_suite_{started.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({
+            "created": started.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "parameters": {"rows": args.rows, "languages": args.languages,
+                           "detailed_per_main": args.detailed_per_main, "rounds": args.rounds},
+            "results": suite.results,
+        }, file, indent=2)
+    report(f"Results written to {output}")
+
+    if args.compare and compare(suite.results, args.compare, args.threshold):
+        # os._exit: the Data Layer threads started by main.py are not stopped
+        sys.stdout.flush()
+        os._exit(1)
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Load test of a running web server: requests/sec and latency percentiles of concurrent GET requests.
+# Start main.py once with DIAG_SERVER_MODE=debug and once with DIAG_SERVER_MODE=production and compare.
+#
+# Usage: python3 benchmarks/bench_webserver_load.py [url] [concurrency] [requests]
+
+import http.client
+import sys
+import threading
+import time
+import urllib.parse
+
+
+def worker(url, count, latencies, errors):
+    parsed = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    path = parsed.path or '/'
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    url = sys.argv[1] if len(sys.argv) > 1 else 'http://127.0.0.1:5000/webserver/'
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    requests = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+    latencies = []
+    errors = []
+    threads = [threading.Thread(target=worker, args=(url, requests // concurrency, latencies, errors))
+               for _ in range(concurrency)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"url={url} concurrency={concurrency} requests={len(latencies)} errors={len(errors)}")
+    print(f"requests/sec {len(latencies) / elapsed:9.1f}")
+    print(f"p50          {percentile(latencies, 0.50) * 1000:9.2f} ms")
+    print(f"p99          {percentile(latencies, 0.99) * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
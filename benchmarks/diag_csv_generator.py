@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Generator of synthetic Diag.csv files for the benchmarks: valid files, or files with a share of invalid rows
+# (empty and too long texts, invalid and missing diagnosis numbers) that search_for_error reports.
+#
+# Usage: python3 benchmarks/diag_csv_generator.py <path> [rows] [languages] [detailed per main] [invalid]
+
+import csv
+import sys
+
+# Language codes of the text columns, up to 20 languages
+LANGUAGES = ("EN", "DE", "FR", "ES", "IT", "ZH", "JA", "KO", "PT", "RU",
+             "PL", "CS", "HU", "SV", "NL", "TR", "DA", "FI", "NB", "RO")
+
+# Building blocks of valid main diagnosis numbers (see VALID_MAIN_DIAG_NO in appdata/diag_validator.py)
+MAIN_PREFIXES = ("0E", "0F", "30", "31", "32", "33", "34", "35", "36", "37")
+MAIN_CLASSES = ("A0", "E0", "F0", "F2", "F6", "F8", "F9")
+MAIN_NUMBERS = len(MAIN_PREFIXES) * 2 * len(MAIN_CLASSES) * 0x1000
+
+INVALID_MAIN_NUMBERS = ("0E2A0001", "1E0A0001", "0E0B0001", "0E0A1001", "0E0F7001", "0E0AG001")
+
+
+#This function returns the n-th valid main diagnosis number, unique for n < MAIN_NUMBERS
+def main_diag_no(n: int) -> str:
+    n, number = divmod(n, 0x1000)
+    n, diag_class = divmod(n, len(MAIN_CLASSES))
+    n, sub = divmod(n, 2)
+    prefix = MAIN_PREFIXES[n % len(MAIN_PREFIXES)]
+    return f"{prefix}{sub}{MAIN_CLASSES[diag_class]}{number:03X}"
+
+
+#This function writes a Diag.csv file with rows data rows (main and detailed diagnostics) and languages text columns
+#Every main diagnosis is followed by detailed_per_main detailed diagnoses. With invalid=True about one row in
+#error_interval rows gets an error
+def write_diag_csv(path: str, rows: int, languages: int = 2, detailed_per_main: int = 4, invalid: bool = False,
+                   error_interval: int = 50):
+    if not 1 <= languages <= len(LANGUAGES):
+        raise ValueError(f"languages must be between 1 and {len(LANGUAGES)}")
+    codes = LANGUAGES[:languages]
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, delimiter=";")
+        writer.writerow(["product name", "mainDiag No", "detailedDiagnostics No"] + [f"text-{code}" for code in codes])
+        main_count = 0
+        for i in range(rows):
+            product = "Benchmark" if i == 0 else ""
+            is_main = i % (detailed_per_main + 1) == 0
+            texts = [f"{'Main' if is_main else 'Detailed'} diagnostic text {i} {code}" for code in codes]
+            error = invalid and i % error_interval == error_interval // 2
+            kind = (i // error_interval) % 4
+
+            if is_main:
+                number = main_diag_no(main_count % MAIN_NUMBERS)
+                main_count += 1
+                if error and kind == 0:
+                    number = INVALID_MAIN_NUMBERS[i % len(INVALID_MAIN_NUMBERS)]
+                row = [product, number, ""]
+            elif error and kind == 0:
+                row = [product, "", ""]
+            else:
+                row = [product, "", f"{i:08X}"]
+
+            if error and kind == 1:
+                texts[i % languages] = ""
+            elif error and kind == 2:
+                texts[i % languages] = "x" * 300
+            elif error and kind == 3:
+                texts[i % languages] = ""
+                texts[(i + 1) % languages] = "y" * 260
+            writer.writerow(row + texts)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 benchmarks/diag_csv_generator.py <path> [rows] [languages] [detailed per main] [invalid]")
+        sys.exit(2)
+    path = sys.argv[1]
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    languages = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    detailed_per_main = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    invalid = len(sys.argv) > 5 and sys.argv[5] in ("1", "invalid")
+    write_diag_csv(path, rows, languages, detailed_per_main, invalid)
+    print(f"Written {path}: rows={rows} languages={languages} detailed per main={detailed_per_main} invalid={invalid}")
+
+
+if __name__ == "__main__":
+    main()
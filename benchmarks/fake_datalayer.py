@@ -0,0 +1,115 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Local fake of the Data Layer client for the benchmarks: writes are answered at once with Result.OK (or the
+# configured result) and recorded, so the routes can be timed without a ctrlX CORE.
+
+import datetime
+import threading
+
+from ctrlxdatalayer.variant import Result
+
+
+#This class is the response of one request of a fake bulk write
+class FakeBulkResponse:
+    """FakeBulkResponse"""
+
+    def __init__(self, address, result, data=None):
+        """__init__"""
+        self._address = address
+        self._result = result
+        self._data = data
+        self._timestamp = datetime.datetime.now(datetime.timezone.utc)
+
+    def get_address(self):
+        """get_address"""
+        return self._address
+
+    def get_result(self):
+        """get_result"""
+        return self._result
+
+    def get_data(self):
+        """get_data"""
+        return self._data
+
+    def get_datetime(self):
+        """get_datetime"""
+        return self._timestamp
+
+
+#This class is a fake of ctrlxdatalayer.bulk.Bulk, written values are recorded at the fake client
+class FakeBulk:
+    """FakeBulk"""
+
+    def __init__(self, client):
+        """__init__"""
+        self._client = client
+        self._responses = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._responses = []
+
+    def write(self, requests):
+        """write"""
+        self._responses = []
+        for request in requests:
+            result = self._client.record(request.address, request.data)
+            self._responses.append(FakeBulkResponse(request.address, result))
+        return Result.OK
+
+    def get_response(self):
+        """get_response"""
+        return self._responses
+
+
+#This class is a fake of ctrlxdatalayer.client.Client with the calls used by the registration service
+class FakeClient:
+    """FakeClient"""
+
+    def __init__(self, result=Result.OK):
+        """__init__"""
+        self.result = result
+        self._lock = threading.Lock()
+        # address -> written string values
+        self.written = {}
+        self.writes = 0
+
+    def record(self, address, data):
+        """record"""
+        with self._lock:
+            self.written.setdefault(address, []).append(data.get_string())
+            self.writes += 1
+        return self.result
+
+    def set_timeout(self, timeout, value):
+        """set_timeout"""
+        return Result.OK
+
+    def is_connected(self):
+        """is_connected"""
+        return True
+
+    def ping_sync(self):
+        """ping_sync"""
+        return Result.OK
+
+    def write_sync(self, address, data):
+        """write_sync"""
+        return self.record(address, data), None
+
+    def write_async(self, address, data, cb):
+        """write_async"""
+        cb(self.record(address, data), None, None)
+        return Result.OK
+
+    def create_bulk(self):
+        """create_bulk"""
+        return FakeBulk(self)
+
+    def close(self):
+        """close"""
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+# Startup profile of main.py: import times (python -X importtime) grouped by package, and the cold start time
+# until the first page is served. Exits with 1 if a budget is exceeded or a module that is imported lazily
+# (only needed after the first page) was imported at startup. The same checks run with pytest in
+# tests/test_startup.py, with the budgets of DIAG_IMPORT_BUDGET_MS and DIAG_START_BUDGET_MS.
+# Run it on the target (e.g. in the snap environment on the ctrlX CORE), budgets of 0 are not checked.
+#
+# Usage: python3 benchmarks/profile_startup.py [runs] [import budget ms] [start budget ms] [top]
+
+import collections
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that are not needed to serve the first page and must not be imported by 'import main'
+LAZY_MODULES = (
+    "appdata.diag_compiler",
+    "appdata.diag_validator",
+    "appdata.upload_stream",
+    "appdata.compile_cache",
+    "appdata.diag_catalog_bin",
+    "app.my_provider_node",
+    "app.diagnostics_provider",
+)
+
+
+def import_profile():
+    # os._exit: the Data Layer threads started by main.py are not stopped
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main, os; os._exit(0)"],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    modules = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cold_start(timeout=30.0):
+    port = free_port()
+    env = dict(os.environ, DIAG_SERVER_PORT=str(port))
+    url = f"http://127.0.0.1:{port}/webserver/"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (OSError, urllib.error.URLError):
+                if process.poll() is not None:
+                    raise RuntimeError(f"main.py exited with {process.returncode}")
+                time.sleep(0.01)
+        raise RuntimeError(f"No page served within {timeout} s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    import_budget = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    start_budget = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    top = int(sys.argv[4]) if len(sys.argv) > 4 else 15
+
+    # The first run compiles the .pyc files and fills the page cache, it is not counted
+    import_profile()
+    profiles = [import_profile() for _ in range(runs)]
+    import_ms = statistics.median(profile["main"][1] for profile in profiles) / 1000
+
+    # Self time grouped by top level package, median of the runs
+    packages = collections.defaultdict(list)
+    for profile in profiles:
+        totals = collections.Counter()
+        for name, (self_us, _) in profile.items():
+            totals[name.split(".")[0]] += self_us
+        for package, total in totals.items():
+            packages[package].append(total)
+    grouped = sorted(((statistics.median(values) / 1000, package) for package, values in packages.items()),
+                     reverse=True)
+
+    print(f"runs={runs} python={sys.version.split()[0]}")
+    print(f"import main {import_ms:8.1f} ms ({len(profiles[0])} modules)")
+    for package_ms, package in grouped[:top]:
+        print(f"  {package:24} {package_ms:8.1f} ms")
+
+    start_times = [cold_start() for _ in range(runs)]
+    start_ms = statistics.median(start_times) * 1000
+    print(f"cold start until the first page {start_ms:8.1f} ms (min {min(start_times) * 1000:.1f} ms)")
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in profiles[0]]
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    if import_budget and import_ms > import_budget:
+        failures.append(f"import main {import_ms:.1f} ms exceeds the budget of {import_budget:.1f} ms")
+    if start_budget and start_ms > start_budget:
+        failures.append(f"cold start {start_ms:.1f} ms exceeds the budget of {start_budget:.1f} ms")
+    for failure in failures:
+        print("ERROR", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,25 +22,36 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from flask import Flask, render_template, jsonify, request, Blueprint, redirect, url_for
+from flask import Flask, Response, render_template, jsonify, request, Blueprint, redirect, send_file, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
 
-import faulthandler
-import signal
-import sys
 import time
 
 import ctrlxdatalayer
-from ctrlxdatalayer.variant import Result, Variant, VariantType
-
+from ctrlxdatalayer.variant import Result, Variant
+
+from app.app_state import AppState
+from app.datalayer_bulk import BulkAccess, DebouncedWriter
+from app.datalayer_connection import DatalayerConnection
+from app.datalayer_pool import DatalayerClientPool
+from app.job_queue import JobCancelled, JobQueue
+from app.live_values import LiveValueBridge, value_to_variant
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
+from app.page_cache import IMMUTABLE_CACHE_CONTROL, RenderCache, StaticFingerprints
+from app.read_cache import ReadCache
+from app.registration_service import (ALL_FILES, DONE, PENDING, REGISTER_ADDRESS, TIMEOUT, UNREGISTER_ADDRESS,
+                                      RegistrationService, registration_path)
+from appdata.after_reboot import AFTER_REBOOT_PREFIX
+from app.serving import run_server
 from appdata.app_data_control import AppDataControl
+from appdata.storage_index import CATALOGS
 
-time.sleep(10)
+# The provider nodes (app/my_provider_node.py, app/diagnostics_provider.py) are imported in start_provider(),
+# they are only needed once the Data Layer is connected (see benchmarks/profile_startup.py)
 
-message = None
-global_json_files = None 
-registered_json = None
-successfully_saved = None
+# State of the web UI, shared by the worker threads of the web server
+state = AppState()
 
 if 'SNAP' in os.environ:
     root_path = os.getenv("SNAP")
@@ -52,150 +63,740 @@ else:
 template_path = root_path + '/templates'
 static_path = root_path + '/static'
 
-# Binary sampleSchema file
-bfbs_file = root_path + "/bfbs/robotActualValues.bfbs"
+# Maximum size of an uploaded CSV file in bytes
+max_upload_size = int(os.getenv("DIAG_MAX_UPLOAD_SIZE", 32 * 1024 * 1024))
+
+# Write the compact binary catalogs (Diag<LANG>.bin) next to the JSON files
+write_binary_catalog = os.getenv("DIAG_BINARY_CATALOG", "0") == "1"
+
+# Serving mode of the web server: 'production' (multi-threaded WSGI server) or 'debug' (Flask development server)
+server_mode = os.getenv("DIAG_SERVER_MODE", "production")
+server_port = int(os.getenv("DIAG_SERVER_PORT", 5000))
+server_threads = int(os.getenv("DIAG_SERVER_THREADS", 8))
+
+# Timeout of register/unregister operations at the Data Layer in seconds
+datalayer_timeout = float(os.getenv("DIAG_DATALAYER_TIMEOUT", 10))
 
-# Binary metadata file
-mddb_file = root_path + "/mddb/metadata.mddb"
+# Interval in seconds in which debounced writes (e.g. of a slider) are collected, only the latest value is written
+write_debounce_interval = float(os.getenv("DIAG_WRITE_DEBOUNCE", 0.1))
+
+# Time in seconds for which values read from the Data Layer are cached (values of subscribed addresses do not expire)
+read_cache_ttl = float(os.getenv("DIAG_READ_CACHE_TTL", 1.0))
+
+# Number of Data Layer clients for the synchronous calls of web requests
+datalayer_pool_size = int(os.getenv("DIAG_DATALAYER_POOL_SIZE", 4))
+
+# Data Layer addresses shown and written by the web UI (static/js/script.js), comma separated
+live_addresses = [address for address in os.getenv(
+    "DIAG_LIVE_ADDRESSES",
+    "motion/axs/AxisX/cmd/power,motion/axs/AxisY/cmd/power,motion/axs/AxisZ/cmd/power,"
+    "plc/app/Application/sym/GVL/fFUSpeed").split(",") if address]
 
 # addresses of provided values
 address_base = "webserver/"
 
 bp = Blueprint('webserver',__name__, static_folder=static_path, template_folder=template_path)
 
+# The index page is rendered again only when the state changes, static files are served with fingerprinted URLs
+render_cache = RenderCache()
+static_fingerprints = StaticFingerprints(static_path)
+
 datalayer_system = ctrlxdatalayer.system.System("")
 datalayer_system.start(False)
 
-datalayer_client = datalayer_system.factory().create_client(connection_string)
+# The Data Layer is connected in the background, the web UI is served right away
+datalayer_connection = DatalayerConnection(datalayer_system, connection_string)
+
+# Web requests and registrations use clients of a pool, which are health checked and rebuilt in the background
+datalayer_pool = DatalayerClientPool(datalayer_system, connection_string, size=datalayer_pool_size)
+datalayer_pool.start()
+
+# Register and unregister run asynchronously, the web requests do not wait for the Data Layer
+registration_service = RegistrationService(datalayer_pool, timeout=datalayer_timeout)
+
+app_data_control = AppDataControl(write_binary_catalog=write_binary_catalog, metrics=metrics)
+
+
+#The JSON files shown on the page follow the storage location, also if files are added or removed outside of the app
+def publish_storage_changes(index, categories):
+    if CATALOGS in categories:
+        state.update(global_json_files=index.json_files())
+
+
+# The files of the storage location are listed once and watched (inotify, or polling), listings are served from memory
+app_data_control.storage_index.on_change(publish_storage_changes)
+app_data_control.storage_index.start()
 
-app_data_control = AppDataControl()
+# Compile, validate and register run as background jobs, the progress is streamed to the page (Server-Sent Events)
+job_queue = JobQueue(max_streams=max(1, server_threads // 4))
 
-if datalayer_client is None:
-    print("WARNING Connecting", connection_string, "failed.")
-    datalayer_system.stop(False)
-    sys.exit(1)
+# One Data Layer subscription for all values of the web UI, pushed to the browsers as Server-Sent Events
+# Every open event stream occupies a worker thread, at most half of them are used for streams
+live_values = LiveValueBridge(live_addresses, max_clients=max(1, server_threads // 2))
 
+# Many addresses are read or written with one bulk request, the types of the nodes are taken from the subscription
+bulk_access = BulkAccess(datalayer_pool, known_type=live_values.value_type)
 
-def has_non_empty_value(d):
-    return any(d.values())
+# Reads are served from the subscription or a TTL cache, only the misses are read with one bulk read
+read_cache = ReadCache(bulk_access, live_values, default_ttl=read_cache_ttl)
+debounced_writer = DebouncedWriter(read_cache, interval=write_debounce_interval)
 
 
 #Method for an (initial) registration
 def initial_registration(file_name):
-    global registered_json
     file_name_initial = str(file_name.split('-')[1])
-    original_path = "/var/snap/rexroth-solutions/common/solutions/DefaultSolution/configurations/appdata/diagnostics"
-    path_to_write = f"{original_path}/{file_name_initial}"
-    with Variant() as data:
-        data.set_string(path_to_write) 
-        print("INFO Ready to write", flush=True)        
-        result, variant = datalayer_client.write_sync("diagnosis/registration/register-file", data) 
-        print("INFO result of writing:", result, flush=True)
-        if (result != Result.OK):
-            print("INFO Result not OK", flush=True)
-            sys.exit(1)
-        if (result == Result.OK):                 
-            print("INFO Written", flush=True)
-            registered_json = file_name_initial  
+
+    def on_registered(operation):
+        print("INFO Written", flush=True)
+        state.update(registered_json=file_name_initial)
+
+    print("INFO Ready to write", flush=True)        
+    operation = registration_service.submit("register", file_name_initial,
+                                            [(REGISTER_ADDRESS, registration_path(file_name_initial))], on_registered)
+    state.update(last_operation=operation)
             
 
-#Check if there are initial Files to register e.g. after a reboot
-bInitial = None
-InitialRegistration = app_data_control.search_file_after_reboot()
-print("INFO Initial File: ", InitialRegistration, flush=True)
-if InitialRegistration is not None:
-    bInitial = True
-    print("INFO Ready for initial registration", flush=True)
-    initial_registration(InitialRegistration)
+#Method for an (initial) registration of several files with one bulk write
+def initial_registration_all(file_names):
+    file_names_initial = [file_name[len(AFTER_REBOOT_PREFIX):] for file_name in file_names]
+
+    def on_registered(operation):
+        succeeded = [name for name in file_names_initial if operation.file_results.get(name) == Result.OK.name]
+        print("INFO Written", succeeded, flush=True)
+        state.update(registered_files=succeeded)
 
+    operation = registration_service.submit_bulk("register", REGISTER_ADDRESS, file_names_initial,
+                                                 on_success=on_registered)
+    state.update(last_operation=operation)
 
+
+#Check if there are initial Files to register e.g. after a reboot
+#This runs as soon as the Data Layer connection is up
+def register_after_reboot(datalayer_client):
+    # The registration takes its client from the pool, which connects independently of this connection
+    if not datalayer_pool.wait(datalayer_timeout):
+        print("WARNING No Data Layer pool client for the initial registration", flush=True)
+        return False
+    with state.operation_lock:
+        InitialRegistrations = app_data_control.search_files_after_reboot()
+    print("INFO Initial Files: ", InitialRegistrations, flush=True)
+    if len(InitialRegistrations) > 1:
+        state.update(initial_registration=True)
+        print("INFO Ready for initial registration of all files", flush=True)
+        initial_registration_all(InitialRegistrations)
+        return True
+
+    InitialRegistration = next(iter(InitialRegistrations), None)
+    if InitialRegistration is not None:
+        state.update(initial_registration=True)
+        print("INFO Ready for initial registration", flush=True)
+        initial_registration(InitialRegistration)
+        return True
+    return False
+
+
+#Command 'save' of the node webserver/app-cmd: create the JSON files from the uploaded CSV file
+def save_command():
+    with state.operation_lock:
+        saved = app_data_control.save()
+        state.update(global_json_files=app_data_control.list_json_files())
+        refresh_diagnostics_index()
+    return saved
+
+
+#The nodes below webserver/diagnostics are served from an index of the catalogs, rebuilt after every save
+#The index is built from the catalogs that were just compiled, or from the JSON files if they were up to date
+def refresh_diagnostics_index():
+    if diagnostics_node is None:
+        return
+    from app.diagnostics_provider import DiagnosticsIndex
+    if app_data_control.saved_catalogs is not None:
+        diagnostics_node.set_index(DiagnosticsIndex(*app_data_control.saved_catalogs))
+    else:
+        diagnostics_node.set_index(DiagnosticsIndex.from_directory(app_data_control.storage_location))
+
+
+#Command 'load' of the node webserver/app-cmd: register the files of the stored registration state again
+def load_command():
+    return register_after_reboot(None)
+
+
+#Provider of the webserver/ nodes, the nodes are kept referenced as long as the app runs
+provider_nodes = []
+diagnostics_node = None
+
+
+def start_provider(datalayer_client):
+    from app.diagnostics_provider import DIAGNOSTICS_NODE, DiagnosticsIndex, DiagnosticsProviderNode
+    from app.my_provider_node import MyProviderNode
+
+    provider = datalayer_system.factory().create_provider(connection_string)
+    if provider is None or provider.start() != Result.OK:
+        print("ERROR Starting Data Layer provider failed", flush=True)
+        return
+
+    app_cmd = Variant()
+    app_cmd.set_string("")
+    node = MyProviderNode(provider, address_base + "app-cmd", app_cmd, {"save": save_command, "load": load_command})
+    result = node.register_node()
+    if result != Result.OK:
+        print("ERROR Registering node", address_base + "app-cmd", "failed:", result, flush=True)
+        return
+    provider_nodes.append((provider, node))
+    print("INFO Provided node", address_base + "app-cmd", flush=True)
+
+    global diagnostics_node
+    with state.operation_lock:
+        index = DiagnosticsIndex.from_directory(app_data_control.storage_location)
+    node = DiagnosticsProviderNode(provider, index)
+    result = node.register_node()
+    if result != Result.OK:
+        print("ERROR Registering node", DIAGNOSTICS_NODE, "failed:", result, flush=True)
+        return
+    provider_nodes.append((provider, node))
+    diagnostics_node = node
+    print("INFO Provided", len(index), "nodes below", DIAGNOSTICS_NODE, flush=True)
+
+
+datalayer_connection.on_connected(register_after_reboot)
+datalayer_connection.on_connected(live_values.start)
+datalayer_connection.on_connected(start_provider)
+datalayer_connection.start()
+
+
+#Readiness of the app: 200 once the Data Layer is connected, 503 before
+@bp.route('/api/ready')
+def ready_route():
+    status = datalayer_connection.status()
+    return jsonify(status), 200 if status["connected"] else 503
+
+
+# Static files referenced by the index page with fingerprinted URLs
+PAGE_ASSETS = ('css/styles.css', 'js/script.js')
+
+
+#The index page is served from the render cache with ETag/Last-Modified, browsers revalidate it and get a 304
+#The fingerprints of its static files are part of the key, so a changed file is referenced with its new URL
 @bp.route('/')
 def index():
-    return render_template('index.html', json_files=global_json_files, registered_json=registered_json, message=message, successfully_saved=successfully_saved) 
+    key, modified = state.render_key()
+    key = (key, tuple(static_fingerprints.fingerprint(asset) for asset in PAGE_ASSETS))
+    body, etag = render_cache.get(key, lambda: render_template('index.html', **state.snapshot()))
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.last_modified = modified
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+#url_for('webserver.static', ...) adds the fingerprint of the file ('?v=...'), so the URL changes with the content
+@bp.url_defaults
+def static_fingerprint(endpoint, values):
+    if endpoint == 'webserver.static' and 'filename' in values and 'v' not in values:
+        fingerprint = static_fingerprints.fingerprint(values['filename'])
+        if fingerprint is not None:
+            values['v'] = fingerprint
+
+
+#Fingerprinted static files are cached by the browser (and the reverse proxy) without revalidation
+@bp.after_request
+def static_cache_headers(response):
+    if request.endpoint == 'webserver.static' and request.args.get('v') and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
 
 #Upload file
+#The file is validated while it is received, so the error map is available as soon as the upload is complete
 @bp.route('/api/upload_file', methods=['POST'])
 def upload_file():  
-    global message
-    global successfully_saved
-    file = request.files['file']
+    try:
+        file = request.files['file']
+    except RequestEntityTooLarge:
+        state.update(successfully_saved=False,
+                     message={"Upload failed": f"The file exceeds the maximum size of {max_upload_size} bytes."})
+        return redirect(url_for('webserver.index'))
     if file:
-        successfully_saved = app_data_control.upload(file)
-        time.sleep(1)
-        if successfully_saved:
-            message = app_data_control.search_for_error()
-        elif successfully_saved is False:
-            message = {"Upload failed": "Please upload the Diag.csv file."}
+        with state.operation_lock:
+            saved, upload_message = app_data_control.upload_stream(file, max_upload_size)
+            if saved is not None:
+                state.update(successfully_saved=saved, message=upload_message)
     return redirect(url_for('webserver.index'))
 
 
+#Job 'compile': create the JSON files from the uploaded CSV file, the progress is reported per rows and languages
+def compile_job(job):
+    with state.operation_lock:
+        try:
+            if not app_data_control.save(job.report):
+                raise RuntimeError("Saving application data not possible")
+            refresh_diagnostics_index()
+        finally:
+            json_files = app_data_control.list_json_files()
+            state.update(global_json_files=json_files)
+    print(json_files)
+    return {"files": json_files}
+
+
+#Job 'validate': search the uploaded CSV file for errors, the error map is shown on the page
+def validate_job(job):
+    with state.operation_lock:
+        message = app_data_control.search_for_error(job.report)
+        state.update(message=message, successfully_saved=not message)
+    return {"errors": len(message)}
+
+
+#Job 'register': register all JSON files with one bulk write and wait for the result
+#The job is cancelled before the write is started; later a cancel only stops waiting, the bulk write at the Data Layer
+#is not interrupted
+def register_job(job):
+    with state.operation_lock:
+        json_files = app_data_control.list_json_files()
+    if not json_files:
+        raise ValueError("No JSON files to register")
+    job.report(files=len(json_files))
+    operation = register_all_files(json_files)
+    wait_for_operation(job, operation)
+    return {"files": operation.file_results}
+
+
+#This function waits until a register/unregister operation started by a job has finished
+def wait_for_operation(job, operation):
+    if operation is None:
+        raise RuntimeError("Data Layer not connected or busy")
+    while operation.status == PENDING:
+        if job.cancelled():
+            raise JobCancelled()
+        time.sleep(0.1)
+    if operation.status != DONE:
+        raise RuntimeError(f"{operation.action.capitalize()} {operation.status}: {operation.result}")
+
+
+#Job 'update': update the registered files to the current catalogs without a gap in the registration
+#Every registered file is compared with its catalog by diagnosis number. Unchanged files are not written to the
+#Data Layer; for a changed file the new version is registered first and the old one unregistered afterwards
+def update_job(job):
+    with state.lock:
+        registered_json = state.registered_json
+        registered_files = [registered_json] if registered_json is not None else list(state.registered_files)
+        initial = state.initial_registration
+    if not registered_files:
+        raise ValueError("No JSON files registered")
+
+    with state.operation_lock:
+        plans = app_data_control.plan_catalog_update(registered_files)
+    changed = [plan for plan in plans if plan["version"] is not None]
+    job.report(files=len(plans), changed=len(changed))
+    result = {plan["registered"]: plan["diff"] for plan in plans}
+    if not changed:
+        print("INFO Registered catalogs are up to date", flush=True)
+        return {"updated": {}, "unchanged": list(result)}
+
+    # Register the new version, then unregister the old one (twice after an initial registration, see unregister)
+    writes = []
+    for plan in changed:
+        writes.append((REGISTER_ADDRESS, registration_path(plan["version"])))
+        writes += [(UNREGISTER_ADDRESS, registration_path(plan["registered"]))] * (2 if initial else 1)
+    writes_per_file = len(writes) // len(changed)
+
+    # Files registered after the operation: after a failure the new version is kept if its register succeeded
+    # (or timed out, it may have succeeded), the old version if its unregister did not succeed
+    def registered_after(operation):
+        timed_out = operation.status == TIMEOUT
+        names = []
+        for plan in plans:
+            if plan["version"] is None:
+                names.append(plan["registered"])
+                continue
+            first = changed.index(plan) * writes_per_file
+            if operation.completed > first or (timed_out and operation.completed == first):
+                names.append(plan["version"])
+            if operation.completed < first + writes_per_file:
+                names.append(plan["registered"])
+        return names
+
+    def on_updated(operation):
+        names = registered_after(operation)
+        with state.operation_lock:
+            app_data_control.store_registered_files(names)
+            if registered_json is not None and len(names) == 1:
+                state.update(registered_json=names[0], registered_files=[], initial_registration=False)
+            else:
+                state.update(registered_json=None, registered_files=names, initial_registration=False)
+
+    file_name = registered_json if registered_json is not None else ALL_FILES
+    operation = registration_service.submit("update", file_name, writes, on_updated, on_failure=on_updated)
+    if operation is not None:
+        state.update(last_operation=operation)
+    wait_for_operation(job, operation)
+    return {"updated": {plan["registered"]: plan["version"] for plan in changed},
+            "unchanged": [plan["registered"] for plan in plans if plan["version"] is None], "diff": result}
+
+
+#Job 'rebuild': compile the catalogs of all products (Diag.csv and Diag_<PRODUCT>.csv) again
+#The products are compiled in parallel worker processes, the progress is reported per product
+def rebuild_job(job):
+    with state.operation_lock:
+        try:
+            results = app_data_control.rebuild_all(progress=job.report)
+        finally:
+            # Also after a cancel, the products finished until then have new catalogs
+            state.update(global_json_files=app_data_control.list_json_files())
+            refresh_diagnostics_index()
+    if results is None:
+        raise RuntimeError("Storage location not available")
+    failed = [product or app_data_control.storage_file_name
+              for product, written in results.items() if written is None]
+    if failed:
+        state.update(message={"Rebuild failed": f"The catalogs of {', '.join(failed)} could not be compiled."})
+        raise RuntimeError(f"The catalogs of {', '.join(failed)} could not be compiled")
+    return {"products": len(results)}
+
+
+# Every kind of job can be cancelled while it runs: each one reports its progress or checks job.cancelled() between
+# its steps (rows, languages, products, waiting for the Data Layer)
+JOBS = {"compile": compile_job, "validate": validate_job, "register": register_job, "update": update_job,
+        "rebuild": rebuild_job}
+
+
+#This function returns the key of a job on the uploaded CSV file: its signature (modification time, size, inode)
+#Submissions for the same file collapse into the queued or running job. The file is not read, so the request
+#returns at once; the job itself skips the compilation if the content is unchanged (see compile_cache.py)
+def csv_job_key():
+    try:
+        return AppDataControl.file_signature(app_data_control.storage_file)
+    except OSError:
+        return None
+
+
+#This function queues a job and shows it on the index page
+def submit_job(kind):
+    job = job_queue.submit(kind, JOBS[kind], None if kind in ("rebuild", "update") else csv_job_key())
+    state.update(last_job=job)
+    return job
+
+
 #API to update
+#The JSON files are created by a background job, the page shows its progress
 @bp.route('/api/update', methods=['POST'])
 def update_route():
-    global global_json_files
-    app_data_control.save() 
-    global_json_files = app_data_control.list_json_files()
-    print(global_json_files)
-    
+    submit_job("compile")
+    return redirect(url_for('webserver.index'))
+
+
+#API to compile the catalogs of all products (Diag.csv and Diag_<PRODUCT>.csv) again, as background job
+@bp.route('/api/rebuild_all', methods=['POST'])
+def rebuild_all_route():
+    submit_job("rebuild")
+    return redirect(url_for('webserver.index'))
+
+
+#API to update the registered files to the current catalogs, as background job (see update_job)
+@bp.route('/api/datalayer/update', methods=['POST'])
+def update_registration_route():
+    submit_job("update")
     return redirect(url_for('webserver.index'))
 
 
+#API to queue a job: compile, validate, register, update or rebuild
+#Returns 202 with the job at once, its state is served at /api/jobs/<id> and streamed at /api/jobs/<id>/events
+@bp.route('/api/jobs/<kind>', methods=['POST'])
+def submit_job_route(kind):
+    if kind not in JOBS:
+        return jsonify({"message": f"Unknown job {kind}, expected one of {list(JOBS)}"}), 404
+    job = submit_job(kind)
+    return jsonify(job.to_dict()), 202, {'Location': url_for('webserver.job_route', job_id=job.id)}
+
+
+#State of the recent jobs
+@bp.route('/api/jobs')
+def jobs_route():
+    return jsonify(job_queue.jobs())
+
+
+#State of a job
+@bp.route('/api/jobs/<int:job_id>')
+def job_route(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"message": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+
+#Server-Sent Events stream of the progress of a job, it ends with the 'finished' event
+@bp.route('/api/jobs/<int:job_id>/events')
+def job_events_route(job_id):
+    if job_queue.get(job_id) is None:
+        return jsonify({"message": "Unknown job"}), 404
+    stream = job_queue.open_stream(job_id)
+    if stream is None:
+        return jsonify({"message": "Too many event streams"}), 503
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+#API to cancel a job: a queued job is cancelled at once, a running job at its next progress report or check
+@bp.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job_route(job_id):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({"message": "Unknown job"}), 404
+    return jsonify(job.to_dict()), 202
+
+
 #API to register
+#The registration runs in the background, the page polls its state
 @bp.route('/api/datalayer/register', methods=['POST'])
 def register_route():
-    global registered_json
     selected_file = request.form.get('selected_file')
     if selected_file:
         selected_file = str(selected_file) 
-        original_path = "/var/snap/rexroth-solutions/common/solutions/DefaultSolution/configurations/appdata/diagnostics"
-        path_to_write = f"{original_path}/{selected_file}"
-        with Variant() as data:
-            data.set_string(path_to_write) 
-            result, variant = datalayer_client.write_sync("diagnosis/registration/register-file", data) 
-            if (result == Result.OK):
-                registered_json = selected_file  
-                if registered_json is not None:
-                    app_data_control.copy_json_file(registered_json)    
+
+        def on_registered(operation):
+            with state.operation_lock:
+                state.update(registered_json=selected_file, registered_files=[])
+                app_data_control.copy_json_file(selected_file)
+
+        operation = registration_service.submit("register", selected_file,
+                                                [(REGISTER_ADDRESS, registration_path(selected_file))], on_registered)
+        if operation is None:
+            print("WARNING Registration not started, Data Layer not connected or busy", flush=True)
+        else:
+            state.update(last_operation=operation)
     
     return redirect(url_for('webserver.index'))
 
 
 #API to unregister
+#Note that after an initial registration (after a reboot) the unregister-file node needs to be written twice
 @bp.route('/api/datalayer/unregister', methods=['POST'])
 def unregister_route():
-    global registered_json
-    global bInitial
+    with state.lock:
+        registered_json = state.registered_json
+        initial = state.initial_registration
     if registered_json is not None:
-        original_path = "/var/snap/rexroth-solutions/common/solutions/DefaultSolution/configurations/appdata/diagnostics"
-        path_to_write = f"{original_path}/{registered_json}"
+        path_to_write = registration_path(registered_json)
         print("INFO path to unregister: ", path_to_write, flush=True)
-        with Variant() as data:
-            data.set_string(path_to_write)
-            print("INFO json path data to unregister: ", data, flush=True)
-            result, variant = datalayer_client.write_sync("diagnosis/registration/unregister-file", data)
-            print("INFO result of writing:", result, flush=True)
-            if (result != Result.OK):
-                print("INFO Result not OK", flush=True)
-            if not bInitial and (result == Result.OK):
+        writes = [(UNREGISTER_ADDRESS, path_to_write)] * (2 if initial else 1)
+
+        def on_unregistered(operation):
+            with state.operation_lock:
                 app_data_control.delete_after_reboot_json()  
-                registered_json = None  
-            
-            elif (bInitial == True) and (result == Result.OK):
-                result2, variant2 = datalayer_client.write_sync("diagnosis/registration/unregister-file", data)
-                print("INFO result of writing:", result2, flush=True)
-                if (result2 != Result.OK):
-                    print("INFO Result not OK", flush=True)
-                if (result2 == Result.OK):
-                    bInitial = False                
-                    app_data_control.delete_after_reboot_json()  
-                    registered_json = None       
+                state.update(registered_json=None, initial_registration=False)
+
+        operation = registration_service.submit("unregister", registered_json, writes, on_unregistered)
+        if operation is None:
+            print("WARNING Unregistration not started, Data Layer not connected or busy", flush=True)
+        else:
+            state.update(last_operation=operation)
     
     return redirect(url_for('webserver.index'))
 
 
+#This function registers JSON files (all languages) with one bulk write to the Data Layer
+#The result is reported per file, the files that were registered are stored for a registration after a reboot
+def register_all_files(json_files):
+
+    def on_registered(operation):
+        succeeded = [name for name in json_files if operation.file_results.get(name) == Result.OK.name]
+        with state.operation_lock:
+            app_data_control.copy_json_files(succeeded)
+            state.update(registered_files=succeeded, registered_json=None, initial_registration=False)
+
+    operation = registration_service.submit_bulk("register", REGISTER_ADDRESS, json_files, on_success=on_registered)
+    if operation is not None:
+        state.update(last_operation=operation)
+    return operation
+
+
+#API to register all JSON files (all languages) with one bulk write to the Data Layer
+@bp.route('/api/datalayer/register_all', methods=['POST'])
+def register_all_route():
+    with state.operation_lock:
+        json_files = app_data_control.list_json_files()
+    if json_files and register_all_files(json_files) is None:
+        print("WARNING Registration not started, Data Layer not connected or busy", flush=True)
+
+    return redirect(url_for('webserver.index'))
+
+
+#API to unregister all files that were registered with register_all
+#As for a single file, the unregister-file node is written twice after an initial registration (after a reboot)
+@bp.route('/api/datalayer/unregister_all', methods=['POST'])
+def unregister_all_route():
+    with state.lock:
+        registered_files = list(state.registered_files)
+        initial = state.initial_registration
+    if registered_files:
+
+        def on_unregistered(operation):
+            remaining = [name for name in registered_files if operation.file_results.get(name) != Result.OK.name]
+            with state.operation_lock:
+                if remaining:
+                    app_data_control.store_registered_files(remaining)
+                else:
+                    app_data_control.delete_after_reboot_json()
+                state.update(registered_files=remaining, initial_registration=False)
+
+        operation = registration_service.submit_bulk("unregister", UNREGISTER_ADDRESS, registered_files,
+                                                     rounds=2 if initial else 1, on_success=on_unregistered)
+        if operation is None:
+            print("WARNING Unregistration not started, Data Layer not connected or busy", flush=True)
+        else:
+            state.update(last_operation=operation)
+
+    return redirect(url_for('webserver.index'))
+
+
+#Latest values of the addresses of the web UI
+@bp.route('/api/datalayer/values')
+def values_route():
+    return jsonify(live_values.values())
+
+
+#Server-Sent Events stream of the values of the web UI: the current values first, then every change
+@bp.route('/api/datalayer/events')
+def events_route():
+    stream = live_values.open_stream()
+    if stream is None:
+        return jsonify({"message": "Too many event streams"}), 503
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+#API to write a value of the web UI (power buttons, speed slider)
+#Only the subscribed addresses can be written, the value is converted to the type of the subscribed value
+#With 'debounce=1' the write is queued and only the latest value within the debounce interval is written
+@bp.route('/api/datalayer', methods=['PUT'])
+def write_value_route():
+    address = request.args.get('data-path')
+    body = request.get_json(silent=True) or {}
+    if address not in live_values.addresses or "value" not in body:
+        return jsonify({"message": "Unknown address or missing value"}), 400
+
+    if request.args.get('debounce') == '1':
+        debounced_writer.submit({address: body["value"]})
+        return jsonify({"message": f"Queued {address}"}), 202
+
+    value_type = live_values.value_type(address)
+    if value_type is None:
+        return jsonify({"message": "Data Layer value not available"}), 503
+
+    try:
+        data = value_to_variant(body["value"], value_type)
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": str(e)}), 400
+    with data, datalayer_pool.client() as client:
+        if client is None:
+            return jsonify({"message": "Data Layer not connected"}), 503
+        result, _ = client.write_sync(address, data)
+    read_cache.invalidate([address])
+    if result != Result.OK:
+        return jsonify({"message": f"Writing {address} failed: {result.name}"}), 502
+    return jsonify({"message": f"Written {address}"})
+
+
+#API to read many values with one bulk read: {"addresses": [...], "fresh": false}
+#Returns {"items": [{"address", "result", "value", "timestamp"}]}, only the addresses of the web UI can be read
+#The values are served from the read cache unless "fresh" is true
+@bp.route('/api/datalayer/bulk/read', methods=['POST'])
+def bulk_read_route():
+    body = request.get_json(silent=True) or {}
+    addresses = body.get("addresses")
+    if not isinstance(addresses, list) or not addresses or any(address not in live_values.addresses for address in addresses):
+        return jsonify({"message": "Unknown or missing addresses"}), 400
+
+    items = bulk_access.read(addresses) if body.get("fresh") else read_cache.read(addresses)
+    if items is None:
+        return jsonify({"message": "Data Layer not connected"}), 503
+    return jsonify({"items": items})
+
+
+#API to write many values with one bulk write: {"items": [{"address", "value"}], "debounce": false}
+#With "debounce": true the values are queued and only the latest value of every address is written
+@bp.route('/api/datalayer/bulk/write', methods=['POST'])
+def bulk_write_route():
+    body = request.get_json(silent=True) or {}
+    requested = body.get("items")
+    if (not isinstance(requested, list) or not requested
+            or any(not isinstance(item, dict) or item.get("address") not in live_values.addresses or "value" not in item
+                   for item in requested)):
+        return jsonify({"message": "Unknown addresses or missing values"}), 400
+    values = {item["address"]: item["value"] for item in requested}
+
+    if body.get("debounce"):
+        debounced_writer.submit(values)
+        return jsonify({"message": "Queued", "addresses": list(values)}), 202
+
+    items = read_cache.write(values)
+    if items is None:
+        return jsonify({"message": "Data Layer not connected"}), 503
+    return jsonify({"items": items})
+
+
+#Download of a JSON catalog with ETag and Range support
+#The precompressed variant (brotli or gzip) accepted by the client is sent as is, nothing is compressed per request
+@bp.route('/api/catalogs/<file_name>')
+def download_catalog_route(file_name):
+    from appdata.catalog_download import ENCODINGS
+    accepted = [encoding for encoding, _ in ENCODINGS if request.accept_encodings.quality(encoding) > 0]
+    download = app_data_control.catalog_download(file_name, accepted)
+    if download is None:
+        return jsonify({"message": "Unknown catalog"}), 404
+    path, encoding, etag = download
+    response = send_file(path, mimetype='application/json', as_attachment=True, download_name=file_name,
+                         conditional=True, etag=etag if etag is not None else True, max_age=0)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+#Download of all JSON catalogs as one zip file, streamed from the files and their precompressed variants
+@bp.route('/api/catalogs.zip')
+def download_bundle_route():
+    bundle = app_data_control.catalog_bundle()
+    response = Response(bundle, mimetype='application/zip',
+                        headers={'Content-Length': str(bundle.size),
+                                 'Content-Disposition': 'attachment; filename=diagnostics-catalogs.zip'})
+    response.set_etag(bundle.etag())
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+#Counters and latency histograms of the instrumented operations in the Prometheus text format
+@bp.route('/metrics')
+def metrics_route():
+    if not metrics.enabled:
+        return jsonify({"message": "Metrics are switched off (DIAG_METRICS=0)"}), 404
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+#State of the Data Layer client pool
+@bp.route('/api/datalayer/pool')
+def pool_route():
+    return jsonify(datalayer_pool.stats())
+
+
+#Hit/miss counters of the read cache
+@bp.route('/api/datalayer/cache')
+def cache_route():
+    return jsonify(read_cache.stats())
+
+
+#State of a register/unregister operation, polled by the index page
+@bp.route('/api/datalayer/operations/<int:operation_id>')
+def operation_route(operation_id):
+    operation = registration_service.get(operation_id)
+    if operation is None:
+        return jsonify({"error": "Unknown operation"}), 404
+    return jsonify(operation.to_dict())
+
+
 app = Flask(__name__)
 app.secret_key = 'Hello'
+# Reject oversized request bodies before they are spooled (leaves room for the multipart framing)
+app.config['MAX_CONTENT_LENGTH'] = max_upload_size + 64 * 1024
 app.register_blueprint(bp, url_prefix='/webserver')
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000, host='0.0.0.0') 
+    run_server(app, server_mode, port=server_port, threads=server_threads) 
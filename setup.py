@@ -6,7 +6,7 @@ setup(
     description='This sample shows how to provide data to ctrlX Data Layer',
     author='SDK Team',
     packages = ['app', 'appdata'],
-    install_requires = ['flask', 'ctrlx-datalayer', 'ctrlx-fbs', 'pyopenssl'],
+    install_requires = ['flask', 'ctrlx-datalayer', 'ctrlx-fbs', 'pyopenssl', 'waitress'],
     # https://stackoverflow.com/questions/1612733/including-non-python-files-with-setup-py
     package_data={},
     scripts=['main.py'],
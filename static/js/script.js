@@ -16,19 +16,39 @@ document.addEventListener('DOMContentLoaded', () => {  // Ensure the DOM is full
     });
 });
 
+// Buttons by Data Layer address, updated with the values pushed by the server
+const buttons = {};
+
+// Live values: the server holds one Data Layer subscription and pushes every change (Server-Sent Events)
+// The browser reconnects on its own if the stream is interrupted
+document.addEventListener('DOMContentLoaded', () => {
+    const events = new EventSource('/webserver/api/datalayer/events');
+    events.addEventListener('values', (event) => {
+        const values = JSON.parse(event.data);
+        for (const [path, value] of Object.entries(values)) {
+            if (buttons[path]) {
+                buttons[path].showState(value ? 'clicked' : 'not-clicked');
+            } else if (path === volumeSliderPath && volumeSlider) {
+                volumeSlider.value = value;
+                document.getElementById('volumeValue').textContent = value;
+            }
+        }
+    });
+});
 
-const volumeSlider = document.getElementById('volumeSlider');
 
-//volumeSlider.addEventListener('input', function() {
+const volumeSlider = document.getElementById('volumeSlider');
+const volumeSliderPath = 'plc/app/Application/sym/GVL/fFUSpeed';
 
-volumeSlider.addEventListener('change', function() {
+// Every movement of the slider is sent, the server debounces the writes and writes only the latest value
+if (volumeSlider) volumeSlider.addEventListener('input', function() {
     let value = volumeSlider.value;
 
     // Display the current value
     document.getElementById('volumeValue').textContent = value;
 
     // Construct URL with parameters
-    let apiUrl = `/api/datalayer?data-path=plc/app/Application/sym/GVL/fFUSpeed`;
+    let apiUrl = '/webserver/api/datalayer?debounce=1&data-path=' + volumeSliderPath;
 
     // Send the value to the server
     fetch(apiUrl, {
@@ -65,7 +85,17 @@ class Button {
         this.state = 'not-clicked';
 
         // path to datalayer
-        this.apiUrl = '/api/datalayer?data-path=' + pathtoDL;
+        this.apiUrl = '/webserver/api/datalayer?data-path=' + pathtoDL;
+        buttons[pathtoDL] = this;
+    }
+
+    // Method to show a state without writing it (e.g. a value pushed by the server)
+    showState(state) {
+        this.state = state;
+        if (this.buttonElement) {
+            this.buttonElement.textContent = state === 'clicked' ? 'Ein' : 'Aus';
+            this.buttonElement.setAttribute('data-state', state);
+        }
     }
 
     // Method to toggle the button's state
@@ -0,0 +1,151 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import datetime
+
+from ctrlxdatalayer.bulk import Response
+from ctrlxdatalayer.variant import Result, Variant
+
+from app.live_values import variant_to_value
+
+# FILETIME (100 ns since 1601-01-01 UTC) of the responses built by the fakes
+RESPONSE_TIME = datetime.datetime(2026, 1, 1, 12, 0, 0)
+RESPONSE_FILETIME = int((RESPONSE_TIME - datetime.datetime(1601, 1, 1)).total_seconds()) * 10 ** 7
+
+
+#This function builds a real bulk.Response as ctrlxdatalayer builds it from the response of the Data Layer
+#value is a float64 value, None for an empty response (e.g. a failed read)
+def make_response(address, result=Result.OK, value=None):
+    with Variant() as variant:
+        if value is not None:
+            variant.set_float64(value)
+        return Response(address, variant.get_handle(), RESPONSE_FILETIME, result)
+
+
+#This class stands in for ctrlxdatalayer.bulk.Bulk: it records the requests and answers with real bulk.Response
+#objects, one per request and in the order of the requests, like Bulk.read()/Bulk.write() of ctrlx-datalayer 3.x
+class FakeBulk:
+    """FakeBulk"""
+
+    def __init__(self, results=None, values=None, result=Result.OK):
+        """__init__
+
+        results and values are the result and float64 value of every response, by position
+        """
+        self.results = results
+        self.values = values
+        self.result = result
+        self.requests = None
+        self.written = None
+        self._responses = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        for response in self._responses:
+            response.close()
+        self._responses = []
+
+    def read(self, request, cb=None, userdata=None):
+        return self._answer(request)
+
+    def write(self, request, cb=None, userdata=None):
+        # The variants of the requests are closed by the caller after the write, their values are kept here
+        self.written = [variant_to_value(bulk_request.data) for bulk_request in request]
+        return self._answer(request)
+
+    def _answer(self, request):
+        self.requests = list(request)
+        if self.result != Result.OK:
+            return self.result
+        for i, bulk_request in enumerate(self.requests):
+            result = self.results[i] if self.results else Result.OK
+            value = self.values[i] if self.values else None
+            self._responses.append(make_response(bulk_request.address, result, value))
+        return Result.OK
+
+    def get_response(self):
+        return self._responses
+
+
+#This class stands in for ctrlxdatalayer.client.Client: create_bulk() returns the given bulks one after the other
+class FakeClient:
+    """FakeClient"""
+
+    def __init__(self, *bulks):
+        """__init__"""
+        self.bulks = list(bulks)
+        # State reported by is_connected() and ping_sync(), changed by the tests
+        self.connected = True
+        self.ping = Result.OK
+        self.closed = False
+        # Writes of write_async() as (address, value, variant, callback), answered by the tests with respond()
+        self.async_writes = []
+        self.write_result = Result.OK
+
+    def create_bulk(self):
+        return self.bulks.pop(0)
+
+    def is_connected(self):
+        return self.connected
+
+    def ping_sync(self):
+        return self.ping
+
+    def close(self):
+        self.closed = True
+
+    def write_async(self, address, data, cb, userdata=None):
+        self.async_writes.append((address, variant_to_value(data), data, cb))
+        return self.write_result
+
+    #The following method calls the response callback of the oldest unanswered write_async()
+    def respond(self, result=Result.OK):
+        address, value, data, cb = self.async_writes.pop(0)
+        cb(result, None, None)
+        return data
+
+
+#This class stands in for ctrlxdatalayer.system.System: factory().create_client() returns the client built by create
+#(None for a failed creation) and remembers it
+class FakeSystem:
+    """FakeSystem"""
+
+    def __init__(self, create=FakeClient):
+        """__init__"""
+        self.create = create
+        self.clients = []
+
+    def factory(self):
+        return self
+
+    def create_client(self, connection_string):
+        client = self.create()
+        if client is not None:
+            self.clients.append(client)
+        return client
+
+
+#This class stands in for DatalayerClientPool (see app/datalayer_pool.py)
+class FakeClientPool:
+    """FakeClientPool"""
+
+    def __init__(self, client):
+        """__init__"""
+        self._client = client
+        # Number of clients handed out and not given back
+        self.in_use = 0
+
+    @contextlib.contextmanager
+    def client(self, timeout=1.0):
+        self.in_use += 1
+        try:
+            yield self._client
+        finally:
+            self.in_use -= 1
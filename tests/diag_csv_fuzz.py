@@ -0,0 +1,58 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import csv
+import io
+
+from benchmarks.bench_convert_csv_to_json import legacy_convert_csv_to_json
+from benchmarks.bench_search_for_error import legacy_search_for_error
+
+LANGUAGES = ("EN", "DE", "FR", "ES", "ZH")
+
+# Valid and invalid main diagnosis numbers, including numbers of the wrong size
+MAIN_NUMBERS = ("0E0A0001", "0F1F2ABC", "370E0FFF", "31098123", "0E2A0001", "1E0A0001", "0E0B0001", "0E0A1001",
+                "0E0F7001", "0E0AG001", "0e0a0001", "0E0A", "0E0A00012")
+DETAILED_NUMBERS = ("00000001", "0000ABCD", "D2")
+
+# Texts around the length limits (in UTF-8 bytes), with multi-byte characters, delimiters, quotes and line breaks
+# (no CR LF inside a text: the baseline read the file with universal newlines and turned it into LF)
+TEXTS = ("Text", "", " ", "x" * 60, "x" * 61, "y" * 250, "y" * 251, "ä" * 30, "ä" * 31, "ü" * 125, "ü" * 126,
+         "a;b", 'quote "x"', "two\nlines", "日本語のテキスト", "\"\"")
+
+
+#This function writes a random Diag.csv file: shuffled columns (rarely without a required one), 1 to 4 languages,
+#valid and invalid numbers and texts
+def write_random_diag_csv(rng, path, rows=40):
+    languages = rng.sample(LANGUAGES, rng.randint(1, 4))
+    headers = ["product name", "mainDiag No", "detailedDiagnostics No"] + [f"text-{lang}" for lang in languages]
+    if rng.random() < 0.05:
+        headers.remove(rng.choice(headers[:3]))
+    rng.shuffle(headers)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, delimiter=";", lineterminator=rng.choice(("\n", "\r\n")))
+        writer.writerow(headers)
+        for i in range(rng.randint(1, rows)):
+            if rng.random() < 0.05:
+                writer.writerow([""] * len(headers))
+                continue
+            row = {
+                "product name": rng.choice(("Product", "", "")) if i else rng.choice(("Product", "Product", "")),
+                "mainDiag No": rng.choice(MAIN_NUMBERS + ("",) * 10),
+                "detailedDiagnostics No": rng.choice(DETAILED_NUMBERS + ("",) * 4),
+            }
+            for lang in languages:
+                row[f"text-{lang}"] = rng.choice(TEXTS)
+            writer.writerow([row[header] for header in headers])
+
+
+#This function returns the errors of the previous search_for_error, without its output
+def baseline_errors(csv_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return legacy_search_for_error(csv_path)
+
+
+#This function returns the catalogs and languages of the previous convert_csv_to_json
+def baseline_catalogs(csv_path):
+    return legacy_convert_csv_to_json(csv_path)
@@ -0,0 +1,133 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import json
+import os
+import stat
+
+import pytest
+
+from appdata.after_reboot import MANIFEST_FILE_NAME, AfterRebootStore, atomic_copy
+from appdata.atomic_file import atomic_write, file_sha256
+
+
+def write(directory, name, text):
+    path = directory / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "DiagEN.json"
+    atomic_write(str(path), b"old")
+    atomic_write(str(path), b"new")
+
+    assert path.read_bytes() == b"new"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert os.listdir(tmp_path) == ["DiagEN.json"]
+
+
+#A failed write keeps the previous content and removes its temporary file
+def test_atomic_write_failure_keeps_the_old_file(tmp_path):
+    path = tmp_path / "DiagEN.json"
+    atomic_write(str(path), b"old")
+
+    with pytest.raises(TypeError):
+        atomic_write(str(path), "not bytes")
+
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["DiagEN.json"]
+
+
+def test_file_sha256(tmp_path):
+    data = os.urandom(200000)
+    path = tmp_path / "data"
+    path.write_bytes(data)
+    assert file_sha256(str(path), chunk_size=4096) == hashlib.sha256(data).hexdigest()
+
+
+#The copy keeps its content when the source is replaced, and copying it again leaves no temporary file
+def test_atomic_copy(tmp_path):
+    source = write(tmp_path, "DiagEN.json", "first")
+    copy = tmp_path / "AfterReboot-DiagEN.json"
+    atomic_copy(str(source), str(copy))
+    atomic_copy(str(source), str(copy))
+
+    atomic_write(str(source), b"second")
+
+    assert copy.read_text() == "first"
+    assert sorted(os.listdir(tmp_path)) == ["AfterReboot-DiagEN.json", "DiagEN.json"]
+
+
+def test_store_all_records_copies_and_hashes(tmp_path):
+    write(tmp_path, "DiagEN.json", "en")
+    write(tmp_path, "DiagDE.json", "de")
+    store = AfterRebootStore(str(tmp_path))
+
+    entries = store.store_all([("DiagEN.json", None), ("DiagDE.json", "known")])
+
+    assert entries == [
+        {"file": "DiagEN.json", "copy": "AfterReboot-DiagEN.json", "sha256": hashlib.sha256(b"en").hexdigest()},
+        {"file": "DiagDE.json", "copy": "AfterReboot-DiagDE.json", "sha256": "known"},
+    ]
+    assert store.read_manifest() == entries
+    assert store.hashes() == {"DiagEN.json": hashlib.sha256(b"en").hexdigest(), "DiagDE.json": "known"}
+    assert store.find_all() == ["AfterReboot-DiagEN.json", "AfterReboot-DiagDE.json"]
+    assert (tmp_path / "AfterReboot-DiagDE.json").read_text() == "de"
+
+
+#Storing other files deletes the copies of the previously registered files only
+def test_store_replaces_the_previous_files(tmp_path):
+    write(tmp_path, "DiagEN.json", "en")
+    write(tmp_path, "DiagDE.json", "de")
+    store = AfterRebootStore(str(tmp_path))
+    store.store_all([("DiagEN.json", None), ("DiagDE.json", None)])
+
+    store.store("DiagDE.json")
+
+    assert store.find() == "AfterReboot-DiagDE.json"
+    assert sorted(os.listdir(tmp_path)) == [MANIFEST_FILE_NAME, "AfterReboot-DiagDE.json", "DiagDE.json",
+                                            "DiagEN.json"]
+
+
+def test_delete(tmp_path):
+    write(tmp_path, "DiagEN.json", "en")
+    store = AfterRebootStore(str(tmp_path))
+    store.store("DiagEN.json")
+
+    store.delete()
+
+    assert store.read_manifest() is None
+    assert store.find() is None
+    assert os.listdir(tmp_path) == ["DiagEN.json"]
+
+
+#Manifests written before several files could be registered describe a single file
+def test_single_file_manifest(tmp_path):
+    write(tmp_path, "AfterReboot-DiagEN.json", "en")
+    write(tmp_path, MANIFEST_FILE_NAME, json.dumps({"file": "DiagEN.json", "copy": "AfterReboot-DiagEN.json",
+                                                    "sha256": "abc"}))
+    store = AfterRebootStore(str(tmp_path))
+
+    assert store.find_all() == ["AfterReboot-DiagEN.json"]
+    assert store.hashes() == {"DiagEN.json": "abc"}
+
+
+#Without a readable manifest, the copies persisted before the manifest existed are found by their names
+@pytest.mark.parametrize("manifest", [None, "{broken"])
+def test_copies_without_manifest(tmp_path, manifest):
+    write(tmp_path, "AfterReboot-DiagEN.json", "en")
+    write(tmp_path, "AfterReboot-notes.txt", "")
+    write(tmp_path, "DiagDE.json", "de")
+    if manifest is not None:
+        write(tmp_path, MANIFEST_FILE_NAME, manifest)
+    store = AfterRebootStore(str(tmp_path))
+
+    assert store.find_all() == ["AfterReboot-DiagEN.json"]
+
+    store.store("DiagDE.json")
+
+    assert not (tmp_path / "AfterReboot-DiagEN.json").exists()
+    assert store.find_all() == ["AfterReboot-DiagDE.json"]
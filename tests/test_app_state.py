@@ -0,0 +1,70 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+import types
+
+import pytest
+
+from app.app_state import AppState
+
+
+def test_update_and_snapshot():
+    state = AppState()
+    version = state.version
+
+    state.update(message={"Error": "x"}, registered_files=["DiagEN.json"])
+    snapshot = state.snapshot()
+    snapshot["registered_files"].append("DiagDE.json")
+
+    assert state.version == version + 1
+    assert snapshot["message"] == {"Error": "x"}
+    assert state.registered_files == ["DiagEN.json"]
+    assert snapshot["operation"] is None and snapshot["job"] is None
+
+
+@pytest.mark.parametrize("name", ["unknown", "lock", "operation_lock", "version", "modified"])
+def test_update_rejects_other_fields(name):
+    state = AppState()
+
+    with pytest.raises(AttributeError):
+        state.update(**{name: 1})
+
+    assert state.version == 0
+
+
+#Concurrent updates of the worker threads are not lost
+def test_concurrent_updates():
+    state = AppState()
+
+    def update():
+        for _ in range(500):
+            state.update(successfully_saved=True)
+    threads = [threading.Thread(target=update) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state.version == 4000
+
+
+#The operation and the job finish without an update, their states are part of the key
+def test_render_key_follows_operation_and_job():
+    state = AppState()
+    operation = types.SimpleNamespace(id=1, status="pending", started=state.modified + 1, finished=None)
+    job = types.SimpleNamespace(id=7, status="queued", submitted=state.modified + 2, started=None, finished=None)
+
+    state.update(last_operation=operation, last_job=job)
+    key, modified = state.render_key()
+    assert state.render_key() == (key, modified)
+    assert modified == job.submitted
+
+    operation.status, operation.finished = "done", job.submitted + 1
+    changed, modified = state.render_key()
+    assert changed != key
+    assert modified == operation.finished
+
+    job.status = "running"
+    assert state.render_key()[0] != changed
@@ -0,0 +1,149 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import gzip
+import io
+import json
+import os
+import time
+import zipfile
+
+import pytest
+
+from appdata.atomic_file import atomic_write
+from appdata.catalog_download import (COMPRESSED_FOLDER, CatalogBundle, compressed_name, select_variant,
+                                      write_compressed)
+from appdata.compile_cache import CompileCache, file_stamp
+
+CATALOGS = {
+    "DiagEN.json": {"product": "Product", "mainDiagnostics": {f"0E0A{i:04X}": {"text": f"Text {i}", "version": 1}
+                                                              for i in range(500)}},
+    "DiagDE.json": {"product": "Produkt", "mainDiagnostics": {"0E0A0001": {"text": "Größe", "version": 1}}},
+}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    for file_name, catalog in CATALOGS.items():
+        data = json.dumps(catalog).encode("utf-8")
+        atomic_write(str(tmp_path / file_name), data)
+        write_compressed(str(tmp_path), file_name, data)
+    return tmp_path
+
+
+#This function returns the stamps of the catalogs and their gzip variants, as the compile cache records them
+def stamps(storage, file_names):
+    return {file_name: {name: file_stamp(str(storage / name))
+                        for name in (file_name, compressed_name(file_name, "gzip"))
+                        if os.path.exists(storage / name)}
+            for file_name in file_names}
+
+
+def bundle_bytes(storage, file_names, file_stamps=None):
+    bundle = CatalogBundle(str(storage), file_names, stamps(storage, file_names) if file_stamps is None else file_stamps)
+    try:
+        data = b"".join(bundle)
+    finally:
+        bundle.close()
+    assert len(data) == bundle.size
+    return data, bundle
+
+
+def test_write_compressed(storage):
+    gzip_path = storage / compressed_name("DiagEN.json", "gzip")
+
+    assert compressed_name("DiagEN.json", "gzip") == os.path.join(COMPRESSED_FOLDER, "DiagEN.json.gz")
+    assert gzip.decompress(gzip_path.read_bytes()) == (storage / "DiagEN.json").read_bytes()
+    # No file name and mtime 0 in the header, so the deflate stream can be put into a zip file as is
+    assert gzip_path.read_bytes()[3:8] == b"\x00\x00\x00\x00\x00"
+
+
+def test_select_variant(storage):
+    assert select_variant(str(storage), "DiagEN.json", "gzip, deflate") == (
+        "gzip", str(storage / compressed_name("DiagEN.json", "gzip")))
+    assert select_variant(str(storage), "DiagEN.json", "identity") == (None, str(storage / "DiagEN.json"))
+    assert select_variant(str(storage), "DiagFR.json", "gzip") == (None, str(storage / "DiagFR.json"))
+
+
+#The members are the deflate streams of the gzip variants, or the stored files if there is no gzip variant
+def test_bundle_is_a_valid_zip_file(storage):
+    os.remove(storage / compressed_name("DiagDE.json", "gzip"))
+
+    data, bundle = bundle_bytes(storage, ["DiagEN.json", "DiagDE.json"])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == ["DiagEN.json", "DiagDE.json"]
+        assert [info.compress_type for info in zip_file.infolist()] == [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED]
+        for file_name, catalog in CATALOGS.items():
+            assert json.loads(zip_file.read(file_name)) == catalog
+    assert all(member["file"].closed for member in bundle.members)
+
+
+#A gzip variant that does not belong to the file (written before the file was replaced, even by a file of the same
+#size) or that is not known to the compile cache is not used
+@pytest.mark.parametrize("product", ["Changed", "Product"])
+def test_bundle_ignores_stale_gzip_variant(storage, product):
+    recorded = stamps(storage, ["DiagDE.json"])
+    original = (storage / "DiagDE.json").read_bytes()
+    atomic_write(str(storage / "DiagDE.json"), original.replace(b'"Produkt"', f'"{product}"'.encode("utf-8")))
+    # The file may be replaced within the resolution of the modification time
+    os.utime(storage / "DiagDE.json", ns=(0, time.time_ns() + 10 ** 9))
+
+    data, _ = bundle_bytes(storage, ["DiagDE.json"], recorded)
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.infolist()[0].compress_type == zipfile.ZIP_STORED
+        assert json.loads(zip_file.read("DiagDE.json"))["product"] == product
+    data, _ = bundle_bytes(storage, ["DiagDE.json"], {})
+    assert zipfile.ZipFile(io.BytesIO(data)).infolist()[0].compress_type == zipfile.ZIP_STORED
+
+
+#The stamps of CompileCache.file_stamps: a catalog replaced by a file of the same size is sent as it is now
+def test_bundle_with_compile_cache_stamps(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    cache.write_catalogs("csv-hash", [CATALOGS["DiagEN.json"]], ["EN"])
+    catalog = tmp_path / "DiagEN.json"
+
+    data, _ = bundle_bytes(tmp_path, ["DiagEN.json"], {"DiagEN.json": cache.file_stamps("DiagEN.json")})
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.infolist()[0].compress_type == zipfile.ZIP_DEFLATED
+        assert zip_file.read("DiagEN.json") == catalog.read_bytes()
+
+    replaced = catalog.read_bytes().replace(b"Text 1", b"Text X")
+    atomic_write(str(catalog), replaced)
+    os.utime(catalog, ns=(0, time.time_ns() + 10 ** 9))
+    assert cache.file_stamps("DiagEN.json") is None
+    data, _ = bundle_bytes(tmp_path, ["DiagEN.json"], {"DiagEN.json": cache.file_stamps("DiagEN.json")})
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.infolist()[0].compress_type == zipfile.ZIP_STORED
+        assert zip_file.read("DiagEN.json") == replaced
+
+
+def test_bundle_etag(storage):
+    file_names = ["DiagEN.json", "DiagDE.json"]
+    etag = CatalogBundle(str(storage), file_names, stamps(storage, file_names))
+    same = CatalogBundle(str(storage), file_names)
+    assert etag.etag() == same.etag()
+    etag.close()
+    same.close()
+
+    data = b'{"product": "Changed", "mainDiagnostics": {}}'
+    atomic_write(str(storage / "DiagDE.json"), data)
+    write_compressed(str(storage), "DiagDE.json", data)
+    changed = CatalogBundle(str(storage), file_names, stamps(storage, file_names))
+    assert changed.etag() != same.etag()
+    changed.close()
+
+
+def test_empty_bundle(storage):
+    data, _ = bundle_bytes(storage, [])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.namelist() == []
+
+
+def test_missing_file(storage):
+    with pytest.raises(FileNotFoundError):
+        CatalogBundle(str(storage), ["DiagEN.json", "DiagFR.json"])
@@ -0,0 +1,118 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+
+from appdata.after_reboot import AFTER_REBOOT_PREFIX
+from appdata.atomic_file import file_sha256
+from appdata.catalog_update import (base_file_name, catalog_diff, catalog_texts, delete_unregistered_versions,
+                                    plan_update, versioned_file_name)
+
+OLD = {"product": "Product", "mainDiagnostics": {
+    "0E0A0001": {"text": "Main", "version": 1, "detailedDiagnostics": {"00000001": {"text": "Detailed"}}},
+    "0E0A0002": {"text": "Removed", "version": 1},
+}}
+NEW = {"product": "Product", "mainDiagnostics": {
+    "0E0A0001": {"text": "Main changed", "version": 1, "detailedDiagnostics": {"00000001": {"text": "Detailed"},
+                                                                                "00000002": {"text": "Added"}}},
+    "0E0A0003": {"text": "Added", "version": 1},
+}}
+
+
+def write_json(directory, name, catalog, indent=None):
+    path = directory / name
+    path.write_text(json.dumps(catalog, indent=indent), encoding="utf-8")
+    return str(path)
+
+
+def test_catalog_texts():
+    assert catalog_texts(OLD) == {"0E0A0001": "Main", "0E0A0001/00000001": "Detailed", "0E0A0002": "Removed"}
+
+
+def test_catalog_diff():
+    assert catalog_diff(OLD, NEW) == {"added": 2, "removed": 1, "changed": 1}
+    assert catalog_diff(OLD, OLD) == {"added": 0, "removed": 0, "changed": 0}
+    assert catalog_diff(OLD, dict(OLD, product="Other")) == {"added": 0, "removed": 0, "changed": 0,
+                                                             "product": "Other"}
+
+
+def test_versioned_file_names():
+    version = versioned_file_name("DiagEN.json", "0123456789abcdef" * 4)
+    assert version == "DiagEN.0123456789ab.json"
+    assert base_file_name(version) == "DiagEN.json"
+    assert base_file_name("DiagEN.json") == "DiagEN.json"
+    assert base_file_name("DiagEN.0123.json") == "DiagEN.0123.json"
+
+
+#A registered file whose hash did not change needs no update
+def test_plan_update_unchanged_hash(tmp_path):
+    path = write_json(tmp_path, "DiagEN.json", OLD)
+    sha256 = file_sha256(path)
+
+    plans = plan_update(str(tmp_path), ["DiagEN.json"], {"DiagEN.json": sha256}, {"DiagEN.json": sha256})
+
+    assert plans == [{"registered": "DiagEN.json", "file": "DiagEN.json", "diff": None, "version": None}]
+    assert sorted(os.listdir(tmp_path)) == ["DiagEN.json"]
+
+
+#Changed texts are compared with the copy made at registration and registered as a new version
+def test_plan_update_changed_texts(tmp_path):
+    write_json(tmp_path, AFTER_REBOOT_PREFIX + "DiagEN.json", OLD)
+    path = write_json(tmp_path, "DiagEN.json", NEW)
+    sha256 = file_sha256(path)
+
+    plans = plan_update(str(tmp_path), ["DiagEN.json"], {"DiagEN.json": "old"}, {})
+
+    version = versioned_file_name("DiagEN.json", sha256)
+    assert plans == [{"registered": "DiagEN.json", "file": "DiagEN.json",
+                      "diff": {"added": 2, "removed": 1, "changed": 1}, "version": version}]
+    assert file_sha256(str(tmp_path / version)) == sha256
+
+
+#A registered version is compared with its own content (there is no copy of it) and updated to the catalog file
+def test_plan_update_of_a_version(tmp_path):
+    registered = write_json(tmp_path, versioned_file_name("DiagEN.json", "a" * 64), OLD)
+    write_json(tmp_path, "DiagEN.json", NEW)
+    registered_name = os.path.basename(registered)
+
+    plans = plan_update(str(tmp_path), [registered_name], {registered_name: "a" * 64}, {"DiagEN.json": "b" * 64})
+
+    assert plans[0]["file"] == "DiagEN.json"
+    assert plans[0]["diff"] == {"added": 2, "removed": 1, "changed": 1}
+    assert plans[0]["version"] == versioned_file_name("DiagEN.json", "b" * 64)
+    assert (tmp_path / plans[0]["version"]).read_bytes() == (tmp_path / "DiagEN.json").read_bytes()
+
+
+#A new hash with the same texts (e.g. other formatting) needs no update
+def test_plan_update_same_texts(tmp_path):
+    write_json(tmp_path, AFTER_REBOOT_PREFIX + "DiagEN.json", OLD)
+    write_json(tmp_path, "DiagEN.json", OLD, indent=2)
+
+    plans = plan_update(str(tmp_path), ["DiagEN.json"], {"DiagEN.json": "old"}, {})
+
+    assert plans[0]["diff"] == {"added": 0, "removed": 0, "changed": 0}
+    assert plans[0]["version"] is None
+
+
+#If the registered content cannot be read, the file is registered again
+def test_plan_update_unknown_registered_content(tmp_path):
+    (tmp_path / (AFTER_REBOOT_PREFIX + "DiagEN.json")).write_text("{broken", encoding="utf-8")
+    write_json(tmp_path, "DiagEN.json", NEW)
+
+    plans = plan_update(str(tmp_path), ["DiagEN.json"], {}, {"DiagEN.json": "c" * 64})
+
+    assert plans[0]["diff"] is None
+    assert plans[0]["version"] == versioned_file_name("DiagEN.json", "c" * 64)
+
+
+def test_delete_unregistered_versions(tmp_path):
+    registered = versioned_file_name("DiagEN.json", "a" * 64)
+    unregistered = versioned_file_name("DiagEN.json", "b" * 64)
+    for name in ("DiagEN.json", registered, unregistered, "DiagEN.notahash.json"):
+        write_json(tmp_path, name, OLD)
+
+    delete_unregistered_versions(str(tmp_path), [registered])
+
+    assert sorted(os.listdir(tmp_path)) == sorted(["DiagEN.json", registered, "DiagEN.notahash.json"])
@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import inspect
+import time
+
+import pytest
+
+try:
+    from ctrlxdatalayer.bulk import Bulk, BulkReadRequest, BulkWriteRequest, Response
+    from ctrlxdatalayer.client import Client
+    from ctrlxdatalayer.variant import Result, Variant, VariantType
+except (ImportError, OSError) as e:
+    # ctrlx-datalayer < 3 has no bulk module, the native library may not be installed
+    pytest.skip(f"ctrlx-datalayer bulk API not available: {e}", allow_module_level=True)
+
+from app.datalayer_bulk import BulkAccess, DebouncedWriter
+from datalayer_fakes import RESPONSE_TIME, FakeBulk, FakeClient, FakeClientPool, make_response
+
+SPEED = "plc/app/Application/sym/GVL/fFUSpeed"
+POWER = "motion/axs/AxisX/cmd/power"
+TORQUE = "plc/app/Application/sym/GVL/fTorque"
+LOAD = "plc/app/Application/sym/GVL/fLoad"
+
+
+#The names and parameters of the ctrlx-datalayer bulk API used by datalayer_bulk.py and registration_service.py
+def test_bulk_api_of_ctrlx_datalayer():
+    assert callable(Client.create_bulk)
+    for name in ("read", "write", "get_response", "close", "__enter__", "__exit__"):
+        assert callable(getattr(Bulk, name))
+    for name in ("read", "write"):
+        assert list(inspect.signature(getattr(Bulk, name)).parameters)[:4] == ["self", "request", "cb", "userdata"]
+    for name in ("get_address", "get_result", "get_data", "get_datetime", "close"):
+        assert callable(getattr(Response, name))
+
+    with Variant() as variant:
+        request = BulkWriteRequest(SPEED, variant)
+        assert request.address == SPEED and request.data is variant
+    assert BulkReadRequest(SPEED).address == SPEED and BulkReadRequest(SPEED).data is None
+
+
+def test_response_keeps_a_copy_of_the_data():
+    with make_response(SPEED, Result.OK, 2.5) as response:
+        assert response.get_address() == SPEED
+        assert response.get_result() == Result.OK
+        assert response.get_data().get_type() == VariantType.FLOAT64
+        assert response.get_data().get_float64() == 2.5
+        # FILETIME as naive datetime in UTC
+        assert response.get_datetime() == RESPONSE_TIME
+
+
+def test_read_returns_one_item_per_response_and_learns_types():
+    bulk = FakeBulk(results=[Result.OK, Result.INVALID_ADDRESS], values=[1.5, None])
+    access = BulkAccess(FakeClientPool(FakeClient(bulk)))
+
+    items = access.read([SPEED, POWER])
+
+    assert [request.address for request in bulk.requests] == [SPEED, POWER]
+    assert all(isinstance(request, BulkReadRequest) for request in bulk.requests)
+    assert items == [
+        {"address": SPEED, "result": "OK", "value": 1.5, "timestamp": "2026-01-01T12:00:00+00:00"},
+        {"address": POWER, "result": "INVALID_ADDRESS", "value": None, "timestamp": "2026-01-01T12:00:00+00:00"},
+    ]
+    assert access.value_type(SPEED) == VariantType.FLOAT64
+    assert access.value_type(POWER) is None
+
+
+def test_read_failure_is_reported_for_every_address():
+    access = BulkAccess(FakeClientPool(FakeClient(FakeBulk(result=Result.CLIENT_NOT_CONNECTED))))
+
+    items = access.read([SPEED, POWER])
+
+    assert [(item["address"], item["result"], item["value"]) for item in items] == [
+        (SPEED, "CLIENT_NOT_CONNECTED", None), (POWER, "CLIENT_NOT_CONNECTED", None)]
+
+
+def test_write_reads_unknown_types_first_and_converts_values():
+    read_bulk = FakeBulk(values=[0.0])
+    write_bulk = FakeBulk()
+    access = BulkAccess(FakeClientPool(FakeClient(read_bulk, write_bulk)))
+
+    items = access.write({SPEED: "7.25"})
+
+    assert [request.address for request in read_bulk.requests] == [SPEED]
+    assert all(isinstance(request, BulkWriteRequest) for request in write_bulk.requests)
+    assert write_bulk.written == [7.25]
+    assert items == [{"address": SPEED, "result": "OK", "value": 7.25, "timestamp": "2026-01-01T12:00:00+00:00"}]
+
+
+def test_write_with_unknown_type_or_bad_value_is_not_sent():
+    access = BulkAccess(FakeClientPool(FakeClient(FakeBulk(results=[Result.INVALID_ADDRESS]))),
+                        known_type=lambda address: VariantType.FLOAT64 if address == SPEED else None)
+
+    items = access.write({SPEED: "fast", POWER: True})
+
+    assert [(item["address"], item["result"]) for item in items] == [
+        (SPEED, "TYPE_MISMATCH"), (POWER, "TYPE_MISMATCH")]
+
+
+#The items follow the order of the values, also if values in between are rejected before the bulk write
+def test_write_items_follow_the_request_order():
+    write_bulk = FakeBulk(results=[Result.OK, Result.INVALID_VALUE])
+    read_bulk = FakeBulk(results=[Result.INVALID_ADDRESS])
+    access = BulkAccess(FakeClientPool(FakeClient(read_bulk, write_bulk)),
+                        known_type=lambda address: None if address == POWER else VariantType.FLOAT64)
+
+    items = access.write({SPEED: 1, POWER: True, TORQUE: "bad", LOAD: 2})
+
+    assert [request.address for request in write_bulk.requests] == [SPEED, LOAD]
+    assert [(item["address"], item["result"], item["value"]) for item in items] == [
+        (SPEED, "OK", 1.0), (POWER, "TYPE_MISMATCH", None), (TORQUE, "TYPE_MISMATCH", None),
+        (LOAD, "INVALID_VALUE", 2.0)]
+
+
+def test_write_failure_is_reported_for_every_sent_value():
+    read_bulk = FakeBulk(results=[Result.INVALID_ADDRESS])
+    access = BulkAccess(FakeClientPool(FakeClient(read_bulk, FakeBulk(result=Result.CLIENT_NOT_CONNECTED))),
+                        known_type=lambda address: None if address == POWER else VariantType.FLOAT64)
+
+    items = access.write({SPEED: 1, POWER: True})
+
+    assert [(item["address"], item["result"]) for item in items] == [
+        (SPEED, "CLIENT_NOT_CONNECTED"), (POWER, "TYPE_MISMATCH")]
+
+
+def test_debounced_writer_writes_only_the_latest_value():
+    write_bulk = FakeBulk()
+    access = BulkAccess(FakeClientPool(FakeClient(write_bulk)), known_type=lambda address: VariantType.FLOAT64)
+    writer = DebouncedWriter(access, interval=0.05)
+
+    for value in range(50):
+        writer.submit({SPEED: value})
+    deadline = time.time() + 2
+    while writer.written == 0 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert write_bulk.written == [49.0]
+    assert (writer.written, writer.dropped) == (1, 49)
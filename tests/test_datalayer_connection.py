@@ -0,0 +1,125 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import time
+
+import pytest
+
+try:
+    from ctrlxdatalayer.variant import Result
+except (ImportError, OSError) as e:
+    # The native library of ctrlx-datalayer may not be installed
+    pytest.skip(f"ctrlx-datalayer not available: {e}", allow_module_level=True)
+
+from app.datalayer_connection import DatalayerConnection
+from datalayer_fakes import FakeClient, FakeSystem
+
+
+def until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+@pytest.fixture
+def connect():
+    connections = []
+
+    def create(system):
+        connection = DatalayerConnection(system, "ipc://", initial_delay=0.01, max_delay=0.04, check_interval=0.02)
+        connections.append(connection)
+        return connection
+    yield create
+    for connection in connections:
+        connection.stop()
+
+
+def test_connects_and_runs_callbacks_once(connect):
+    system = FakeSystem()
+    connection = connect(system)
+    connected = []
+    connection.on_connected(connected.append)
+    assert connection.get_client() is None
+
+    connection.start()
+
+    assert connection.wait(5)
+    client = system.clients[0]
+    assert connection.get_client() is client
+    assert until(lambda: connected == [client])
+    assert connection.status()["connected"] and connection.status()["attempts"] == 1
+
+
+#The client is kept while the Data Layer is not reachable, it is pinged again with backoff until it answers
+def test_retries_until_the_data_layer_answers(connect):
+    client = FakeClient()
+    client.ping = Result.TIMEOUT
+    system = FakeSystem(lambda: client)
+    connection = connect(system)
+
+    connection.start()
+
+    assert until(lambda: connection.status()["attempts"] >= 3)
+    assert connection.get_client() is None
+    assert connection.status()["last_error"] == "Not connected"
+    client.ping = Result.OK
+    assert connection.wait(5)
+    assert system.clients == [client]
+    assert connection.status()["last_error"] is None
+
+
+def test_client_creation_failure_is_retried(connect):
+    clients = [None, None, FakeClient()]
+    connection = connect(FakeSystem(lambda: clients.pop(0)))
+
+    connection.start()
+
+    assert connection.wait(5)
+    assert connection.status()["attempts"] == 3
+
+
+#A lost connection is reported and the callbacks are not run again after the reconnect
+def test_lost_connection(connect):
+    system = FakeSystem()
+    connection = connect(system)
+    connected = []
+    connection.on_connected(connected.append)
+    connection.start()
+    assert connection.wait(5)
+    client = system.clients[0]
+
+    client.connected = False
+    assert until(lambda: connection.get_client() is None)
+    assert connection.status()["connected_since"] is None
+
+    client.connected = True
+    assert until(lambda: connection.get_client() is client)
+    assert connected == [client]
+
+
+def test_failing_callback_does_not_stop_the_connection(connect):
+    connection = connect(FakeSystem())
+    called = []
+
+    def fail(client):
+        raise RuntimeError("callback")
+    connection.on_connected(fail)
+    connection.on_connected(called.append)
+    connection.start()
+
+    assert until(lambda: len(called) == 1)
+    assert connection.wait(0)
+
+
+def test_stop_closes_the_client(connect):
+    system = FakeSystem()
+    connection = connect(system)
+    connection.start()
+    assert connection.wait(5)
+
+    connection.stop()
+
+    assert system.clients[0].closed
+    assert connection.get_client() is None
@@ -0,0 +1,162 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+
+import pytest
+
+try:
+    from ctrlxdatalayer.variant import Result
+except (ImportError, OSError) as e:
+    # The native library of ctrlx-datalayer may not be installed
+    pytest.skip(f"ctrlx-datalayer not available: {e}", allow_module_level=True)
+
+from app.datalayer_pool import DatalayerClientPool
+from datalayer_fakes import FakeClient, FakeSystem
+
+
+def until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+@pytest.fixture
+def create_pool():
+    pools = []
+
+    def create(system, size=2):
+        pool = DatalayerClientPool(system, "ipc://", size=size, check_interval=0.02, initial_delay=0.01,
+                                   max_delay=0.04)
+        pools.append(pool)
+        pool.start()
+        return pool
+    yield create
+    for pool in pools:
+        pool.stop()
+
+
+#Every checkout gets a client of its own, the client is idle again after the with block
+def test_checkout(create_pool):
+    system = FakeSystem()
+    pool = create_pool(system)
+    assert pool.wait(5)
+    assert until(lambda: pool.stats()["idle"] == 2)
+
+    with pool.client() as first, pool.client() as second:
+        assert first is not second
+        assert {first, second} == set(system.clients)
+        assert pool.stats()["in_use"] == 2
+
+    stats = pool.stats()
+    assert (stats["idle"], stats["in_use"], stats["acquired"]) == (2, 0, 2)
+
+
+#With all clients in use a checkout waits for the timeout and gets None
+def test_exhaustion(create_pool):
+    pool = create_pool(FakeSystem(), size=1)
+    assert pool.wait(5)
+
+    with pool.client() as client:
+        assert client is not None
+        started = time.monotonic()
+        with pool.client(timeout=0.05) as other:
+            assert other is None
+        assert time.monotonic() - started >= 0.05
+
+    assert pool.stats()["acquire_timeouts"] == 1
+
+
+#A waiting checkout gets the client that is given back
+def test_waiting_checkout_gets_the_released_client(create_pool):
+    pool = create_pool(FakeSystem(), size=1)
+    assert pool.wait(5)
+    taken = []
+
+    def take():
+        with pool.client(timeout=5) as client:
+            taken.append(client)
+    with pool.client() as client:
+        thread = threading.Thread(target=take)
+        thread.start()
+        time.sleep(0.05)
+        assert taken == []
+    thread.join()
+
+    assert taken == [client]
+
+
+#A client that lost its connection while it was used is not handed out again, it is rebuilt
+def test_client_lost_in_use_is_evicted(create_pool):
+    system = FakeSystem()
+    pool = create_pool(system, size=1)
+    assert pool.wait(5)
+
+    with pool.client() as client:
+        client.connected = False
+
+    assert until(lambda: client.closed)
+    assert until(lambda: len(system.clients) == 2 and pool.stats()["idle"] == 1)
+    with pool.client() as rebuilt:
+        assert rebuilt is system.clients[1]
+    assert pool.stats()["failed_checks"] >= 1
+
+
+#Idle clients that do not answer the ping are evicted and rebuilt with backoff
+def test_failed_health_check_is_evicted(create_pool):
+    clients = []
+    answering = [True]
+
+    def create():
+        client = FakeClient()
+        # The clients created after the first one answer when the Data Layer is back
+        if not answering[0]:
+            client.ping = Result.TIMEOUT
+        clients.append(client)
+        return client
+    system = FakeSystem(create)
+    pool = create_pool(system, size=1)
+    assert pool.wait(5)
+
+    answering[0] = False
+    clients[0].ping = Result.TIMEOUT
+    assert until(lambda: clients[0].closed)
+    assert until(lambda: pool.stats()["failed_checks"] >= 3)
+    assert pool.stats()["healthy"] == 0
+    with pool.client(timeout=0.01) as client:
+        assert client is None
+
+    answering[0] = True
+    assert until(lambda: pool.stats()["healthy"] == 1)
+    assert pool.stats()["reconnects"] == 1
+    assert all(client.closed for client in clients[:-1])
+
+
+def test_client_creation_failure_is_retried(create_pool):
+    results = [None, None]
+    pool = create_pool(FakeSystem(lambda: results.pop(0) if results else FakeClient()), size=1)
+
+    assert pool.wait(5)
+    assert pool.stats()["failed_checks"] == 2
+
+
+def test_wait_times_out(create_pool):
+    pool = create_pool(FakeSystem(lambda: None), size=1)
+
+    assert not pool.wait(0.05)
+
+
+def test_stop_closes_the_clients(create_pool):
+    system = FakeSystem()
+    pool = create_pool(system)
+    assert until(lambda: pool.stats()["healthy"] == 2)
+
+    pool.stop()
+
+    assert all(client.closed for client in system.clients)
+    assert not pool.wait(0)
+    with pool.client() as client:
+        assert client is None
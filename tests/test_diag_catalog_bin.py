@@ -0,0 +1,107 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import struct
+
+import pytest
+
+from appdata.compile_cache import CompileCache, serialize_catalog
+from appdata.diag_catalog_bin import FORMAT_VERSION, HEADER, CatalogReader, catalog_to_bytes
+from appdata.diag_compiler import compile_csv
+from benchmarks.diag_csv_generator import write_diag_csv
+
+CATALOG = {"product": "Produkt ä", "mainDiagnostics": {
+    "0E0A0002": {"text": "Zweite", "version": 3},
+    "0E0A0001": {"text": "Erste", "version": 1, "detailedDiagnostics": {
+        "00000002": {"text": "Detail 2"}, "00000001": {"text": "Erste"}, "0000000A": {"text": None}}},
+    "0E0AÄ001": {"text": "Schlüssel mit Umlaut", "version": 1},
+    "0E0A0003": {"text": None, "version": 1},
+}}
+
+
+@pytest.fixture
+def write_bin(tmp_path):
+    def write(data, name="DiagDE.bin"):
+        path = tmp_path / name
+        path.write_bytes(data)
+        return str(path)
+    return write
+
+
+def test_lookups(write_bin):
+    with CatalogReader(write_bin(catalog_to_bytes(CATALOG))) as reader:
+        assert reader.product == "Produkt ä"
+        assert list(reader.main_numbers()) == sorted(CATALOG["mainDiagnostics"])
+        assert reader.lookup("0E0A0001") == "Erste"
+        assert reader.lookup("0E0A0001", "00000002") == "Detail 2"
+        assert reader.lookup("0E0A0001", "0000000A") is None
+        assert reader.lookup("0E0A0003") is None
+        assert reader.lookup("0E0AÄ001") == "Schlüssel mit Umlaut"
+
+
+@pytest.mark.parametrize("main_diag_no, detailed_diag_no", [
+    ("0E0A0004", None), ("0E0A0002", "00000001"), ("0E0A0001", "00000003"), ("", None),
+    ("0E0A00010", None), ("0E0A0001", "000000010"),
+])
+def test_unknown_numbers(write_bin, main_diag_no, detailed_diag_no):
+    with CatalogReader(write_bin(catalog_to_bytes(CATALOG))) as reader:
+        assert reader.lookup(main_diag_no, detailed_diag_no) is None
+
+
+#Every text of a compiled catalog is found as in the JSON file
+def test_round_trip_against_json(tmp_path):
+    csv_path = str(tmp_path / "Diag.csv")
+    write_diag_csv(csv_path, 2000, languages=2, detailed_per_main=6)
+    catalogs, languages = compile_csv(csv_path)
+    CompileCache(str(tmp_path)).write_catalogs("hash", catalogs, languages, binary=True)
+
+    for language in languages:
+        catalog = json.loads((tmp_path / f"Diag{language}.json").read_text(encoding="utf-8"))
+        with CatalogReader(str(tmp_path / f"Diag{language}.bin")) as reader:
+            assert reader.product == catalog["product"]
+            assert reader.main_count == len(catalog["mainDiagnostics"])
+            for main_no, main in catalog["mainDiagnostics"].items():
+                assert reader.lookup(main_no) == main["text"]
+                for detailed_no, detailed in main.get("detailedDiagnostics", {}).items():
+                    assert reader.lookup(main_no, detailed_no) == detailed["text"]
+
+
+def test_empty_catalog(write_bin):
+    with CatalogReader(write_bin(catalog_to_bytes({"product": None, "mainDiagnostics": {}}))) as reader:
+        assert reader.product is None
+        assert list(reader.main_numbers()) == []
+        assert reader.lookup("0E0A0001") is None
+
+
+#A file cut off at any point is rejected when it is opened
+def test_truncated_file_is_rejected(write_bin):
+    data = catalog_to_bytes(CATALOG)
+    for size in range(len(data)):
+        with pytest.raises(ValueError):
+            CatalogReader(write_bin(data[:size]))
+
+
+def test_other_version_is_rejected(write_bin):
+    data = bytearray(catalog_to_bytes(CATALOG))
+    struct.pack_into("<H", data, 8, FORMAT_VERSION + 1)
+
+    with pytest.raises(ValueError, match=f"version {FORMAT_VERSION}"):
+        CatalogReader(write_bin(bytes(data)))
+
+
+def test_other_file_is_rejected(write_bin):
+    with pytest.raises(ValueError):
+        CatalogReader(write_bin(b"\x00" * HEADER.size + serialize_catalog(CATALOG)))
+
+
+#A record pointing outside of the file is reported at the lookup
+def test_corrupt_text_offset(write_bin):
+    data = bytearray(catalog_to_bytes(CATALOG))
+    key_width = struct.unpack_from("<H", data, 10)[0]
+    struct.pack_into("<I", data, HEADER.size + key_width, len(data))
+
+    with CatalogReader(write_bin(bytes(data))) as reader:
+        with pytest.raises(ValueError):
+            reader.lookup(next(reader.main_numbers()))
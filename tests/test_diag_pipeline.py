@@ -0,0 +1,113 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import random
+
+import pytest
+
+from appdata.diag_compiler import compile_csv, read_languages
+from appdata.diag_validator import compile_and_validate, main_diag_no_errors, validate_csv
+from appdata.upload_stream import CsvChunkParser
+from benchmarks.diag_csv_generator import write_diag_csv
+from diag_csv_fuzz import baseline_catalogs, baseline_errors, write_random_diag_csv
+
+FUZZ_SEEDS = range(300)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return str(tmp_path / "Diag.csv")
+
+
+def stream(csv_path, rng):
+    with open(csv_path, "rb") as file:
+        data = file.read()
+    parser = CsvChunkParser()
+    position = 0
+    while position < len(data):
+        size = rng.randint(1, 64)
+        parser.feed(data[position:position + size])
+        position += size
+    return parser.close()
+
+
+#The single pass gives the same catalogs as compile_csv and the same errors as validate_csv
+@pytest.mark.parametrize("invalid", [False, True])
+def test_compile_and_validate_matches_compiler_and_validator(csv_path, invalid):
+    write_diag_csv(csv_path, 500, languages=3, invalid=invalid, error_interval=20)
+
+    message, builder = compile_and_validate(csv_path)
+
+    assert (builder.catalogs(), builder.languages) == compile_csv(csv_path)
+    assert message == validate_csv(csv_path)
+    assert bool(message) == invalid
+
+
+#Generated files give the same catalogs and the same errors as the previous implementation
+@pytest.mark.parametrize("invalid", [False, True])
+def test_generated_files_match_baseline(csv_path, invalid):
+    write_diag_csv(csv_path, 500, languages=3, invalid=invalid, error_interval=20)
+
+    message, builder = compile_and_validate(csv_path)
+
+    assert (builder.catalogs(), builder.languages) == baseline_catalogs(csv_path)
+    assert message == baseline_errors(csv_path)
+
+
+#A shard of the languages gives the catalogs of these languages of the full compilation
+def test_compile_languages_shard(csv_path):
+    write_diag_csv(csv_path, 100, languages=4)
+    catalogs, languages = compile_csv(csv_path)
+
+    shard, shard_languages = compile_csv(csv_path, languages=["FR", "EN"])
+
+    assert read_languages(csv_path) == languages == ["EN", "DE", "FR", "ES"]
+    assert shard_languages == ["EN", "FR"]
+    assert shard == [catalogs[0], catalogs[2]]
+
+
+def test_missing_headers_are_reported_without_catalog(csv_path):
+    with open(csv_path, "w", encoding="utf-8") as file:
+        file.write("product name;mainDiag No;text-EN\nProduct;0E0A0001;Text\n")
+
+    message, builder = compile_and_validate(csv_path)
+
+    assert message == {"Error in headers": "Please make sure all required headers are available"}
+    assert builder is None
+
+
+@pytest.mark.parametrize("number, errors", [
+    ("0E0A0001", []),
+    ("371F9FFF", []),
+    ("1E0A0001", ["first two digits"]),
+    ("0E2A0001", ["third digit"]),
+    ("0E0B0001", ["4th digit"]),
+    ("0E0A1001", ["last four digits"]),
+    ("0E0F7001", ["5th digit"]),
+    ("0E0AG001", ["last four digits"]),
+    ("XX2G0001", ["first two digits", "third digit", "4th digit"]),
+])
+def test_main_diag_no_errors(number, errors):
+    assert list(main_diag_no_errors(number)) == errors
+
+
+#Differential fuzz against the previous implementation (benchmarks/bench_*.py): for random files the catalogs are
+#the same, the reported errors include all errors of search_for_error (which stopped at some errors) and the
+#upload parser fed in random chunks gives the same result as the file parser
+@pytest.mark.parametrize("seed", FUZZ_SEEDS)
+def test_differential_fuzz_against_baseline(csv_path, seed):
+    rng = random.Random(seed)
+    write_random_diag_csv(rng, csv_path)
+
+    message, builder = compile_and_validate(csv_path)
+    streamed_message, streamed_builder = stream(csv_path, rng)
+    baseline = baseline_errors(csv_path)
+
+    assert {key: value for key, value in baseline.items() if message.get(key) != value} == {}
+    assert streamed_message == message
+    if builder is None:
+        assert "Error in headers" in message and streamed_builder is None
+        return
+    assert (builder.catalogs(), builder.languages) == baseline_catalogs(csv_path)
+    assert streamed_builder.catalogs() == builder.catalogs()
@@ -0,0 +1,159 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+
+import pytest
+
+try:
+    from ctrlxdatalayer.variant import Result, Variant
+except (ImportError, OSError) as e:
+    # The native library of ctrlx-datalayer may not be installed
+    pytest.skip(f"ctrlx-datalayer not available: {e}", allow_module_level=True)
+
+from app.diagnostics_provider import DIAGNOSTICS_NODE, DiagnosticsIndex, DiagnosticsProviderNode
+from app.live_values import variant_to_value
+
+CATALOG_EN = {"mainDiagnostics": {
+    "0A000001": {"text": "Drive error", "detailedDiagnostics": {"00000001": {"text": "Overcurrent"},
+                                                                  "00000002": {"text": "Overvoltage"}}},
+    "0A000002": {"text": "Drive warning"},
+}}
+CATALOG_DE = {"mainDiagnostics": {
+    "0A000001": {"text": "Antriebsfehler", "detailedDiagnostics": {"00000001": {"text": "Überstrom"}}},
+}}
+
+
+#This class stands in for ctrlxdatalayer.provider.Provider
+class FakeProvider:
+    def __init__(self):
+        self.nodes = {}
+
+    def register_node(self, address, node):
+        self.nodes[address] = node
+        return Result.OK
+
+    def unregister_node(self, address):
+        self.nodes.pop(address, None)
+        return Result.OK
+
+
+#This class records the answers of the provider callbacks, the Variant is read at once as the Data Layer does
+class Answers(list):
+    def __call__(self, result, data):
+        self.append((result, variant_to_value(data) if data is not None else None))
+
+
+@pytest.fixture
+def node():
+    node = DiagnosticsProviderNode(FakeProvider(), DiagnosticsIndex([CATALOG_EN, CATALOG_DE], ["en", "DE"]))
+    yield node
+    node.unregister_node()
+
+
+def call(node, name, path, *args):
+    answers = Answers()
+    address = f"{DIAGNOSTICS_NODE}/{path}" if path else DIAGNOSTICS_NODE
+    getattr(node, f"_DiagnosticsProviderNode__on_{name}")(None, address, *args, answers)
+    return answers[0]
+
+
+def test_index():
+    index = DiagnosticsIndex([CATALOG_EN, CATALOG_DE], ["en", "DE"])
+
+    assert index.nodes[""] == (None, ["EN", "DE"])
+    assert index.nodes["EN"] == (None, ["0A000001", "0A000002"])
+    assert index.nodes["EN/0A000001"] == ("Drive error", ["00000001", "00000002"])
+    assert index.nodes["EN/0A000002"] == ("Drive warning", [])
+    assert index.nodes["DE/0A000001/00000001"] == ("Überstrom", [])
+    assert len(index) == 9
+    assert len(DiagnosticsIndex()) == 1
+
+
+#Only the catalogs of Diag.csv are indexed, files that cannot be loaded are skipped
+def test_index_from_directory(tmp_path):
+    for name, catalog in [("DiagEN.json", CATALOG_EN), ("DiagDE.json", CATALOG_DE),
+                          ("Diag_XM22_EN.json", CATALOG_DE), ("DiagEN.1a2b.json", CATALOG_DE)]:
+        (tmp_path / name).write_text(json.dumps(catalog), encoding="utf-8")
+    (tmp_path / "DiagFR.json").write_text("{", encoding="utf-8")
+
+    index = DiagnosticsIndex.from_directory(str(tmp_path))
+
+    assert index.nodes[""] == (None, ["DE", "EN"])
+    assert index.nodes["EN/0A000001"][0] == "Drive error"
+    assert len(DiagnosticsIndex.from_directory(str(tmp_path / "missing"))) == 1
+
+
+def test_register_covers_the_subtree(node):
+    assert node.register_node() == Result.OK
+    assert set(node._provider.nodes) == {DIAGNOSTICS_NODE, DIAGNOSTICS_NODE + "/**"}
+
+
+@pytest.mark.parametrize("path, text", [
+    ("EN/0A000001", "Drive error"),
+    ("EN/0A000001/00000002", "Overvoltage"),
+    ("DE/0A000001/00000001", "Überstrom"),
+    # The language is matched case-insensitively, a trailing slash is ignored
+    ("en/0A000002", "Drive warning"),
+    ("De/0A000001/", "Antriebsfehler"),
+])
+def test_read(node, path, text):
+    assert call(node, "read", path, None) == (Result.OK, text)
+
+
+@pytest.mark.parametrize("path", [
+    "",
+    "EN",
+    "EN/0A000003",
+    "EN/0A000002/00000001",
+    "DE/0A000002",
+    "FR/0A000001",
+    "EN/0a000001",
+    "EN/0A000001/00000001/x",
+])
+def test_read_of_folders_and_unknown_numbers(node, path):
+    assert call(node, "read", path, None) == (Result.INVALID_ADDRESS, None)
+
+
+@pytest.mark.parametrize("path, children", [
+    ("", ["EN", "DE"]),
+    ("EN", ["0A000001", "0A000002"]),
+    ("de", ["0A000001"]),
+    ("EN/0A000001", ["00000001", "00000002"]),
+    ("EN/0A000001/00000001", []),
+])
+def test_browse(node, path, children):
+    assert call(node, "browse", path) == (Result.OK, children)
+
+
+def test_browse_of_unknown_nodes(node):
+    assert call(node, "browse", "FR") == (Result.INVALID_ADDRESS, None)
+    assert call(node, "browse", "EN/0A000009") == (Result.INVALID_ADDRESS, None)
+
+
+def test_metadata_by_kind_of_node(node):
+    answers = Answers()
+    for path in ["", "EN", "EN/0A000001", "EN/0A000001/00000001", "EN/0A000009"]:
+        node._DiagnosticsProviderNode__on_metadata(None, f"{DIAGNOSTICS_NODE}/{path}",
+                                                   lambda result, data: answers.append((result, data)))
+
+    assert answers == [(Result.OK, node._folder_metadata), (Result.OK, node._folder_metadata),
+                       (Result.OK, node._main_metadata), (Result.OK, node._text_metadata),
+                       (Result.INVALID_ADDRESS, None)]
+
+
+#The nodes follow a new index at once, numbers that are no longer in the catalogs are unknown
+def test_set_index(node):
+    node.set_index(DiagnosticsIndex([CATALOG_DE], ["DE"]))
+
+    assert call(node, "browse", "") == (Result.OK, ["DE"])
+    assert call(node, "read", "EN/0A000001", None) == (Result.INVALID_ADDRESS, None)
+
+
+def test_nodes_cannot_be_changed(node):
+    with Variant() as data:
+        data.set_string("x")
+        assert call(node, "write", "EN/0A000001", data) == (Result.UNSUPPORTED, None)
+        assert call(node, "create", "EN/0A000003", data) == (Result.UNSUPPORTED, None)
+    assert call(node, "remove", "EN/0A000001") == (Result.UNSUPPORTED, None)
@@ -0,0 +1,166 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import threading
+import time
+
+import pytest
+
+from app.job_queue import CANCELLED, DONE, FAILED, FINISHED, QUEUED, RUNNING, JobCancelled, JobQueue
+
+
+def wait(job, statuses=FINISHED, timeout=5.0):
+    deadline = time.time() + timeout
+    while job.status not in statuses and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.status in statuses
+    return job
+
+
+#A job function that runs until it is released, reporting its progress
+class Blocking:
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self, job):
+        self.calls += 1
+        self.started.set()
+        while not self.release.wait(0.01):
+            job.report(rows=self.calls)
+        job.report(rows=self.calls)
+        return "result"
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(history=5, max_streams=1, heartbeat=0.05)
+
+
+#A job of the same kind and key as a queued or running job is collapsed into it
+def test_submit_dedupes_by_kind_and_key(queue):
+    running = Blocking()
+    first = queue.submit("compile", running, key="a")
+    running.started.wait(5)
+
+    assert queue.submit("compile", Blocking(), key="a") is first
+    queued = queue.submit("compile", Blocking(), key="b")
+    assert queued is not first
+    assert queue.submit("compile", Blocking(), key="b") is queued
+    other_kind = queue.submit("validate", Blocking(), key="a")
+    assert other_kind is not first
+
+    running.release.set()
+    assert wait(first).status == DONE and first.result == "result"
+    assert running.calls == 1
+    # A finished job is not reused
+    again = queue.submit("compile", lambda job: None, key="a")
+    assert again is not first
+    queue.cancel(queued.id)
+    queue.cancel(other_kind.id)
+
+
+def test_cancel_queued_job(queue):
+    running = Blocking()
+    first = queue.submit("compile", running, key="a")
+    running.started.wait(5)
+    never = Blocking()
+    queued = queue.submit("compile", never, key="b")
+
+    assert queue.cancel(queued.id) is queued
+    assert queued.status == CANCELLED
+
+    running.release.set()
+    wait(first)
+    assert never.calls == 0
+    # A cancelled job is not reused
+    assert queue.submit("compile", Blocking(), key="b") is not queued
+
+
+#A running job is cancelled at its next progress report
+def test_cancel_running_job(queue):
+    running = Blocking()
+    job = queue.submit("compile", running, key="a")
+    running.started.wait(5)
+    assert job.status == RUNNING
+
+    queue.cancel(job.id)
+    # A cancel requested job is not reused, even while it is still running
+    other = queue.submit("compile", lambda job: "other", key="a")
+
+    assert wait(job).status == CANCELLED
+    assert job.result is None
+    assert wait(other).status == DONE and other.result == "other"
+
+
+#A job that waits (e.g. for the Data Layer) without progress reports checks cancelled() and raises JobCancelled
+def test_cancel_job_that_checks_cancelled(queue):
+    started = threading.Event()
+
+    def waiting(job):
+        started.set()
+        while not job.cancelled():
+            time.sleep(0.01)
+        raise JobCancelled()
+    job = queue.submit("register", waiting)
+    started.wait(5)
+
+    queue.cancel(job.id)
+
+    assert wait(job).status == CANCELLED
+    assert job.progress == {}
+
+
+def test_cancel_finished_or_unknown_job(queue):
+    job = wait(queue.submit("compile", lambda job: 1))
+
+    assert queue.cancel(job.id) is job and job.status == DONE
+    assert queue.cancel(12345) is None
+
+
+def test_failed_job(queue):
+    def fail(job):
+        raise ValueError("broken CSV")
+
+    job = wait(queue.submit("compile", fail))
+
+    assert (job.status, job.error) == (FAILED, "broken CSV")
+
+
+#Only the newest finished jobs are kept
+def test_history(queue):
+    jobs = [wait(queue.submit("compile", lambda job: None, key=i)) for i in range(8)]
+
+    assert [entry["id"] for entry in queue.jobs()] == [job.id for job in jobs[-5:]]
+    assert queue.get(jobs[0].id) is None
+
+
+def test_event_stream(queue):
+    running = Blocking()
+    job = queue.submit("compile", running)
+    stream = queue.open_stream(job.id)
+    assert queue.open_stream(job.id) is None
+
+    events = iter(stream)
+    assert next(events) == "retry: 2000\n\n"
+    running.started.wait(5)
+    assert next(events).startswith("event: progress\ndata: ")
+    running.release.set()
+    last = list(events)[-1]
+    stream.close()
+
+    assert last.startswith("event: finished\ndata: ")
+    assert json.loads(last.split("data: ", 1)[1])["status"] == DONE
+    assert queue.open_stream(job.id) is not None
+    assert queue.open_stream(12345) is None
+
+
+def test_submitted_job_is_queued_or_running(queue):
+    running = Blocking()
+    job = queue.submit("compile", running)
+    assert job.status in (QUEUED, RUNNING)
+    running.release.set()
+    wait(job)
@@ -0,0 +1,180 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+
+import pytest
+
+try:
+    from ctrlxdatalayer.subscription import NotifyType
+    from ctrlxdatalayer.variant import Result, Variant, VariantType
+except (ImportError, OSError) as e:
+    # The native library of ctrlx-datalayer may not be installed
+    pytest.skip(f"ctrlx-datalayer not available: {e}", allow_module_level=True)
+
+from app.live_values import LiveValueBridge, value_to_variant, variant_to_value
+
+SPEED = "plc/app/Application/sym/GVL/fFUSpeed"
+POWER = "motion/axs/AxisX/cmd/power"
+
+
+#This class stands in for a NotifyItem of a subscription
+class Item:
+    def __init__(self, address, variant, notify_type=NotifyType.DATA):
+        self._address = address
+        self._variant = variant
+        self._type = notify_type
+
+    def get_address(self):
+        return self._address
+
+    def get_data(self):
+        return self._variant
+
+    def get_type(self):
+        return self._type
+
+
+class Subscription:
+    def __init__(self, result=Result.OK):
+        self.result = result
+        self.addresses = None
+        self.closed = False
+
+    def subscribe_multi(self, addresses, cb):
+        self.addresses = addresses
+        return self.result
+
+    def close(self):
+        self.closed = True
+
+
+class Client:
+    def __init__(self, result=Result.OK, subscribe_result=Result.OK):
+        self.result = result
+        self.subscription = Subscription(subscribe_result)
+        self.callbacks = None
+
+    def create_subscription_async(self, properties, on_notify, on_response):
+        self.callbacks = on_notify, on_response
+        return self.result, self.subscription
+
+
+@pytest.fixture
+def bridge():
+    bridge = LiveValueBridge([SPEED, POWER], max_clients=1, heartbeat=0.02)
+    yield bridge
+    bridge.stop()
+
+
+def notify(bridge, *values, result=Result.OK):
+    items = []
+    for address, value in values:
+        items.append(Item(address, value_to_variant(value, VariantType.FLOAT64 if isinstance(value, float)
+                                                    else VariantType.BOOL8)))
+    bridge._on_notify(result, items, None)
+    for item in items:
+        item.get_data().close()
+
+
+@pytest.mark.parametrize("value, variant_type, expected", [
+    (1.5, VariantType.FLOAT64, 1.5),
+    ("2", VariantType.INT32, 2),
+    ("2.7", VariantType.UINT8, 2),
+    ("on", VariantType.BOOL8, True),
+    (False, VariantType.BOOL8, False),
+    (12, VariantType.STRING, "12"),
+    ([1, 2, 3], VariantType.ARRAY_INT16, [1, 2, 3]),
+])
+def test_value_round_trip(value, variant_type, expected):
+    with value_to_variant(value, variant_type) as variant:
+        assert variant.get_type() == variant_type
+        assert variant_to_value(variant) == expected
+
+
+def test_unsupported_values():
+    with pytest.raises(ValueError):
+        value_to_variant("x", VariantType.FLATBUFFERS)
+    with pytest.raises(ValueError):
+        value_to_variant("x", VariantType.FLOAT64)
+    with Variant() as variant:
+        variant.set_flatbuffers(bytearray(b"\x00" * 8))
+        assert variant_to_value(variant) is None
+
+
+def test_start_subscribes_all_addresses(bridge):
+    client = Client()
+
+    bridge.start(client)
+
+    assert client.subscription.addresses == [SPEED, POWER]
+    bridge.stop()
+    assert client.subscription.closed
+
+
+@pytest.mark.parametrize("result, subscribe_result", [(Result.FAILED, Result.OK), (Result.OK, Result.FAILED)])
+def test_failed_subscription_delivers_no_current_values(bridge, result, subscribe_result):
+    bridge.start(Client(result, subscribe_result))
+    notify(bridge, (SPEED, 1.0))
+
+    assert bridge.values() == {SPEED: 1.0}
+    assert bridge.current(SPEED) is None
+
+
+#Only changed values get a new version, the values of the other addresses are kept
+def test_notifications(bridge):
+    bridge.start(Client())
+    notify(bridge, (SPEED, 1.0), (POWER, True))
+    version, changes = bridge.changes_since(0, 0)
+    assert changes == {SPEED: 1.0, POWER: True}
+
+    notify(bridge, (SPEED, 1.0), (POWER, False))
+
+    assert bridge.changes_since(version, 0) == (version + 1, {POWER: False})
+    assert bridge.values() == {SPEED: 1.0, POWER: False}
+    assert bridge.value_type(SPEED) == VariantType.FLOAT64
+    assert bridge.value_type("unknown") is None
+    assert bridge.current(SPEED)[0] == 1.0
+
+
+#While the subscription reports an error the cached values are not current, the reads go to the Data Layer
+def test_notification_error(bridge):
+    bridge.start(Client())
+    notify(bridge, (SPEED, 1.0))
+
+    notify(bridge, result=Result.COMM_INVALID_HEADER)
+    assert bridge.current(SPEED) is None
+
+    notify(bridge, (SPEED, 2.0))
+    assert bridge.current(SPEED)[0] == 2.0
+
+
+def test_other_notify_types_are_ignored(bridge):
+    with Variant() as variant:
+        variant.set_float64(3.0)
+        bridge._on_notify(Result.OK, [Item(SPEED, variant, NotifyType.METADATA)], None)
+
+    assert bridge.values() == {}
+
+
+def test_changes_since_times_out(bridge):
+    assert bridge.changes_since(0, 0.01) == (0, {})
+
+
+#The number of streams is limited, a closed stream frees its place
+def test_event_stream(bridge):
+    bridge.start(Client())
+    stream = bridge.open_stream()
+    assert bridge.open_stream() is None
+
+    events = iter(stream)
+    assert next(events) == "retry: 2000\n\n"
+    assert next(events) == ": keepalive\n\n"
+    notify(bridge, (SPEED, 4.0))
+    assert next(events) == f"event: values\ndata: {json.dumps({SPEED: 4.0})}\n\n"
+
+    stream.close()
+    stream.close()
+    assert list(events) == []
+    assert bridge.open_stream() is not None
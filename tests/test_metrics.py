@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import os
+
+import pytest
+
+from app.metrics import Metrics
+from appdata.app_data_control import TIMED_METHODS, AppDataControl
+from benchmarks.diag_csv_generator import write_diag_csv
+
+
+#A duration falls into the first bucket whose upper bound it does not exceed, the buckets are rendered cumulative
+def test_histogram_buckets():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 1.0, 2.0, 3.0):
+        metrics.observe("save", seconds)
+
+    assert metrics._histograms["save"].counts == [2, 2, 2]
+    lines = metrics.render().splitlines()
+    assert 'diag_operation_duration_seconds_bucket{operation="save",le="0.1"} 2' in lines
+    assert 'diag_operation_duration_seconds_bucket{operation="save",le="1.0"} 4' in lines
+    assert 'diag_operation_duration_seconds_bucket{operation="save",le="+Inf"} 6' in lines
+
+
+def test_text_format():
+    metrics = Metrics(buckets=(0.5,))
+    metrics.observe("upload", 0.25)
+    metrics.observe("save", 1.5, failed=True)
+
+    assert metrics.render() == "\n".join([
+        "# HELP diag_operation_duration_seconds Duration of instrumented operations",
+        "# TYPE diag_operation_duration_seconds histogram",
+        'diag_operation_duration_seconds_bucket{operation="save",le="0.5"} 0',
+        'diag_operation_duration_seconds_bucket{operation="save",le="+Inf"} 1',
+        'diag_operation_duration_seconds_sum{operation="save"} 1.500000',
+        'diag_operation_duration_seconds_count{operation="save"} 1',
+        'diag_operation_duration_seconds_bucket{operation="upload",le="0.5"} 1',
+        'diag_operation_duration_seconds_bucket{operation="upload",le="+Inf"} 1',
+        'diag_operation_duration_seconds_sum{operation="upload"} 0.250000',
+        'diag_operation_duration_seconds_count{operation="upload"} 1',
+        "# HELP diag_operation_errors_total Instrumented operations that raised an exception or failed",
+        "# TYPE diag_operation_errors_total counter",
+        'diag_operation_errors_total{operation="save"} 1',
+        'diag_operation_errors_total{operation="upload"} 0',
+    ]) + "\n"
+
+
+def test_empty_metrics_render_the_headers():
+    assert Metrics().render().count("# TYPE") == 2
+
+
+#A call or block that raises counts as error
+def test_timed_and_timer():
+    metrics = Metrics()
+
+    @metrics.timed("double")
+    def double(value):
+        if value is None:
+            raise ValueError("no value")
+        return 2 * value
+
+    assert double(2) == 4
+    with pytest.raises(ValueError):
+        double(None)
+    with metrics.timer("block"):
+        pass
+    with pytest.raises(RuntimeError), metrics.timer("block"):
+        raise RuntimeError("block")
+
+    for operation in ("double", "block"):
+        histogram = metrics._histograms[operation]
+        assert (histogram.count, histogram.errors) == (2, 1)
+
+
+#Disabled metrics leave the functions as they are
+def test_disabled():
+    metrics = Metrics(enabled=False)
+
+    def function():
+        return 1
+
+    assert metrics.timed("function")(function) is function
+    with metrics.timer("block"):
+        pass
+    assert metrics._histograms == {}
+
+
+#AppDataControl is timed with the timed() of the metrics it is given, without metrics nothing is wrapped
+def test_app_data_control_uses_the_given_metrics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metrics = Metrics()
+    control = AppDataControl(metrics=metrics)
+    os.makedirs(control.storage_location)
+    write_diag_csv(control.storage_file, 20, languages=2)
+
+    assert not control.search_for_error()
+    # The first call reuses the catalogs of search_for_error(), the second one compiles the file again
+    control.compiled_catalogs()
+    control.compiled_catalogs()
+
+    counts = {operation: histogram.count for operation, histogram in metrics._histograms.items()}
+    assert counts == {"search_for_error": 1, "convert_csv_to_json": 1}
+    assert all(hasattr(getattr(control, name), "__wrapped__") for name in TIMED_METHODS)
+    assert not hasattr(AppDataControl().save, "__wrapped__")
@@ -0,0 +1,147 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+
+import pytest
+
+try:
+    from ctrlxdatalayer.variant import Result, Variant, VariantType
+except (ImportError, OSError) as e:
+    # The native library of ctrlx-datalayer may not be installed
+    pytest.skip(f"ctrlx-datalayer not available: {e}", allow_module_level=True)
+
+from app.live_values import value_to_variant, variant_to_value
+from app.my_provider_node import MyProviderNode
+
+ADDRESS = "webserver/app-cmd"
+
+
+#This class stands in for ctrlxdatalayer.provider.Provider
+class FakeProvider:
+    def __init__(self):
+        self.nodes = {}
+
+    def register_node(self, address, node):
+        self.nodes[address] = node
+        return Result.OK
+
+    def unregister_node(self, address):
+        del self.nodes[address]
+        return Result.OK
+
+
+#This class records the answers of the provider callbacks, the Variant is read at once as the Data Layer does
+class Answers(list):
+    def __call__(self, result, data):
+        self.append((result, variant_to_value(data) if data is not None else None))
+
+
+@pytest.fixture
+def create_node():
+    nodes = []
+
+    def create(value, variant_type=VariantType.STRING, commands=None):
+        node = MyProviderNode(FakeProvider(), ADDRESS, value_to_variant(value, variant_type), commands)
+        nodes.append(node)
+        return node
+    yield create
+    for node in nodes:
+        if node._executor is not None:
+            node._executor.shutdown(wait=True)
+
+
+def read(node):
+    answers = Answers()
+    node._MyProviderNode__on_read(None, ADDRESS, None, answers)
+    return answers[0]
+
+
+def write(node, value, variant_type=VariantType.STRING):
+    answers = Answers()
+    with value_to_variant(value, variant_type) as data:
+        node._MyProviderNode__on_write(None, ADDRESS, data, answers)
+    return answers[0]
+
+
+def test_register_and_unregister(create_node):
+    node = create_node("idle")
+
+    assert node.register_node() == Result.OK
+    assert node._provider.nodes == {ADDRESS: node._providerNode}
+    node.unregister_node()
+    assert node._provider.nodes == {}
+
+
+def test_read(create_node):
+    assert read(create_node(1.5, VariantType.FLOAT64)) == (Result.OK, 1.5)
+
+
+#Written values of simple types are set into the cached Variant, other types replace it with a clone
+@pytest.mark.parametrize("value, variant_type", [
+    (2.5, VariantType.FLOAT64),
+    ("text", VariantType.STRING),
+    ([4, 5], VariantType.ARRAY_INT16),
+])
+def test_write(create_node, value, variant_type):
+    initial = [1] if variant_type == VariantType.ARRAY_INT16 else type(value)()
+    node = create_node(initial, variant_type)
+    cached = node._data
+
+    assert write(node, value, variant_type) == (Result.OK, value)
+
+    assert read(node) == (Result.OK, value)
+    assert (node._data is cached) == (variant_type != VariantType.ARRAY_INT16)
+
+
+def test_write_of_another_type_is_rejected(create_node):
+    node = create_node("idle")
+
+    assert write(node, 1, VariantType.INT32) == (Result.TYPE_MISMATCH, None)
+    assert read(node) == (Result.OK, "idle")
+
+
+#A command runs in the worker thread, the node tells its state
+def test_command(create_node):
+    release = threading.Event()
+    node = create_node("idle", commands={"save": lambda: release.wait(5)})
+
+    assert write(node, "save") == (Result.OK, "save running")
+    assert read(node) == (Result.OK, "save running")
+    assert write(node, "save") == (Result.FAILED, "save running")
+
+    release.set()
+    node._running.result(5)
+    assert read(node) == (Result.OK, "save done")
+
+
+@pytest.mark.parametrize("function", [lambda: False, lambda: 1 / 0])
+def test_failed_command(create_node, function):
+    node = create_node("idle", commands={"load": function})
+
+    write(node, "load")
+    node._running.result(5)
+
+    assert read(node) == (Result.OK, "load error")
+
+
+def test_unknown_command(create_node):
+    node = create_node("idle", commands={"save": lambda: True})
+
+    assert write(node, "format") == (Result.INVALID_VALUE, "command unknown")
+    assert node._running is None
+
+
+def test_other_callbacks(create_node):
+    node = create_node("idle")
+    answers = Answers()
+
+    node._MyProviderNode__on_browse(None, ADDRESS, answers)
+    node._MyProviderNode__on_remove(None, ADDRESS, answers)
+    node._MyProviderNode__on_metadata(None, ADDRESS, answers)
+    with Variant() as data:
+        data.set_string("x")
+        node._MyProviderNode__on_create(None, ADDRESS, data, answers)
+
+    assert answers == [(Result.OK, []), (Result.UNSUPPORTED, None), (Result.FAILED, None), (Result.OK, "x")]
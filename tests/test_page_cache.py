@@ -0,0 +1,85 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import os
+import threading
+
+from app.page_cache import RenderCache, StaticFingerprints
+
+
+def test_page_is_rendered_once_per_key():
+    cache = RenderCache()
+    pages = iter(["<p>1</p>", "<p>2</p>"])
+
+    body, etag = cache.get(("state", 1), lambda: next(pages))
+    assert cache.get(("state", 1), lambda: next(pages)) == (body, etag)
+    assert (body, etag) == ("<p>1</p>", hashlib.sha1(b"<p>1</p>").hexdigest())
+
+    changed = cache.get(("state", 2), lambda: next(pages))
+    assert changed[0] == "<p>2</p>" and changed[1] != etag
+    assert (cache.hits, cache.renders) == (1, 2)
+
+
+def test_concurrent_requests_share_the_page():
+    cache = RenderCache()
+    cache.get(1, lambda: "page")
+    results = []
+
+    def get():
+        for _ in range(100):
+            results.append(cache.get(1, lambda: "other"))
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(body for body, etag in results) == {"page"}
+    assert (cache.hits, cache.renders) == (400, 1)
+
+
+#The fingerprint is computed once per file version, a changed file gets a new one
+def test_fingerprint_follows_the_file_version(tmp_path):
+    style = tmp_path / "style.css"
+    style.write_bytes(b"body {}")
+    os.utime(style, ns=(1_000_000_000, 1_000_000_000))
+    fingerprints = StaticFingerprints(str(tmp_path))
+
+    fingerprint = fingerprints.fingerprint("style.css")
+    assert fingerprint == hashlib.sha256(b"body {}").hexdigest()[:12]
+
+    # Same modification time and size: the file is not read again
+    style.write_bytes(b"html {}")
+    os.utime(style, ns=(1_000_000_000, 1_000_000_000))
+    assert fingerprints.fingerprint("style.css") == fingerprint
+
+    os.utime(style, ns=(2_000_000_000, 2_000_000_000))
+    assert fingerprints.fingerprint("style.css") == hashlib.sha256(b"html {}").hexdigest()[:12]
+
+    style.write_bytes(b"html { color: red }")
+    assert fingerprints.fingerprint("style.css") == hashlib.sha256(b"html { color: red }").hexdigest()[:12]
+
+
+def test_fingerprint_of_missing_file(tmp_path):
+    assert StaticFingerprints(str(tmp_path)).fingerprint("missing.js") is None
+
+
+#The fingerprints are part of the render key (see index() in main.py): a changed asset renders the page again
+def test_changed_asset_renders_the_page_again(tmp_path):
+    script = tmp_path / "app.js"
+    script.write_bytes(b"let a = 1;")
+    fingerprints = StaticFingerprints(str(tmp_path))
+    cache = RenderCache()
+
+    def page():
+        return cache.get(("state", fingerprints.fingerprint("app.js")),
+                         lambda: f"<script src='app.js?v={fingerprints.fingerprint('app.js')}'>")
+
+    first = page()
+    assert page() == first
+    script.write_bytes(b"let a = 2; // changed")
+
+    assert page() != first
+    assert cache.renders == 2
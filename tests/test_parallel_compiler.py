@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+
+import pytest
+
+import appdata.parallel_compiler
+from appdata.compile_cache import CompileCache, csv_content_hash
+from appdata.diag_compiler import compile_csv
+from appdata.parallel_compiler import compile_product, compile_products
+from benchmarks.diag_csv_generator import write_diag_csv
+
+
+class Cancelled(Exception):
+    pass
+
+
+@pytest.fixture
+def products(tmp_path):
+    products = {None: str(tmp_path / "Diag.csv"), "XM22": str(tmp_path / "Diag_XM22.csv"),
+                "XM42": str(tmp_path / "Diag_XM42.csv")}
+    for i, csv_path in enumerate(products.values()):
+        write_diag_csv(csv_path, 300 - 100 * i, languages=3)
+    return products
+
+
+def load(storage_location, file_name):
+    with open(os.path.join(storage_location, file_name), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+#The CSV file of a product is parsed once for all of its languages
+def test_compile_product_parses_the_csv_once(tmp_path, products, monkeypatch):
+    calls = []
+
+    def counting_compile_csv(csv_path, languages=None, progress=None):
+        calls.append((csv_path, languages))
+        return compile_csv(csv_path, languages, progress)
+    monkeypatch.setattr(appdata.parallel_compiler, "compile_csv", counting_compile_csv)
+
+    entries, written = compile_product(products["XM22"], str(tmp_path), "XM22", {}, False)
+
+    assert calls == [(products["XM22"], None)]
+    assert sorted(entries) == ["DE", "EN", "FR"]
+    assert sorted(written) == ["Diag_XM22_DE.json", "Diag_XM22_EN.json", "Diag_XM22_FR.json"]
+
+
+#The catalogs are those of compile_csv, progress is reported per product and unchanged products are skipped
+def test_compile_products(tmp_path, products):
+    storage_location = str(tmp_path)
+    reports = []
+
+    results = compile_products(storage_location, products, workers=2, progress=lambda **report: reports.append(report))
+
+    assert sorted(results[None]) == ["DiagDE.json", "DiagEN.json", "DiagFR.json"]
+    assert sorted(results["XM42"]) == ["Diag_XM42_DE.json", "Diag_XM42_EN.json", "Diag_XM42_FR.json"]
+    catalogs, languages = compile_csv(products["XM22"])
+    for catalog, language in zip(catalogs, languages):
+        assert load(storage_location, f"Diag_XM22_{language}.json") == catalog
+    assert reports == [{"products_done": done, "products": 3} for done in range(4)]
+    for product, csv_path in products.items():
+        assert CompileCache(storage_location, product).is_up_to_date(csv_content_hash(csv_path))
+
+    reports.clear()
+    assert compile_products(storage_location, products, progress=lambda **report: reports.append(report)) == \
+        {product: [] for product in products}
+    assert reports == [{"products_done": 3, "products": 3}]
+
+
+def test_product_without_text_columns_fails(tmp_path, products):
+    with open(products["XM42"], 'w', encoding='utf-8') as file:
+        file.write("product name;mainDiag No;detailedDiagnostics No\nX;0E0A0001;\n")
+
+    results = compile_products(str(tmp_path), products, workers=2)
+
+    assert results["XM42"] is None
+    assert len(results[None]) == 3 and len(results["XM22"]) == 3
+
+
+#An exception of progress (a cancelled job) stops the compilation, the products finished until then are kept
+def test_cancel_keeps_finished_products(tmp_path, products):
+    storage_location = str(tmp_path)
+    items = list(products.items())
+    finished = []
+
+    def progress(products_done, products):
+        if products_done == 1:
+            finished.extend(product for product, csv_path in items
+                            if CompileCache(storage_location, product).is_up_to_date(csv_content_hash(csv_path)))
+            raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        compile_products(storage_location, products, workers=1, progress=progress)
+
+    assert len(finished) == 1
+    assert CompileCache(storage_location, finished[0]).is_up_to_date(csv_content_hash(products[finished[0]]))
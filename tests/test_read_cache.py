@@ -0,0 +1,176 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+
+import pytest
+
+try:
+    import ctrlxdatalayer.variant  # noqa: F401
+except (ImportError, OSError) as e:
+    # The native library of ctrlx-datalayer may not be installed
+    pytest.skip(f"ctrlx-datalayer not available: {e}", allow_module_level=True)
+
+import app.read_cache
+from app.read_cache import ReadCache
+
+SPEED = "plc/app/Application/sym/GVL/fFUSpeed"
+POWER = "motion/axs/AxisX/cmd/power"
+STATE = "motion/axs/AxisX/state/opstate"
+
+
+#This class stands in for BulkAccess: every read returns the next value of an address, results can be set
+class Bulk:
+    def __init__(self):
+        self.reads = []
+        self.writes = []
+        self.values = {}
+        self.results = {}
+        self.connected = True
+
+    def read(self, addresses):
+        if not self.connected:
+            return None
+        self.reads.append(list(addresses))
+        items = []
+        for address in addresses:
+            self.values[address] = self.values.get(address, 0) + 1
+            items.append({"address": address, "result": self.results.get(address, "OK"),
+                          "value": self.values[address], "timestamp": None})
+        return items
+
+    def write(self, values):
+        self.writes.append(values)
+        return [{"address": address, "result": "OK", "value": value, "timestamp": None}
+                for address, value in values.items()]
+
+
+class LiveValues:
+    def __init__(self, values):
+        self.values = values
+
+    def current(self, address):
+        return self.values.get(address)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.read_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def values(items):
+    return [(item["address"], item["value"]) for item in items]
+
+
+#The misses are read with one bulk read, the values are kept for their TTL (longest matching prefix)
+def test_values_expire_after_their_ttl(clock):
+    bulk = Bulk()
+    cache = ReadCache(bulk, default_ttl=1.0, ttls={"motion/": 10.0, "motion/axs/AxisX/state/": 0.5})
+    assert (cache.ttl(SPEED), cache.ttl(POWER), cache.ttl(STATE)) == (1.0, 10.0, 0.5)
+
+    assert values(cache.read([SPEED, POWER, STATE])) == [(SPEED, 1), (POWER, 1), (STATE, 1)]
+    clock[0] += 0.6
+    assert values(cache.read([SPEED, POWER, STATE])) == [(SPEED, 1), (POWER, 1), (STATE, 2)]
+    clock[0] += 0.5
+    assert values(cache.read([SPEED, POWER])) == [(SPEED, 2), (POWER, 1)]
+
+    assert bulk.reads == [[SPEED, POWER, STATE], [STATE], [SPEED]]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (3, 5, 3)
+
+
+def test_errors_are_not_cached(clock):
+    bulk = Bulk()
+    bulk.results[SPEED] = "INVALID_ADDRESS"
+    cache = ReadCache(bulk)
+
+    cache.read([SPEED])
+    cache.read([SPEED])
+
+    assert bulk.reads == [[SPEED], [SPEED]]
+
+
+def test_not_connected(clock):
+    bulk = Bulk()
+    bulk.connected = False
+    cache = ReadCache(bulk)
+
+    assert cache.read([SPEED]) is None
+    assert cache.stats()["entries"] == 0
+
+
+#Subscribed values are taken from the subscription and never read
+def test_subscribed_values(clock):
+    bulk = Bulk()
+    cache = ReadCache(bulk, LiveValues({SPEED: (42.0, 0.0)}))
+
+    items = cache.read([SPEED, POWER])
+
+    assert items[0] == {"address": SPEED, "result": "OK", "value": 42.0, "timestamp": "1970-01-01T00:00:00+00:00"}
+    assert bulk.reads == [[POWER]]
+    assert cache.stats()["subscription_hits"] == 1
+
+
+#A write drops the cached values of the written addresses only
+def test_write_invalidates(clock):
+    bulk = Bulk()
+    cache = ReadCache(bulk, default_ttl=60.0)
+    cache.read([SPEED, POWER])
+
+    cache.write({SPEED: 5})
+    cache.read([SPEED, POWER])
+
+    assert bulk.writes == [{SPEED: 5}]
+    assert bulk.reads == [[SPEED, POWER], [SPEED]]
+
+
+#A value read while the address was invalidated is not stored, it may be older than the write
+def test_read_during_invalidation_is_not_stored(clock):
+    bulk = Bulk()
+    cache = ReadCache(bulk, default_ttl=60.0)
+    read = bulk.read
+
+    def read_and_invalidate(addresses):
+        items = read(addresses)
+        cache.invalidate([SPEED])
+        return items
+    bulk.read = read_and_invalidate
+
+    cache.read([SPEED])
+    bulk.read = read
+    cache.read([SPEED])
+
+    assert bulk.reads == [[SPEED], [SPEED]]
+
+
+def test_least_recently_used_values_are_evicted(clock):
+    bulk = Bulk()
+    cache = ReadCache(bulk, default_ttl=60.0, max_entries=2)
+    cache.read([SPEED, POWER])
+    cache.read([SPEED])
+
+    cache.read([STATE])
+    cache.read([SPEED, POWER])
+
+    assert bulk.reads == [[SPEED, POWER], [STATE], [POWER]]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_concurrent_reads(clock):
+    cache = ReadCache(Bulk(), default_ttl=60.0)
+
+    def read():
+        for _ in range(200):
+            cache.read([SPEED, POWER])
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 1600
+    assert stats["entries"] == 2
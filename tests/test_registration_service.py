@@ -0,0 +1,215 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+
+import pytest
+
+try:
+    from ctrlxdatalayer.variant import Result
+    import ctrlxdatalayer.bulk  # noqa: F401
+except (ImportError, OSError) as e:
+    # ctrlx-datalayer < 3 has no bulk module, the native library may not be installed
+    pytest.skip(f"ctrlx-datalayer bulk API not available: {e}", allow_module_level=True)
+
+from app.registration_service import (DONE, FAILED, PENDING, REGISTER_ADDRESS, TIMEOUT, UNREGISTER_ADDRESS,
+                                      RegistrationService, registration_path)
+from datalayer_fakes import FakeBulk, FakeClient, FakeClientPool
+
+FILES = ["DiagDE.json", "DiagEN.json", "DiagFR.json"]
+
+
+def wait(operation, timeout=5.0):
+    deadline = time.time() + timeout
+    while operation.status == PENDING and time.time() < deadline:
+        time.sleep(0.01)
+    return operation
+
+
+#The responses of a bulk registration all have the address of the register node: the result of every file is
+#the one of the response at the position of its request
+def test_bulk_results_are_matched_to_files_by_position():
+    bulk = FakeBulk(results=[Result.OK, Result.INVALID_VALUE, Result.OK])
+    succeeded = []
+    service = RegistrationService(FakeClientPool(FakeClient(bulk)))
+
+    operation = wait(service.submit_bulk("register", REGISTER_ADDRESS, FILES,
+                                         on_success=lambda operation: succeeded.append(dict(operation.file_results))))
+
+    assert [request.address for request in bulk.requests] == [REGISTER_ADDRESS] * 3
+    assert bulk.written == [registration_path(name) for name in FILES]
+    assert operation.status == DONE
+    assert operation.file_results == {"DiagDE.json": "OK", "DiagEN.json": "INVALID_VALUE", "DiagFR.json": "OK"}
+    assert succeeded == [operation.file_results]
+    assert service.in_flight() is None
+
+
+def test_bulk_fails_if_no_file_succeeded():
+    bulk = FakeBulk(results=[Result.INVALID_VALUE] * 3)
+    succeeded = []
+    service = RegistrationService(FakeClientPool(FakeClient(bulk)))
+
+    operation = wait(service.submit_bulk("register", REGISTER_ADDRESS, FILES, on_success=succeeded.append))
+
+    assert (operation.status, operation.result) == (FAILED, "FAILED")
+    assert set(operation.file_results.values()) == {"INVALID_VALUE"}
+    assert succeeded == []
+
+
+def test_bulk_call_failure_has_no_file_results():
+    service = RegistrationService(FakeClientPool(FakeClient(FakeBulk(result=Result.CLIENT_NOT_CONNECTED))))
+
+    operation = wait(service.submit_bulk("unregister", UNREGISTER_ADDRESS, FILES))
+
+    assert (operation.status, operation.result) == (FAILED, "CLIENT_NOT_CONNECTED")
+    assert operation.file_results == {}
+
+
+def test_missing_responses_count_as_failed():
+    bulk = FakeBulk()
+    service = RegistrationService(FakeClientPool(FakeClient(bulk)))
+    answer = bulk._answer
+    # Only the first request is answered
+    bulk._answer = lambda request: answer(list(request)[:1])
+
+    operation = wait(service.submit_bulk("register", REGISTER_ADDRESS, FILES))
+
+    assert operation.status == DONE
+    assert operation.file_results == {"DiagDE.json": "OK", "DiagEN.json": "FAILED", "DiagFR.json": "FAILED"}
+
+
+def test_rounds_repeat_the_bulk_write():
+    first, second = FakeBulk(), FakeBulk(results=[Result.OK, Result.OK, Result.INVALID_VALUE])
+    client = FakeClient(first, second)
+    service = RegistrationService(FakeClientPool(client))
+
+    operation = wait(service.submit_bulk("unregister", UNREGISTER_ADDRESS, FILES, rounds=2))
+
+    assert first.written == second.written == [registration_path(name) for name in FILES]
+    assert client.bulks == []
+    assert operation.file_results["DiagFR.json"] == "INVALID_VALUE"
+
+
+def test_no_client_starts_no_operation():
+    assert RegistrationService(FakeClientPool(None)).submit_bulk("register", REGISTER_ADDRESS, FILES) is None
+
+
+def closed(variant):
+    return variant._Variant__closed
+
+
+#The writes of an operation are made one after the other, each after the response of the previous one
+def test_writes_run_in_order():
+    client = FakeClient()
+    succeeded = []
+    service = RegistrationService(FakeClientPool(client))
+
+    operation = service.submit("update", "DiagEN.json", [(REGISTER_ADDRESS, "new"), (UNREGISTER_ADDRESS, "old")],
+                               on_success=succeeded.append)
+
+    assert [write[:2] for write in client.async_writes] == [(REGISTER_ADDRESS, "new")]
+    assert closed(client.respond())
+    assert [write[:2] for write in client.async_writes] == [(UNREGISTER_ADDRESS, "old")]
+    client.respond()
+    assert (operation.status, operation.result, operation.completed) == (DONE, "OK", 2)
+    assert succeeded == [operation]
+    assert service.in_flight() is None
+
+
+#The pool client is kept by the operation in flight, the coalesced and rejected submissions give theirs back
+def test_submissions_are_coalesced():
+    client = FakeClient()
+    pool = FakeClientPool(client)
+    service = RegistrationService(pool)
+
+    operation = service.submit("register", "DiagEN.json", [(REGISTER_ADDRESS, "a")])
+
+    assert service.submit("register", "DiagEN.json", [(REGISTER_ADDRESS, "a")]) is operation
+    assert service.submit("unregister", "DiagEN.json", [(UNREGISTER_ADDRESS, "a")]) is None
+    assert len(client.async_writes) == 1
+    assert pool.in_use == 1
+    client.respond()
+    assert pool.in_use == 0
+
+
+#A failed write stops the operation, on_failure tells how many writes succeeded
+@pytest.mark.parametrize("immediate", [False, True])
+def test_failed_write(immediate):
+    client = FakeClient()
+    failed = []
+    service = RegistrationService(FakeClientPool(client))
+    if immediate:
+        client.write_result = Result.CLIENT_NOT_CONNECTED
+
+    operation = service.submit("update", "DiagEN.json", [(REGISTER_ADDRESS, "new"), (UNREGISTER_ADDRESS, "old")],
+                               on_failure=lambda operation: failed.append(operation.completed))
+    if not immediate:
+        client.respond()
+        client.respond(Result.INVALID_VALUE)
+
+    assert operation.status == FAILED
+    assert operation.result == ("CLIENT_NOT_CONNECTED" if immediate else "INVALID_VALUE")
+    assert failed == [0 if immediate else 1]
+    assert operation._data is None
+    assert service.in_flight() is None
+
+
+#An operation that timed out keeps the in-flight slot until its write returns, the late response closes its Variant
+def test_timed_out_write_stays_in_flight_until_its_response():
+    client = FakeClient()
+    failed = []
+    pool = FakeClientPool(client)
+    service = RegistrationService(pool, timeout=0.05)
+
+    operation = service.submit("register", "DiagEN.json", [(REGISTER_ADDRESS, "a")], on_failure=failed.append)
+    assert wait(operation).status == TIMEOUT
+    assert failed == [operation]
+
+    assert service.in_flight() is operation and pool.in_use == 1
+    assert service.submit("register", "DiagEN.json", [(REGISTER_ADDRESS, "a")]) is None
+    assert service.submit("unregister", "DiagEN.json", [(UNREGISTER_ADDRESS, "a")]) is None
+
+    data = client.respond()
+    assert closed(data) and operation._data is None
+    assert operation.status == TIMEOUT and operation.completed == 0
+    assert service.in_flight() is None and pool.in_use == 0
+    assert service.submit("register", "DiagEN.json", [(REGISTER_ADDRESS, "a")]) not in (None, operation)
+
+
+#A bulk write that timed out keeps the in-flight slot until it returns
+def test_timed_out_bulk_stays_in_flight():
+    release = threading.Event()
+
+    class BlockingBulk(FakeBulk):
+        def write(self, request, cb=None, userdata=None):
+            release.wait(5)
+            return super().write(request, cb, userdata)
+
+    service = RegistrationService(FakeClientPool(FakeClient(BlockingBulk(), FakeBulk())), timeout=0.05)
+
+    operation = wait(service.submit_bulk("register", REGISTER_ADDRESS, FILES))
+    assert operation.status == TIMEOUT
+    assert service.submit_bulk("register", REGISTER_ADDRESS, FILES) is None
+
+    release.set()
+    deadline = time.time() + 5
+    while service.in_flight() is not None and time.time() < deadline:
+        time.sleep(0.01)
+    assert service.in_flight() is None
+    assert operation.status == TIMEOUT and operation.file_results == {}
+
+
+#An error in the bulk write finishes the operation instead of leaving it in flight
+def test_bulk_error_fails_the_operation():
+    class BrokenClient(FakeClient):
+        def create_bulk(self):
+            raise RuntimeError("no bulk")
+
+    service = RegistrationService(FakeClientPool(BrokenClient()))
+
+    operation = wait(service.submit_bulk("register", REGISTER_ADDRESS, FILES))
+
+    assert (operation.status, operation.result) == (FAILED, "FAILED")
+    assert service.in_flight() is None
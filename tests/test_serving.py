@@ -0,0 +1,57 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import sys
+import types
+
+import pytest
+
+from app.serving import run_server
+
+
+class FakeApp:
+    def __init__(self):
+        self.runs = []
+
+    def run(self, **options):
+        self.runs.append(options)
+
+
+def test_production_uses_waitress(monkeypatch):
+    served = []
+    monkeypatch.setitem(sys.modules, "waitress", types.SimpleNamespace(
+        serve=lambda app, **options: served.append((app, options))))
+    app = FakeApp()
+
+    run_server(app, port=5001, threads=4)
+
+    assert served == [(app, {"host": "0.0.0.0", "port": 5001, "threads": 4, "ident": "ctrlx-diagnostics-app"})]
+    assert app.runs == []
+
+
+#Without waitress the threaded Werkzeug server is used, never the debug server
+def test_production_without_waitress(monkeypatch):
+    import werkzeug.serving
+    started = []
+    monkeypatch.setitem(sys.modules, "waitress", None)
+    monkeypatch.setattr(werkzeug.serving, "run_simple", lambda *args, **options: started.append((args, options)))
+    app = FakeApp()
+
+    run_server(app, host="127.0.0.1", port=5002)
+
+    assert started == [(("127.0.0.1", 5002, app), {"threaded": True, "use_reloader": False, "use_debugger": False})]
+    assert app.runs == []
+
+
+def test_debug_mode():
+    app = FakeApp()
+
+    run_server(app, mode="debug", port=5003)
+
+    assert app.runs == [{"debug": True, "port": 5003, "host": "0.0.0.0"}]
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        run_server(FakeApp(), mode="fast")
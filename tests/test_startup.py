@@ -0,0 +1,43 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import os
+
+import pytest
+
+try:
+    import ctrlxdatalayer.variant  # noqa: F401
+    import flask  # noqa: F401
+except (ImportError, OSError) as e:
+    # main.py needs ctrlx-datalayer with its native library and Flask
+    pytest.skip(f"main.py cannot be imported: {e}", allow_module_level=True)
+
+from benchmarks.profile_startup import LAZY_MODULES, cold_start, import_profile
+
+# Startup budgets in ms, the times depend on the machine: 0 (the default) is not checked, set them for the target
+IMPORT_BUDGET_MS = float(os.getenv("DIAG_IMPORT_BUDGET_MS", 0))
+START_BUDGET_MS = float(os.getenv("DIAG_START_BUDGET_MS", 0))
+
+
+@pytest.fixture(scope="module")
+def profile():
+    # The first run compiles the .pyc files, it is not measured
+    import_profile()
+    return import_profile()
+
+
+#The modules that are only needed after the first page must not be imported by 'import main'
+def test_lazy_modules_are_not_imported_at_startup(profile):
+    assert "main" in profile
+    assert [name for name in LAZY_MODULES if name in profile] == []
+
+
+@pytest.mark.skipif(not IMPORT_BUDGET_MS, reason="DIAG_IMPORT_BUDGET_MS is not set")
+def test_import_budget(profile):
+    assert profile["main"][1] / 1000 <= IMPORT_BUDGET_MS
+
+
+@pytest.mark.skipif(not START_BUDGET_MS, reason="DIAG_START_BUDGET_MS is not set")
+def test_cold_start_budget():
+    assert cold_start() * 1000 <= START_BUDGET_MS
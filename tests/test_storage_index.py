@@ -0,0 +1,219 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import time
+
+import pytest
+
+import appdata.storage_index
+from appdata.storage_index import (AFTER_REBOOT, CATALOGS, CSV, EVENT_HEADER, IN_CREATE, IN_DELETE, IN_IGNORED,
+                                   IN_MOVED_FROM, IN_MOVED_TO, IN_Q_OVERFLOW, VERSIONS, StorageIndex, file_category,
+                                   load_inotify)
+
+INOTIFY = load_inotify() is not None
+
+
+def until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def touch(folder, *names):
+    for name in names:
+        (folder / name).write_bytes(b"")
+
+
+#The index is tested with inotify (where available) and in the polling mode
+@pytest.fixture(params=["inotify", "polling"])
+def mode(request, monkeypatch):
+    if request.param == "inotify" and not INOTIFY:
+        pytest.skip("inotify not available")
+    if request.param == "polling":
+        monkeypatch.setattr(appdata.storage_index, "load_inotify", lambda: None)
+    return request.param
+
+
+@pytest.fixture
+def create_index():
+    indexes = []
+
+    def create(folder, poll_interval=0.02):
+        index = StorageIndex(str(folder), poll_interval=poll_interval)
+        indexes.append(index)
+        return index
+    yield create
+    for index in indexes:
+        index.stop()
+
+
+#This function builds the bytes of an inotify event as the kernel returns them
+def event(watch, mask, name=b""):
+    padded = name.ljust(16, b"\0") if name else b""
+    return EVENT_HEADER.pack(watch, mask, 0, len(padded)) + padded
+
+
+#This fixture makes an index read the given events from a pipe instead of the inotify descriptor
+#The write end stays open, like the inotify descriptor the pipe never reaches its end
+@pytest.fixture
+def feed():
+    pipes = []
+
+    def feed(index, *events):
+        read_fd, write_fd = os.pipe()
+        pipes.append((index, read_fd, write_fd))
+        os.set_blocking(read_fd, False)
+        os.write(write_fd, b"".join(events))
+        index._fd = read_fd
+        index._watch = 1
+    yield feed
+    for index, read_fd, write_fd in pipes:
+        index._fd = None
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+@pytest.mark.parametrize("name, category", [
+    ("DiagEN.json", CATALOGS),
+    ("Diag_XM22_EN.json", CATALOGS),
+    ("DiagEN.0123456789ab.json", VERSIONS),
+    ("AfterReboot-DiagEN.json", AFTER_REBOOT),
+    ("Diag.csv", CSV),
+    ("DiagEN.bin", None),
+    ("notes.json", None),
+])
+def test_file_category(name, category):
+    assert file_category(name) == category
+
+
+#Files added, renamed and removed by the app or outside of it are in the index at once, the listeners are called
+def test_changes_are_seen(tmp_path, mode, create_index):
+    touch(tmp_path, "DiagEN.json", "Diag.csv", "readme.txt")
+    index = create_index(tmp_path)
+    changes = []
+    index.on_change(lambda index, categories: changes.append(categories))
+    index.start()
+    assert (index._watch is not None) == (mode == "inotify")
+    assert index.json_files() == ["DiagEN.json"] and index.csv_files() == ["Diag.csv"]
+    assert changes == [set(appdata.storage_index.CATEGORIES)]
+
+    touch(tmp_path, "DiagDE.json")
+    os.rename(tmp_path / "DiagEN.json", tmp_path / "AfterReboot-DiagEN.json")
+    os.remove(tmp_path / "Diag.csv")
+    if mode == "polling":
+        # The directory may change within the resolution of its modification time
+        os.utime(tmp_path, ns=(0, time.time_ns() + 10 ** 9))
+
+    assert index.json_files() == ["DiagDE.json"]
+    assert index.after_reboot_files() == ["AfterReboot-DiagEN.json"]
+    assert index.csv_files() == []
+    assert until(lambda: {CATALOGS, AFTER_REBOOT, CSV} <= set().union(*changes[1:]))
+
+
+#The background thread publishes changes without a call of the index
+def test_thread_publishes_changes(tmp_path, mode, create_index):
+    index = create_index(tmp_path)
+    changes = []
+    index.on_change(lambda index, categories: changes.append(categories))
+    index.start()
+
+    touch(tmp_path, "DiagEN.0123456789ab.json")
+    if mode == "polling":
+        os.utime(tmp_path, ns=(0, time.time_ns() + 10 ** 9))
+
+    assert until(lambda: {VERSIONS} in changes)
+    assert index.version_files() == ["DiagEN.0123456789ab.json"]
+
+
+#stop() wakes the thread at once, also while it waits for events or the next poll
+def test_stop_wakes_the_thread(tmp_path, mode, create_index):
+    index = create_index(tmp_path, poll_interval=60)
+    index.start()
+    thread = index._thread
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    index.stop()
+
+    assert time.monotonic() - started < 5
+    assert not thread.is_alive()
+    assert index._fd is None and index._wakeup is None
+    # The index still works, by listing the directory when it changed
+    touch(tmp_path, "DiagEN.json")
+    os.utime(tmp_path, ns=(0, time.time_ns() + 10 ** 9))
+    assert index.json_files() == ["DiagEN.json"]
+    index.stop()
+
+
+#The events are applied by name, without listing the directory
+def test_read_events(tmp_path, create_index, feed):
+    touch(tmp_path, "DiagEN.json", "Diag.csv")
+    index = create_index(tmp_path)
+    index._scan()
+    index._pending.clear()
+    feed(index, event(1, IN_CREATE, b"DiagDE.json"), event(1, IN_DELETE, b"Diag.csv"),
+            event(1, IN_MOVED_FROM, b"DiagEN.json"), event(1, IN_MOVED_TO, b"AfterReboot-DiagEN.json"),
+            event(1, IN_CREATE, b"other.txt"), event(2, IN_CREATE, b"DiagFR.json"))
+
+    index._read_events()
+
+    assert index._files[CATALOGS] == {"DiagDE.json"}
+    assert index._files[CSV] == set()
+    assert index._files[AFTER_REBOOT] == {"AfterReboot-DiagEN.json"}
+    assert index._pending == {CATALOGS, CSV, AFTER_REBOOT}
+
+
+#After an overflow of the event queue the directory is listed again, the events after it are dropped
+def test_overflow_rescans(tmp_path, create_index, feed):
+    index = create_index(tmp_path)
+    index._scan()
+    touch(tmp_path, "DiagEN.json", "DiagDE.json")
+    feed(index, event(1, IN_CREATE, b"DiagEN.json"), event(-1, IN_Q_OVERFLOW),
+            event(1, IN_CREATE, b"DiagFR.json"))
+
+    index._read_events()
+
+    assert index._files[CATALOGS] == {"DiagEN.json", "DiagDE.json"}
+    assert index._watch == 1
+
+
+#If the watch is removed (e.g. the directory was deleted) the index lists the directory and falls back to polling
+def test_removed_watch_falls_back_to_polling(tmp_path, create_index, feed):
+    index = create_index(tmp_path)
+    index._libc = load_inotify()
+    index._scan()
+    touch(tmp_path, "DiagEN.json")
+    feed(index, event(1, IN_IGNORED))
+
+    index._read_events()
+
+    assert index._watch is None
+    assert index._files[CATALOGS] == {"DiagEN.json"}
+    touch(tmp_path, "DiagDE.json")
+    os.utime(tmp_path, ns=(0, time.time_ns() + 10 ** 9))
+    assert index.json_files() == ["DiagDE.json", "DiagEN.json"]
+
+
+@pytest.mark.skipif(not INOTIFY, reason="inotify not available")
+def test_deleted_directory_is_watched_again(tmp_path, create_index):
+    folder = tmp_path / "diagnostics"
+    folder.mkdir()
+    touch(folder, "DiagEN.json")
+    index = create_index(folder)
+    index.start()
+    assert index._watch is not None
+
+    shutil.rmtree(folder)
+    assert index.json_files() == []
+    assert index._watch is None
+
+    folder.mkdir()
+    touch(folder, "DiagDE.json")
+    assert index.json_files() == ["DiagDE.json"]
+    assert index._watch is not None
+    touch(folder, "DiagFR.json")
+    assert index.json_files() == ["DiagDE.json", "DiagFR.json"]
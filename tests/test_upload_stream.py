@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: Bosch Rexroth AG
+#
+# SPDX-License-Identifier: MIT
+
+import random
+
+import pytest
+
+from appdata.diag_validator import compile_and_validate
+from appdata.upload_stream import CsvChunkParser
+
+# A small file with a BOM, multi-byte characters, quoted delimiters, quotes and line breaks (LF and CR LF) in texts
+CSV_DATA = ("﻿product name;mainDiag No;detailedDiagnostics No;text-EN;text-DE\r\n"
+            "Product;0E0A0001;;Main text;Haupttext äöü\r\n"
+            ";;00000001;\"Quoted; with delimiter\";\"Zwei\nZeilen\"\r\n"
+            "\r\n"
+            ";;00000002;\"Quote \"\"inside\"\"\";\"CR LF\r\ninside\"\r\n"
+            ";0E0G0002;;日本語;\r\n"
+            ";;;;\r\n"
+            ";;00000003;Last row without line break;Letzte Zeile").encode("utf-8")
+
+
+@pytest.fixture
+def expected(tmp_path):
+    csv_path = tmp_path / "Diag.csv"
+    csv_path.write_bytes(CSV_DATA)
+    message, builder = compile_and_validate(str(csv_path))
+    return message, builder.catalogs()
+
+
+def parse(chunks, compile=True):
+    parser = CsvChunkParser(compile)
+    for chunk in chunks:
+        parser.feed(chunk)
+    message, builder = parser.close()
+    return message, builder.catalogs() if builder is not None else None
+
+
+def test_file_has_errors_and_texts(expected):
+    message, catalogs = expected
+    assert "Invalid main diagnostic number (4th digit) in row 5" in message
+    assert message["Empty text in row 5"] == ["DE"]
+    assert catalogs[1]["mainDiagnostics"]["0E0A0001"]["detailedDiagnostics"]["00000002"]["text"] == "CR LF\r\ninside"
+
+
+#Every split point of the data, also inside a multi-byte character, a quoted field or a CR LF, gives the same result
+def test_every_split_point(expected):
+    for split in range(len(CSV_DATA) + 1):
+        assert parse([CSV_DATA[:split], CSV_DATA[split:]]) == expected, split
+
+
+def test_single_bytes(expected):
+    assert parse([CSV_DATA[i:i + 1] for i in range(len(CSV_DATA))]) == expected
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_chunks(expected, seed):
+    rng = random.Random(seed)
+    chunks, position = [], 0
+    while position < len(CSV_DATA):
+        size = rng.randint(0, 40)
+        chunks.append(CSV_DATA[position:position + size])
+        position += size
+    assert parse(chunks) == expected
+
+
+def test_validation_only_has_no_builder(expected):
+    assert parse([CSV_DATA], compile=False) == (expected[0], None)
+
+
+def test_empty_upload_reports_missing_headers():
+    assert parse([b""]) == ({"Error in headers": "Please make sure all required headers are available"}, None)